@@ -1,6 +1,13 @@
 from ._version import __version__   # noqa
 
-from ._imwrite import imwrite, imwrite_to_memory
-from ._imread import imread, imread_from_memory
+from ._imwrite import (
+    Encoder, StreamingEncoder, imwrite, imwrite_to_memory,
+    imwrite_batch_to_memory, imwrite_into,
+)
+from ._header_cache import header_cache
+from ._imread import Decoder, imread, imread_from_memory
 
-__all__ = ["imwrite", "imwrite_to_memory", "imread"]
+__all__ = [
+    "imwrite", "imwrite_to_memory", "imwrite_batch_to_memory", "imwrite_into",
+    "imread", "Encoder", "StreamingEncoder", "Decoder", "header_cache",
+]
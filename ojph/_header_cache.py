@@ -0,0 +1,141 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from .ojph_bindings import j2c_main_header_size
+
+HeaderInfo = namedtuple('HeaderInfo', [
+    'height',
+    'width',
+    'num_components',
+    'bit_depth',
+    'is_signed',
+    'is_planar',
+    'uses_color_transform',
+    'num_decompositions',
+    'progression_order',
+    'is_predict_only',
+])
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+def header_info(codestream):
+    """The metadata of a codestream whose headers have been read."""
+    siz = codestream.access_siz()
+    cod = codestream.access_cod()
+    extents = siz.get_image_extent()
+    return HeaderInfo(
+        height=extents.y,
+        width=extents.x,
+        num_components=siz.get_num_components(),
+        bit_depth=siz.get_bit_depth(0),
+        is_signed=siz.is_signed(0),
+        is_planar=codestream.is_planar(),
+        uses_color_transform=cod.is_using_color_transform(),
+        num_decompositions=cod.get_num_decompositions(),
+        progression_order=cod.get_progression_order_as_string(),
+        is_predict_only=cod.is_predict_only(),
+    )
+
+
+class HeaderCache:
+    """A bounded, thread-safe LRU cache of codestream header metadata.
+
+    Files are keyed on ``(st_dev, st_ino, st_mtime_ns, st_size, offset)``, so
+    a file that is rewritten in place gets a new entry. In-memory codestreams
+    are keyed on a hash of their main header, which is all the metadata
+    depends on.
+    """
+
+    def __init__(self, maxsize=1024):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._maxsize = maxsize
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize):
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be >= 0, got {maxsize}")
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    @staticmethod
+    def file_key(filename, offset=None):
+        """The key of a codestream file, or None if it cannot be stat'ed."""
+        try:
+            st = os.stat(filename)
+        except (OSError, TypeError, ValueError):
+            return None
+        return ('file', st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size,
+                offset or 0)
+
+    @staticmethod
+    def memory_key(data):
+        """The key of an in-memory codestream, or None if it has no header."""
+        size = j2c_main_header_size(data)
+        if size == 0:
+            return None
+        digest = hashlib.blake2b(data[:size], digest_size=16).digest()
+        return ('memory', digest)
+
+    def get(self, key):
+        with self._lock:
+            info = self._entries.get(key)
+            if info is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+            return info
+
+    def put(self, key, info):
+        with self._lock:
+            self._entries[key] = info
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, source):
+        """Drop the entries of a file (at every offset) or of a buffer."""
+        if isinstance(source, (bytes, bytearray, memoryview, np.ndarray)):
+            key = self.memory_key(np.frombuffer(source, dtype=np.uint8))
+            with self._lock:
+                self._entries.pop(key, None)
+            return
+        try:
+            st = os.stat(source)
+        except OSError:
+            return
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == 'file' and key[1:3] == (st.st_dev, st.st_ino):
+                    del self._entries[key]
+
+    def clear(self):
+        """Drop every entry and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize,
+                             len(self._entries))
+
+
+header_cache = HeaderCache()
@@ -1,7 +1,17 @@
+import mmap as _mmap
+import os
+
 import numpy as np
 from warnings import warn
 
-from .ojph_bindings import J2CInfile, MemInfile, Codestream
+from ._header_cache import header_cache, header_info
+from .ojph_bindings import (
+    J2CInfile, MemInfile, Codestream, crop_j2c_to_region, j2c_codestream_size,
+    read_j2c_level_fd,
+)
+
+# Codestreams are binary; on Windows the fd must be opened O_BINARY.
+_O_RDONLY_BINARY = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
 
 def imread(
     uri,
@@ -15,6 +25,14 @@ def imread(
     level=0,
     skipped_res_for_data=None,
     skipped_res_for_recon=None,
+    region=None,
+    mmap=False,
+    dtype=None,
+    scale=None,
+    value_offset=None,
+    shift=None,
+    window=None,
+    lut=None,
     **kwargs,
 ):
     if index is not None:
@@ -26,10 +44,19 @@ def imread(
     if format_hint is not None:
         warn(f"format_hint {format_hint} is ignored", stacklevel=2)
 
-    return OJPHImageFile(uri, channel_order=channel_order, offset=None).read_image(
+    return OJPHImageFile(
+        uri, channel_order=channel_order, offset=offset, mmap=mmap,
+    ).read_image(
         level=level,
         skipped_res_for_data=skipped_res_for_data,
         skipped_res_for_recon=skipped_res_for_recon,
+        region=region,
+        dtype=dtype,
+        scale=scale,
+        value_offset=value_offset,
+        shift=shift,
+        window=window,
+        lut=lut,
     )
 
 
@@ -40,7 +67,14 @@ def imread_from_memory(
     level=0,
     skipped_res_for_data=None,
     skipped_res_for_recon=None,
+    region=None,
     out=None,
+    dtype=None,
+    scale=None,
+    value_offset=None,
+    shift=None,
+    window=None,
+    lut=None,
 ):
     """Read a JPEG2000 image from memory data.
 
@@ -56,6 +90,24 @@ def imread_from_memory(
         Number of fine resolutions to skip during decoding.
     skipped_res_for_recon : int, optional
         Number of fine resolutions to skip during reconstruction.
+    region : tuple of int, optional
+        ``(y0, y1, x0, x1)`` window to decode, in the coordinates of the
+        reconstructed resolution. Only the tiles that intersect it are
+        decoded.
+    out : numpy.ndarray, optional
+        Buffer to decode into, with the shape of the level (or region).
+    dtype : numpy.dtype, optional
+        The image dtype (the default), or float16 or float32.
+    scale, value_offset : float, optional
+        A float output receives ``value * scale + value_offset``, computed
+        in the native line copy. Default: 1 and 0.
+    shift : int, optional
+        Decode into uint8 as ``value >> shift``, clipped to [0, 255].
+    window : tuple of float, optional
+        Decode into uint8, stretching ``(low, high)`` to [0, 255].
+    lut : numpy.ndarray, optional
+        Decode into uint8 through a 1-D uint8 lookup table indexed by
+        ``value - dtype.min``; values past its end take its last entry.
 
     Returns
     -------
@@ -74,73 +126,61 @@ def imread_from_memory(
         level=level,
         skipped_res_for_data=skipped_res_for_data,
         skipped_res_for_recon=skipped_res_for_recon,
+        region=region,
         out=out,
+        dtype=dtype,
+        scale=scale,
+        value_offset=value_offset,
+        shift=shift,
+        window=window,
+        lut=lut,
     )
 
 
 class OJPHImageFile:
-    def __init__(self, filename, *, mode='r', channel_order=None, offset=None):
+    """A JPEG2000 codestream in a file, in memory, or behind an infile.
+
+    With ``mmap=True`` a file is memory-mapped read-only and decoded from
+    the mapping without copying it, so the page cache is shared by every
+    process reading the same file. Full decodes advise the kernel of
+    sequential access, region reads of random access. The file is mapped
+    for each read and unmapped once the decode is done, so it is not held
+    open (or, on Windows, locked) between reads.
+    """
+
+    def __init__(self, filename, *, mode='r', channel_order=None, offset=None,
+                 mmap=False):
         if mode != 'r':
             raise ValueError(f"We only support mode = 'r' for now. Got {mode}.")
         self._codestream = None
         self._ojph_file = None
         self._filename = filename
+        self._data = None
+        self._level_data = None
+        self._mmap = None
+        self._use_mmap = mmap and not isinstance(filename, MemInfile)
+        self._offset = offset
         self._is_mem_file = False
+        self._reuse_codestream = False
+        self._kept_codestream = None
         if isinstance(filename, MemInfile):
             self._ojph_file = filename
             self._is_mem_file = True
+            self._codestream = Codestream()
+            self._codestream.read_headers(self._ojph_file)
+            info = header_info(self._codestream)
         else:
-            ojph_file = J2CInfile()
-            ojph_file.open(str(filename))
-            if offset is not None:
-                ojph_file.seek(offset, 0)
-            self._ojph_file = ojph_file
-
-        self._codestream = Codestream()
-        self._codestream.read_headers(self._ojph_file)
-
-        siz = self._codestream.access_siz()
-        extents = siz.get_image_extent()
-        num_components = siz.get_num_components()
-
-        self._is_planar = self._codestream.is_planar()
-        self._num_components = num_components
-        self._channel_order = channel_order
-
-        cod = self._codestream.access_cod()
-        self._num_decompositions = cod.get_num_decompositions()
-        self._progression_order = cod.get_progression_order_as_string()
-        self._is_predict_only = cod.is_predict_only()
-
-        if self._channel_order is None:
-            if cod.is_using_color_transform():
-                self._channel_order = 'HWC'
-            else:
-                self._channel_order = 'HWC' if self._is_planar else 'CHW'
-
-        self._shape = extents.y, extents.x
-        if self._num_components > 1:
-            if self._channel_order == "HWC":
-                self._shape = self._shape + (self._num_components,)
-            else:
-                self._shape = (self._num_components,) + self._shape
-
-        bit_depth = siz.get_bit_depth(0)
-        is_signed = siz.is_signed(0)
-        if bit_depth == 8 and not is_signed:
-            self._dtype = np.uint8
-        elif bit_depth == 8 and is_signed:
-            self._dtype = np.int8
-        elif bit_depth == 16 and not is_signed:
-            self._dtype = np.uint16
-        elif bit_depth == 16 and is_signed:
-            self._dtype = np.int16
-        elif bit_depth == 32 and not is_signed:
-            self._dtype = np.uint32
-        elif bit_depth == 32 and is_signed:
-            self._dtype = np.int32
-        else:
-            raise ValueError(f"Unsupported bit depth: {bit_depth}, signed: {is_signed}")
+            # The header is only read on a cache miss; otherwise the file is
+            # not opened until the first read_image.
+            key = header_cache.file_key(filename, offset)
+            info = None if key is None else header_cache.get(key)
+            if info is None:
+                self._open_file()
+                info = header_info(self._codestream)
+                if key is not None:
+                    header_cache.put(key, info)
+
+        self._init_from_header(info, channel_order)
 
     @classmethod
     def from_memory(cls, data, *, channel_order=None, offset=None):
@@ -158,64 +198,68 @@ class OJPHImageFile:
             An instance configured to read from the memory data.
         """
         instance = cls.__new__(cls)
-        instance._channel_order = channel_order
         instance._codestream = None
         instance._ojph_file = None
         instance._filename = None
+        instance._data = data
+        instance._level_data = None
+        instance._mmap = None
+        instance._use_mmap = False
+        instance._offset = offset
+        instance._is_mem_file = False
+        instance._reuse_codestream = False
+        instance._kept_codestream = None
+
+        key = header_cache.memory_key(instance._read_data())
+        info = None if key is None else header_cache.get(key)
+        if info is None:
+            instance._open_file()
+            info = header_info(instance._codestream)
+            if key is not None:
+                header_cache.put(key, info)
+
+        instance._init_from_header(info, channel_order)
+        return instance
+
+    def _init_from_header(self, info, channel_order):
+        self._is_planar = info.is_planar
+        self._num_components = info.num_components
+        self._channel_order = channel_order
 
-        ojph_file = MemInfile()
-        ojph_file.open(data)
-        if offset is not None:
-            ojph_file.seek(offset, 0)
-        instance._ojph_file = ojph_file
-        instance._codestream = Codestream()
-        instance._codestream.read_headers(ojph_file)
-
-        siz = instance._codestream.access_siz()
-        extents = siz.get_image_extent()
-        num_components = siz.get_num_components()
-
-        instance._is_planar = instance._codestream.is_planar()
-        instance._num_components = num_components
-        instance._channel_order = channel_order
-
-        cod = instance._codestream.access_cod()
-        instance._num_decompositions = cod.get_num_decompositions()
-        instance._progression_order = cod.get_progression_order_as_string()
-        instance._is_predict_only = cod.is_predict_only()
-
-        if instance._channel_order is None:
-            if cod.is_using_color_transform():
-                instance._channel_order = 'HWC'
+        self._num_decompositions = info.num_decompositions
+        self._progression_order = info.progression_order
+        self._is_predict_only = info.is_predict_only
+
+        if self._channel_order is None:
+            if info.uses_color_transform:
+                self._channel_order = 'HWC'
             else:
-                instance._channel_order = 'HWC' if instance._is_planar else 'CHW'
+                self._channel_order = 'HWC' if self._is_planar else 'CHW'
 
-        instance._shape = extents.y, extents.x
-        if instance._num_components > 1:
-            if instance._channel_order == "HWC":
-                instance._shape = instance._shape + (instance._num_components,)
+        self._shape = info.height, info.width
+        if self._num_components > 1:
+            if self._channel_order == "HWC":
+                self._shape = self._shape + (self._num_components,)
             else:
-                instance._shape = (instance._num_components,) + instance._shape
+                self._shape = (self._num_components,) + self._shape
 
-        bit_depth = siz.get_bit_depth(0)
-        is_signed = siz.is_signed(0)
+        bit_depth = info.bit_depth
+        is_signed = info.is_signed
         if bit_depth == 8 and not is_signed:
-            instance._dtype = np.uint8
+            self._dtype = np.uint8
         elif bit_depth == 8 and is_signed:
-            instance._dtype = np.int8
+            self._dtype = np.int8
         elif bit_depth == 16 and not is_signed:
-            instance._dtype = np.uint16
+            self._dtype = np.uint16
         elif bit_depth == 16 and is_signed:
-            instance._dtype = np.int16
+            self._dtype = np.int16
         elif bit_depth == 32 and not is_signed:
-            instance._dtype = np.uint32
+            self._dtype = np.uint32
         elif bit_depth == 32 and is_signed:
-            instance._dtype = np.int32
+            self._dtype = np.int32
         else:
             raise ValueError(f"Unsupported bit depth: {bit_depth}, signed: {is_signed}")
 
-        return instance
-
     @property
     def shape(self):
         return self._shape
@@ -299,11 +343,111 @@ class OJPHImageFile:
         else:
             return (level_height, level_width, self._num_components)
 
-    def _open_file(self):
-        self._ojph_file = J2CInfile()
-        self._ojph_file.open(self._filename)
-        self._codestream = Codestream()
-        self._codestream.read_headers(self._ojph_file)
+    def _open_file(self, level=None):
+        if self._use_mmap and self._mmap is None:
+            self._map_file()
+        if self._data is not None:
+            infile = MemInfile()
+            infile.open(self._read_data())
+        elif level is not None:
+            # Read only the tile-parts a decode of ``level`` needs.
+            self._level_data = self._read_level(level)
+            infile = MemInfile()
+            infile.open(self._level_data)
+        else:
+            infile = J2CInfile()
+            infile.open(str(self._filename))
+            if self._offset is not None:
+                infile.seek(self._offset, 0)
+        self._read_headers(infile)
+
+    def _open_memory(self, data):
+        """Replace the codestream with one over the bytes ``data``."""
+        self._close_codestream_and_file()
+        infile = MemInfile()
+        infile.open(data)
+        self._read_headers(infile)
+
+    def _read_headers(self, infile):
+        """Read the headers of ``infile`` into a codestream. With
+        ``_reuse_codestream`` set (see :class:`Decoder`) one codestream is
+        kept and restarted in place for every read, keeping its
+        allocations, instead of building a new one each time."""
+        self._ojph_file = infile
+        if self._kept_codestream is not None:
+            self._codestream = self._kept_codestream
+            self._codestream.restart()
+        else:
+            self._codestream = Codestream()
+            if self._reuse_codestream:
+                self._kept_codestream = self._codestream
+        self._codestream.read_headers(infile)
+
+    def _map_file(self):
+        # The whole file is mapped: offset 0 is always aligned to the
+        # allocation granularity, and pages are only touched when decoded.
+        with open(self._filename, 'rb') as f:
+            self._mmap = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+        self._data = np.frombuffer(self._mmap, dtype=np.uint8)
+
+    def _unmap_file(self):
+        # The mapping can only be closed once no array views it: the infile
+        # and codestream over it must already be released.
+        if self._mmap is not None:
+            self._data = None
+            self._mmap.close()
+            self._mmap = None
+
+    def _advise(self, option):
+        # madvise is a hint, and missing on some platforms.
+        option = getattr(_mmap, option, None)
+        if option is not None and hasattr(self._mmap, 'madvise'):
+            self._mmap.madvise(option)
+
+    def _read_data(self):
+        """The codestream bytes, or None when only an infile was given."""
+        offset = 0 if self._offset is None else self._offset
+        if self._data is not None:
+            return self._data[offset:]
+        if self._is_mem_file:
+            return None
+        if self._level_data is not None:
+            return self._level_data
+        return np.fromfile(self._filename, dtype=np.uint8, offset=offset)
+
+    def _read_level(self, level):
+        """The codestream in the file, reduced to what ``level`` needs.
+
+        The main header is read first; when its TLM markers index the
+        tile-parts, only those of the resolutions kept at ``level`` are read,
+        with aligned ``pread`` calls. Otherwise this is the whole codestream,
+        which ends at its EOC marker, not at the end of the file: a
+        codestream stored inside a larger container is read without the rest.
+        """
+        offset = 0 if self._offset is None else self._offset
+        fd = os.open(self._filename, _O_RDONLY_BINARY)
+        try:
+            nbytes = j2c_codestream_size(
+                fd, offset, os.fstat(fd).st_size - offset)
+            return read_j2c_level_fd(fd, offset, nbytes, level)
+        finally:
+            os.close(fd)
+
+    def _check_region(self, region, level):
+        if len(region) != 4:
+            raise ValueError(f"region must be (y0, y1, x0, x1), got {region}")
+        y0, y1, x0, x1 = (int(v) for v in region)
+        level_shape = self.get_level_shape(level)
+        if self._num_components == 1 or self._channel_order == 'HWC':
+            height, width = level_shape[:2]
+        else:
+            height, width = level_shape[1:]
+        if not (0 <= y0 < y1 <= height and 0 <= x0 < x1 <= width):
+            raise ValueError(
+                f"region {region} is empty or outside the image of shape "
+                f"({height}, {width}) at level {level}"
+            )
+        return y0, y1, x0, x1
 
     def read_image(
         self,
@@ -311,11 +455,38 @@ class OJPHImageFile:
         level=0,
         skipped_res_for_data=None,
         skipped_res_for_recon=None,
+        region=None,
         out=None,
+        dtype=None,
+        scale=None,
+        value_offset=None,
+        shift=None,
+        window=None,
+        lut=None,
     ):
-        if self._codestream is None:
-            self._open_file()
-
+        """Decode the image, or a window of it, at a reduced resolution.
+
+        With ``region=(y0, y1, x0, x1)``, given in the coordinates of the
+        reconstructed resolution, only the tiles intersecting the window are
+        decoded and the result (or ``out``) has the window's shape. For an
+        untiled codestream the whole level is still decoded, but only the
+        window is written out.
+
+        With a float16 or float32 ``dtype`` (or ``out``), every sample is
+        written as ``value * scale + value_offset`` (default: 1 and 0), fused
+        into the native line copy; ``scale=1 / 255`` normalizes 8-bit data to
+        [0, 1] without an integer temporary.
+
+        ``shift``, ``window=(low, high)`` or a uint8 ``lut`` (at most one)
+        decode into uint8 instead, mapping each sample as ``value >> shift``,
+        by stretching the window to [0, 255], or as
+        ``lut[value - dtype.min]``, clipped to [0, 255] (or the end of the
+        table) in the same copy; a preview of 16-bit data needs no 16-bit
+        intermediate.
+        """
+        output_map = self._output_map(shift, window, lut)
+        dtype = self._output_dtype(dtype, out, scale, value_offset,
+                                   mapped=bool(output_map))
         if skipped_res_for_data is None:
             skipped_res_for_data = level
         if skipped_res_for_recon is None:
@@ -332,14 +503,42 @@ class OJPHImageFile:
                 f"cannot be greater than the number of decompositions ({self._num_decompositions})"
             )
 
+        if self._data is None and not self._is_mem_file and not self._use_mmap:
+            # A file: whatever was opened to read the header is replaced by
+            # just the bytes this level needs.
+            self._close_codestream_and_file()
+            self._open_file(level=skipped_res_for_data)
+        elif self._codestream is None:
+            self._open_file()
+        self._advise('MADV_SEQUENTIAL' if region is None else 'MADV_RANDOM')
+
+        row_offset = col_offset = 0
+        cropped = None
+        if region is not None:
+            region = self._check_region(region, skipped_res_for_recon)
+            row_offset, col_offset = region[0], region[2]
+            data = self._read_data()
+            if data is not None:
+                cropped, row_offset, col_offset = crop_j2c_to_region(
+                    data, skipped_res_for_recon, region)
+            # A view of the mapping would keep it from being closed below.
+            del data
+            if cropped is not None:
+                # Decode the codestream of just the intersecting tiles.
+                self._open_memory(cropped)
+
         self._codestream.restrict_input_resolution(
             skipped_res_for_data,
             skipped_res_for_recon,
         )
         siz = self._codestream.access_siz()
 
-        height = siz.get_recon_height(0)
-        width = siz.get_recon_width(0)
+        if region is None:
+            height = siz.get_recon_height(0)
+            width = siz.get_recon_width(0)
+        else:
+            height = region[1] - region[0]
+            width = region[3] - region[2]
         self._codestream.create()
 
         if self._num_components == 1:
@@ -352,19 +551,14 @@ class OJPHImageFile:
         if out is None:
             # every sample is written by pull_all_components below, so the
             # zero-fill of np.zeros would be pure overhead
-            image = np.empty(shape, dtype=self._dtype)
+            image = np.empty(shape, dtype=dtype)
         else:
-            if out.dtype != self._dtype:
-                raise ValueError(
-                    f"dtype mismatch. out was provided with {out.dtype} but it must be {self._dtype}"
-                )
             # Potentially collapse any additional dimensions.
             # copy=False (numpy >= 2.1) makes numpy raise instead of silently
             # returning a copy: we must decode into the caller's buffer.
             image = np.reshape(out, shape, copy=False)
 
-
-        if self._dtype in [np.uint32, np.int32]:
+        if output_map or dtype.kind == 'f' or dtype in [np.uint32, np.int32]:
             min_val = None
             max_val = None
         else:
@@ -372,19 +566,337 @@ class OJPHImageFile:
             min_val = iinfo.min
             max_val = iinfo.max
 
-        self._codestream.pull_all_components(image, self._num_components, self._channel_order, min_val, max_val)
+        self._codestream.pull_all_components(
+            image, self._num_components, self._channel_order, min_val, max_val,
+            row_offset, col_offset,
+            1.0 if scale is None else scale,
+            0.0 if value_offset is None else value_offset,
+            **output_map)
 
         self._close_codestream_and_file()
         return image
 
+    def _output_map(self, shift, window, lut):
+        """Keyword arguments of the native uint8 mapping, or an empty dict."""
+        given = [name for name, value in
+                 (('shift', shift), ('window', window), ('lut', lut))
+                 if value is not None]
+        if not given:
+            return {}
+        if len(given) > 1:
+            raise ValueError(
+                f"Give at most one of shift, window and lut, got {given}")
+        if shift is not None:
+            if not 0 <= shift <= 31:
+                raise ValueError(f"shift must be in [0, 31], got {shift}")
+            return {'shift': int(shift)}
+        if window is not None:
+            low, high = window
+            if not low < high:
+                raise ValueError(
+                    f"window must be (low, high) with low < high, got {window}")
+            return {'window': (float(low), float(high))}
+        lut = np.asarray(lut)
+        if lut.dtype != np.uint8 or lut.ndim != 1 or lut.size == 0:
+            raise ValueError(
+                f"lut must be a non-empty 1-D uint8 array, got {lut.dtype} "
+                f"with shape {lut.shape}")
+        dtype = np.dtype(self._dtype)
+        if dtype.kind == 'i' and dtype.itemsize > 2:
+            raise ValueError("lut needs an 8- or 16-bit image")
+        lut_offset = -int(np.iinfo(dtype).min) if dtype.kind == 'i' else 0
+        return {'lut': np.ascontiguousarray(lut), 'lut_offset': lut_offset}
+
+    def _output_dtype(self, dtype, out, scale, value_offset, mapped=False):
+        """The dtype decoded into: the image dtype, or float16/float32, or
+        uint8 when the samples are ``mapped``."""
+        if out is not None:
+            if dtype is not None and np.dtype(dtype) != out.dtype:
+                raise ValueError(
+                    f"dtype ({np.dtype(dtype)}) does not match out ({out.dtype})")
+            dtype = out.dtype
+        if mapped:
+            dtype = np.dtype(np.uint8 if dtype is None else dtype)
+            if dtype != np.uint8:
+                raise ValueError(
+                    f"shift, window and lut decode into uint8, got {dtype}")
+            if scale is not None or value_offset is not None:
+                raise ValueError(
+                    "scale and value_offset only apply to float16 and float32 "
+                    "outputs")
+            return dtype
+        dtype = np.dtype(self._dtype if dtype is None else dtype)
+        if dtype.kind == 'f':
+            if dtype.itemsize not in (2, 4):
+                raise ValueError(
+                    f"A float output must be float16 or float32, got {dtype}")
+        elif scale is not None or value_offset is not None:
+            raise ValueError(
+                "scale and value_offset only apply to float16 and float32 "
+                "outputs")
+        elif dtype != self._dtype:
+            if out is not None:
+                raise ValueError(
+                    f"dtype mismatch. out was provided with {out.dtype} but it must be {self._dtype}"
+                )
+            raise ValueError(
+                f"dtype must be {np.dtype(self._dtype)}, float16 or float32, "
+                f"got {dtype}")
+        return dtype
+
+    def iter_rows(self, stripe_height, *, level=0):
+        """Decode the image a stripe of rows at a time.
+
+        The codestream is decoded with interleaved line exchange, so each
+        stripe is pulled as soon as its rows are reconstructed and the whole
+        image is never held decoded. The compressed codestream (only the
+        tile-parts ``level`` needs, for a file) is still read up front.
+
+        Parameters
+        ----------
+        stripe_height : int
+            Rows per stripe. The last stripe holds the remaining rows.
+        level : int, optional
+            Resolution level to read (default: 0 for full resolution).
+
+        Yields
+        ------
+        numpy.ndarray
+            Successive stripes of the level, ``(rows, width[, channels])`` or
+            ``(channels, rows, width)`` for the 'CHW' channel order. Every
+            stripe is a view of one buffer that the next stripe overwrites;
+            copy a stripe to keep it.
+
+        The codestream is in use until the iteration ends; do not call
+        :meth:`read_image` on this file while iterating.
+        """
+        if stripe_height < 1:
+            raise ValueError(f"stripe_height must be >= 1, got {stripe_height}")
+        shape = self.get_level_shape(level)
+
+        if self._data is None and not self._is_mem_file and not self._use_mmap:
+            self._close_codestream_and_file()
+            self._open_file(level=level)
+        elif self._codestream is None:
+            self._open_file()
+        self._advise('MADV_SEQUENTIAL')
+
+        row_axis = 1 if self._num_components > 1 and self._channel_order == 'CHW' else 0
+        height = shape[row_axis]
+        stripe_shape = list(shape)
+        stripe_shape[row_axis] = min(stripe_height, height)
+        buffer = np.empty(stripe_shape, dtype=self._dtype)
+
+        if self._dtype in [np.uint32, np.int32]:
+            min_val = None
+            max_val = None
+        else:
+            iinfo = np.iinfo(self._dtype)
+            min_val = iinfo.min
+            max_val = iinfo.max
+
+        try:
+            # Interleaved: the codestream hands out every component of a row
+            # before the next row, so a stripe is complete once pulled.
+            self._codestream.set_planar(False)
+            self._codestream.restrict_input_resolution(level, level)
+            self._codestream.create()
+            for start in range(0, height, stripe_height):
+                rows = min(stripe_height, height - start)
+                stripe = buffer[:, :rows] if row_axis else buffer[:rows]
+                self._codestream.pull_all_components(
+                    stripe, self._num_components, self._channel_order,
+                    min_val, max_val, 0, 0)
+                yield stripe
+        finally:
+            self._close_codestream_and_file()
+
     def _close_codestream_and_file(self):
-        if self._codestream is not None:
+        if (self._codestream is not None
+                and self._codestream is not self._kept_codestream):
             self._codestream.close()
             # The codestream will close the infile automatically
         elif self._ojph_file is not None:
+            # A kept codestream stays open to be restarted by the next read.
             self._ojph_file.close()
         self._codestream = None
         self._ojph_file = None
+        self._level_data = None
+        self._unmap_file()
 
     def __del__(self):
         self._close_codestream_and_file()
+
+
+class Decoder:
+    """A decode session over one codestream, for repeated reads.
+
+    The codestream is read into memory and its main header parsed once, on
+    construction. Every :meth:`read` then decodes straight from memory --
+    any level, region or subset of components -- without reopening the file
+    or touching the disk again. Of a file, only the bytes of the codestream
+    itself are read, so a codestream inside a larger container (a TIFF page,
+    say) does not load the rest.
+
+    One native codestream serves every read: it is restarted in place
+    between reads, which keeps its allocations, and re-reads the main
+    header from memory.
+
+    Parameters
+    ----------
+    source : str or path-like or bytes-like
+        A file name, or the compressed codestream itself.
+    channel_order : str, optional
+        Channel order of multi-component results ('HWC' or 'CHW').
+    offset : int, optional
+        Byte offset of the codestream within ``source``.
+    nbytes : int, optional
+        Length of the codestream. By default it is found from the TLM index
+        of a file's main header, or by walking its tile-part headers.
+    """
+
+    def __init__(self, source, *, channel_order=None, offset=None,
+                 nbytes=None):
+        offset = 0 if offset is None else offset
+        if isinstance(source, (bytes, bytearray, memoryview, np.ndarray)):
+            data = np.frombuffer(source, dtype=np.uint8)[offset:]
+            if nbytes is not None:
+                data = data[:nbytes]
+        else:
+            data = self._read_codestream(source, offset, nbytes)
+        self._data = data
+        self._file = OJPHImageFile.from_memory(data, channel_order=channel_order)
+        self._file._reuse_codestream = True
+        self._scratch = None
+
+    @staticmethod
+    def _read_codestream(filename, offset, nbytes):
+        if nbytes is None:
+            fd = os.open(filename, _O_RDONLY_BINARY)
+            try:
+                nbytes = j2c_codestream_size(
+                    fd, offset, os.fstat(fd).st_size - offset)
+            finally:
+                os.close(fd)
+        data = np.fromfile(filename, dtype=np.uint8, count=nbytes,
+                           offset=offset)
+        if data.size != nbytes:
+            raise ValueError(
+                f"{filename} ends within the codestream at offset {offset}")
+        return data
+
+    @property
+    def shape(self):
+        return self._file.shape
+
+    @property
+    def dtype(self):
+        return self._file.dtype
+
+    @property
+    def levels(self):
+        return self._file.levels
+
+    @property
+    def num_components(self):
+        return self._file._num_components
+
+    @property
+    def channel_order(self):
+        return self._file._channel_order
+
+    @property
+    def progression_order(self):
+        return self._file.progression_order
+
+    def get_level_shape(self, level):
+        return self._file.get_level_shape(level)
+
+    def read(
+        self,
+        *,
+        level=0,
+        skipped_res_for_data=None,
+        skipped_res_for_recon=None,
+        components=None,
+        region=None,
+        out=None,
+    ):
+        """Decode the image, or part of it.
+
+        Parameters
+        ----------
+        level : int, optional
+            Resolution level to read (default: 0 for full resolution).
+        components : int or sequence of int, optional
+            Components to return, in order. By default all of them.
+        region : tuple of int, optional
+            ``(y0, y1, x0, x1)`` window to decode at the requested level.
+        out : numpy.ndarray, optional
+            Buffer to decode into, with the shape of the result.
+
+        The remaining arguments are those of
+        :meth:`OJPHImageFile.read_image`.
+        """
+        if self._file is None:
+            raise ValueError("I/O operation on closed Decoder")
+        read_kwargs = dict(
+            level=level,
+            skipped_res_for_data=skipped_res_for_data,
+            skipped_res_for_recon=skipped_res_for_recon,
+            region=region,
+        )
+        if components is None:
+            return self._file.read_image(out=out, **read_kwargs)
+
+        components = np.atleast_1d(components)
+        num_components = self.num_components
+        if ((components < -num_components) | (components >= num_components)).any():
+            raise ValueError(
+                f"components {components.tolist()} out of range for an image "
+                f"with {num_components} components"
+            )
+        if num_components == 1:
+            # A single-component image has no channel axis to select from.
+            return self._file.read_image(out=out, **read_kwargs)
+
+        # OpenJPH decodes every component; the subset is taken from a
+        # scratch buffer that is kept for the next read of the same shape.
+        scratch = self._scratch
+        if skipped_res_for_recon is None:
+            skipped_res_for_recon = level
+        if region is None:
+            shape = self.get_level_shape(skipped_res_for_recon)
+        else:
+            y0, y1, x0, x1 = self._file._check_region(region, skipped_res_for_recon)
+            height, width = y1 - y0, x1 - x0
+            if self.channel_order == 'CHW':
+                shape = (num_components, height, width)
+            else:
+                shape = (height, width, num_components)
+        if scratch is None or scratch.shape != shape:
+            scratch = np.empty(shape, dtype=self.dtype)
+        self._file.read_image(out=scratch, **read_kwargs)
+        self._scratch = scratch
+
+        if self.channel_order == 'CHW':
+            image = scratch[components]
+        else:
+            image = scratch[..., components]
+        if out is None:
+            return image
+        out[...] = image
+        return out
+
+    def close(self):
+        if self._file is not None:
+            self._file._close_codestream_and_file()
+        self._file = None
+        self._data = None
+        self._scratch = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,8 +1,12 @@
 import numpy as np
 import inspect
+import threading
 from collections.abc import Buffer
 
-from .ojph_bindings import Codestream, J2COutfile, MemOutfile, Point
+from .ojph_bindings import (
+    Codestream, EncodeConfig, FrameEncoder, J2COutfile, MemOutfile,
+    encode_batch, encode_into, encode_tiled,
+)
 
 
 class CompressedData(Buffer):
@@ -41,10 +45,40 @@ def imwrite_to_memory(
     tlm_marker=True,
     tileparts_at_resolutions=None,
     tileparts_at_components=None,
+    tile_size=None,
+    scale=None,
+    offset=None,
+    storage_dtype=None,
+    num_threads=1,
+    copy=True,
 ):
+    """Encode an image into a JPEG2000 codestream in memory.
+
+    Takes the same keyword arguments as :func:`imwrite`, plus:
+
+    Parameters
+    ----------
+    copy : bool, optional
+        By default the result is an exactly-sized copy of the codestream and
+        the encoder's buffer is freed. ``copy=False`` instead returns a
+        read-only view of that buffer, which it keeps alive, so no
+        compressed byte is copied. The buffer grows by doubling from 64 KiB,
+        so the view holds on to at least that much and up to twice the
+        codestream size: use it for large images consumed right away, not
+        for many small results kept around.
+
+    Returns
+    -------
+    numpy.ndarray
+        The codestream as a read-only 1-D ``uint8`` array.
+    """
     mem_outfile = MemOutfile()
     mem_outfile.open(65536, False)
-    codestream = Codestream()
+    # A threaded tiled encode does not go through a Codestream (see imwrite).
+    if tile_size is not None and num_threads != 1:
+        codestream = None
+    else:
+        codestream = Codestream()
     imwrite(
         mem_outfile,
         image,
@@ -58,19 +92,412 @@ def imwrite_to_memory(
         tlm_marker=tlm_marker,
         tileparts_at_resolutions=tileparts_at_resolutions,
         tileparts_at_components=tileparts_at_components,
+        tile_size=tile_size,
+        scale=scale,
+        offset=offset,
+        storage_dtype=storage_dtype,
+        num_threads=num_threads,
     )
-    data = bytes(mem_outfile.get_data())
-    codestream.close()
-    mem_outfile.close()
-    return np.frombuffer(data, dtype=np.uint8)
+    if copy:
+        data = bytes(mem_outfile.get_data())
+        if codestream is not None:
+            codestream.close()
+        mem_outfile.close()
+        return np.frombuffer(data, dtype=np.uint8)
+    # Closing the codestream would close, and free, the memory file; the
+    # array keeps it alive through CompressedData instead.
+    del codestream
+    return np.frombuffer(CompressedData(mem_outfile, None), dtype=np.uint8)
 
 
-def imwrite(
-    filename,
+def imwrite_into(
     image,
+    out,
+    *,
+    channel_order=None,
+    num_decompositions=None,
+    reversible=None,
+    wavelet=None,
+    qstep=None,
+    progression_order=None,
+    tlm_marker=True,
+    tileparts_at_resolutions=None,
+    tileparts_at_components=None,
+    tile_size=None,
+    scale=None,
+    offset=None,
+    storage_dtype=None,
+    num_threads=1,
+):
+    """Encode an image straight into a caller-provided buffer.
+
+    Takes the same keyword arguments as :func:`imwrite`. The codestream is
+    written directly into ``out``, with no intermediate buffer to grow and
+    copy.
+
+    Parameters
+    ----------
+    image : numpy.ndarray
+        The image to encode.
+    out : writable bytes-like
+        Destination buffer, e.g. a slot of a shared-memory arena. It must be
+        C-contiguous; its size in bytes is the capacity.
+
+    Returns
+    -------
+    int
+        The number of bytes of ``out`` holding the codestream.
+
+    Raises
+    ------
+    ValueError
+        If the codestream does not fit in ``out``. The message gives the
+        required size; the contents of ``out`` are then unspecified.
+    """
+    config = _encode_config(
+        image.shape,
+        image.dtype,
+        channel_order=channel_order,
+        num_decompositions=num_decompositions,
+        reversible=reversible,
+        wavelet=wavelet,
+        qstep=qstep,
+        progression_order=progression_order,
+        tlm_marker=tlm_marker,
+        tileparts_at_resolutions=tileparts_at_resolutions,
+        tileparts_at_components=tileparts_at_components,
+        tile_size=tile_size,
+        scale=scale,
+        offset=offset,
+        storage_dtype=storage_dtype,
+    )
+    # See imwrite: the native push loop expects native byte order.
+    if image.dtype.byteorder not in ("=", "|"):
+        image = np.asarray(image, dtype=image.dtype.newbyteorder('='))
+
+    return _encode_into(config, image, out, num_threads)
+
+
+def _encode_into(encoder, image, out, num_threads):
+    """Encode with ``encoder`` (an EncodeConfig, via encode_into, or a
+    FrameEncoder) into the caller's buffer ``out``."""
+    out = np.frombuffer(out, dtype=np.uint8)
+    if not out.flags.writeable:
+        raise ValueError("out must be a writable buffer")
+    if isinstance(encoder, FrameEncoder):
+        nbytes = encoder.encode_into(image, out, num_threads)
+    else:
+        nbytes = encode_into(encoder, image, out, num_threads)
+    if nbytes > out.nbytes:
+        raise ValueError(
+            f"out is too small: the codestream needs {nbytes} bytes but "
+            f"out holds {out.nbytes}."
+        )
+    return nbytes
+
+
+class Encoder:
+    """Encode many images of one shape and dtype with one set of parameters.
+
+    The keyword arguments are those of :func:`imwrite`. They are validated
+    once, into a native configuration shared by every :meth:`encode`, which
+    then runs entirely in native code with the GIL released.
+
+    One native codestream is kept for all the frames and reset in place
+    between them, so its line buffers and codeblock state are allocated
+    once. Each frame is encoded once, into a growable buffer that is also
+    kept between frames, and returned as a copy of exactly its size.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Shape of the images to encode.
+    dtype : numpy.dtype
+        Dtype of the images to encode.
+    """
+
+    def __init__(
+        self,
+        shape,
+        dtype,
+        *,
+        channel_order=None,
+        num_decompositions=None,
+        reversible=None,
+        wavelet=None,
+        qstep=None,
+        progression_order=None,
+        tlm_marker=True,
+        tileparts_at_resolutions=None,
+        tileparts_at_components=None,
+        tile_size=None,
+        scale=None,
+        offset=None,
+        storage_dtype=None,
+        num_threads=1,
+    ):
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype).newbyteorder('=')
+        self._config = _encode_config(
+            self._shape,
+            self._dtype,
+            channel_order=channel_order,
+            num_decompositions=num_decompositions,
+            reversible=reversible,
+            wavelet=wavelet,
+            qstep=qstep,
+            progression_order=progression_order,
+            tlm_marker=tlm_marker,
+            tileparts_at_resolutions=tileparts_at_resolutions,
+            tileparts_at_components=tileparts_at_components,
+            tile_size=tile_size,
+            scale=scale,
+            offset=offset,
+            storage_dtype=storage_dtype,
+        )
+        self._num_threads = num_threads
+        self._encoder = FrameEncoder(self._config)
+        # The native encoder holds one codestream, which a single frame at a
+        # time may use.
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def config(self):
+        """The native :class:`EncodeConfig` shared by every frame."""
+        return self._config
+
+    def _check(self, image):
+        image = np.asarray(image)
+        # See imwrite: the native push loop expects native byte order.
+        if image.dtype.byteorder not in ("=", "|"):
+            image = np.asarray(image, dtype=image.dtype.newbyteorder('='))
+        if image.shape != self._shape or image.dtype != self._dtype:
+            raise ValueError(
+                f"Encoder expects {self._shape} {self._dtype} images. Got "
+                f"{image.shape} {image.dtype}."
+            )
+        return image
+
+    def encode(self, image):
+        """Encode one image.
+
+        Returns
+        -------
+        numpy.ndarray
+            The codestream as a read-only 1-D ``uint8`` array.
+        """
+        image = self._check(image)
+        with self._lock:
+            out = self._encoder.encode(image, self._num_threads)
+        out.flags.writeable = False
+        return out
+
+    def encode_into(self, image, out):
+        """Encode one image into ``out``, as :func:`imwrite_into` does.
+
+        Returns
+        -------
+        int
+            The number of bytes of ``out`` holding the codestream.
+        """
+        image = self._check(image)
+        with self._lock:
+            return _encode_into(self._encoder, image, out, self._num_threads)
+
+
+class StreamingEncoder:
+    """Encode an image a stripe of rows at a time.
+
+    OpenJPH consumes an image line by line, so the rows are pushed straight
+    into the codestream as they arrive and no stripe is kept after
+    :meth:`push_rows` returns. Memory is bounded by the stripe height and the
+    compressed codestream, which OpenJPH holds until :meth:`close` writes it
+    out. This makes images larger than memory, such as mosaics stitched a
+    stripe at a time, encodable.
+
+    The keyword arguments are those of :func:`imwrite`.
+
+    Parameters
+    ----------
+    path_or_buffer : str or path-like or MemOutfile or file object
+        Destination file, a memory outfile to write into, or a writable
+        binary file object that receives the codestream on :meth:`close`.
+    shape : tuple of int
+        Shape of the whole image.
+    dtype : numpy.dtype
+        Dtype of the image.
+
+    Example
+    -------
+    >>> with StreamingEncoder('mosaic.j2c', (100000, 100000), 'uint16') as enc:
+    ...     for stripe in stitch_stripes():
+    ...         enc.push_rows(stripe)
+    """
+
+    def __init__(
+        self,
+        path_or_buffer,
+        shape,
+        dtype,
+        *,
+        channel_order=None,
+        num_decompositions=None,
+        reversible=None,
+        wavelet=None,
+        qstep=None,
+        progression_order=None,
+        tlm_marker=True,
+        tileparts_at_resolutions=None,
+        tileparts_at_components=None,
+        tile_size=None,
+        scale=None,
+        offset=None,
+        storage_dtype=None,
+    ):
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype).newbyteorder('=')
+        self._config = _encode_config(
+            self._shape,
+            self._dtype,
+            channel_order=channel_order,
+            num_decompositions=num_decompositions,
+            reversible=reversible,
+            wavelet=wavelet,
+            qstep=qstep,
+            progression_order=progression_order,
+            tlm_marker=tlm_marker,
+            tileparts_at_resolutions=tileparts_at_resolutions,
+            tileparts_at_components=tileparts_at_components,
+            tile_size=tile_size,
+            scale=scale,
+            offset=offset,
+            storage_dtype=storage_dtype,
+        )
+        self._rows = 0
+        self._target = None
+        self._owns_file = True
+        if isinstance(path_or_buffer, MemOutfile):
+            self._file = path_or_buffer
+            self._owns_file = False
+        elif hasattr(path_or_buffer, 'write'):
+            self._file = MemOutfile()
+            self._file.open(65536, False)
+            self._target = path_or_buffer
+        else:
+            self._file = J2COutfile()
+            self._file.open(str(path_or_buffer))
+
+        self._codestream = Codestream()
+        self._config.apply(self._codestream)
+        # Non-planar: the codestream asks for every component of a row
+        # before the next row, so a stripe holds whole rows.
+        self._codestream.set_planar(False)
+        self._codestream.write_headers(self._file, None, 0)
+        self._line = self._codestream.exchange(None, 0)
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def rows_pushed(self):
+        """The number of rows pushed so far."""
+        return self._rows
+
+    def push_rows(self, block):
+        """Encode the next rows of the image.
+
+        Parameters
+        ----------
+        block : numpy.ndarray
+            A stripe of the image: the full image shape with fewer rows,
+            ``(rows, width[, components])``, or ``(components, rows, width)``
+            for the 'CHW' channel order.
+        """
+        if self._codestream is None:
+            raise ValueError("I/O operation on closed StreamingEncoder")
+        block = np.asarray(block)
+        # See imwrite: the native push loop expects native byte order.
+        if block.dtype.byteorder not in ("=", "|"):
+            block = np.asarray(block, dtype=block.dtype.newbyteorder('='))
+        channel_order = self._config.channel_order
+        row_axis = channel_order.index('H')
+        if (block.ndim != len(self._shape)
+                or block.shape[:row_axis] != self._shape[:row_axis]
+                or block.shape[row_axis + 1:] != self._shape[row_axis + 1:]
+                or block.dtype != self._dtype):
+            raise ValueError(
+                f"Expected a stripe of the {self._shape} {self._dtype} image, "
+                f"with channel order {channel_order}. Got {block.shape} "
+                f"{block.dtype}."
+            )
+        rows = block.shape[row_axis]
+        height = self._shape[row_axis]
+        if self._rows + rows > height:
+            raise ValueError(
+                f"{self._rows + rows} rows pushed, more than the image height "
+                f"({height})."
+            )
+        self._line = self._codestream.push_rows(
+            self._line, block, self._config.num_components, channel_order,
+            self._config.scale, self._config.offset)
+        self._rows += rows
+
+    def close(self):
+        """Flush the codestream and close the destination.
+
+        Raises ValueError, after releasing the codestream, if fewer rows than
+        the image height were pushed.
+        """
+        if self._codestream is None:
+            return
+        height = self._shape[self._config.channel_order.index('H')]
+        if self._rows != height:
+            self._release()
+            raise ValueError(
+                f"Only {self._rows} of the {height} rows were pushed; the "
+                f"codestream is incomplete."
+            )
+        self._codestream.flush()
+        if self._target is not None:
+            self._target.write(self._file.get_data())
+        self._release()
+
+    def _release(self):
+        codestream, self._codestream = self._codestream, None
+        self._line = None
+        if self._owns_file:
+            # Closing the codestream also closes the file.
+            codestream.close()
+        # Otherwise closing it would close, and free, the caller's memory
+        # file; dropping it leaves the file to the caller.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._codestream is not None:
+            self._release()
+
+
+def imwrite_batch_to_memory(
+    images,
     *,
     channel_order=None,
-    codestream=None,
     num_decompositions=None,
     reversible=None,
     wavelet=None,
@@ -79,20 +506,116 @@ def imwrite(
     tlm_marker=True,
     tileparts_at_resolutions=None,
     tileparts_at_components=None,
+    tile_size=None,
+    scale=None,
+    offset=None,
+    storage_dtype=None,
+    num_threads=0,
+    concatenate=False,
 ):
+    """Encode many same-shaped images to memory concurrently.
+
+    All images share one set of encode parameters (the same keywords as
+    :func:`imwrite_to_memory`), which are validated once. The encodes then
+    run on native threads in a single call, with no Python in the loop.
+
+    Parameters
+    ----------
+    images : sequence of numpy.ndarray or numpy.ndarray
+        The images to encode. They must all have the same shape and dtype. A
+        stacked array is treated as a sequence along its first axis.
+    num_threads : int, optional
+        Number of native encode threads (default: 0, one per CPU).
+    concatenate : bool, optional
+        If True, return ``(data, offsets)``: every codestream concatenated in
+        one uint8 array, with codestream ``i`` at
+        ``data[offsets[i]:offsets[i + 1]]``.
+
+    Returns
+    -------
+    list of numpy.ndarray or tuple of numpy.ndarray
+        One read-only uint8 array per image, or ``(data, offsets)`` when
+        ``concatenate`` is True.
+    """
+    images = [np.asarray(image) for image in images]
+    # See imwrite: the native push loop expects native byte order.
+    images = [
+        np.asarray(image, dtype=image.dtype.newbyteorder('='))
+        if image.dtype.byteorder not in ("=", "|") else image
+        for image in images
+    ]
+    if not images:
+        data = np.empty(0, dtype=np.uint8)
+        offsets = np.zeros(1, dtype=np.int64)
+    else:
+        first = images[0]
+        for image in images[1:]:
+            if image.shape != first.shape or image.dtype != first.dtype:
+                raise ValueError(
+                    "All images must share the same shape and dtype. Got "
+                    f"{first.shape} {first.dtype} and {image.shape} {image.dtype}."
+                )
+        config = _encode_config(
+            first.shape,
+            first.dtype,
+            channel_order=channel_order,
+            num_decompositions=num_decompositions,
+            reversible=reversible,
+            wavelet=wavelet,
+            qstep=qstep,
+            progression_order=progression_order,
+            tlm_marker=tlm_marker,
+            tileparts_at_resolutions=tileparts_at_resolutions,
+            tileparts_at_components=tileparts_at_components,
+            tile_size=tile_size,
+            scale=scale,
+            offset=offset,
+            storage_dtype=storage_dtype,
+        )
+        data, offsets = encode_batch(config, images, num_threads)
+    data.flags.writeable = False
+    if concatenate:
+        return data, offsets
+    return [data[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+def _encode_config(
+    shape,
+    dtype,
+    *,
+    channel_order,
+    num_decompositions,
+    reversible,
+    wavelet,
+    qstep,
+    progression_order,
+    tlm_marker,
+    tileparts_at_resolutions,
+    tileparts_at_components,
+    tile_size=None,
+    scale=None,
+    offset=None,
+    storage_dtype=None,
+):
+    """Validate the encode arguments for an image of ``shape`` and ``dtype``.
+
+    Returns the :class:`EncodeConfig` consumed by ``EncodeConfig.apply`` and
+    the native encoders, with the channel order normalized.
+    """
+    ndim = len(shape)
     # Auto-detect channel order if not provided
     if channel_order is None:
-        if image.ndim == 2:
+        if ndim == 2:
             channel_order = 'HW'
         else:
             channel_order = 'HWC'
 
     channel_order = channel_order.upper()
 
-    if len(channel_order) != image.ndim:
+    if len(channel_order) != ndim:
         raise ValueError(
             f"The channel order ({channel_order}) must be consistent "
-            f"with the image dimensions ({image.ndim})."
+            f"with the image dimensions ({ndim})."
         )
 
     # Validate channel order format
@@ -103,37 +626,47 @@ def imwrite(
             f"Must be one of: {', '.join(valid_orders)}"
         )
 
-    if isinstance(filename, MemOutfile):
-        ojph_file = filename
-    else:
-        ojph_file = J2COutfile()
-        ojph_file.open(str(filename))
-
-    close_codestream = codestream is None
-    if codestream is None:
-        codestream = Codestream()
-
-    siz = codestream.access_siz()
-    width = image.shape[channel_order.index('W')]
-    height = image.shape[channel_order.index('H')]
-
-    siz.set_image_extent(Point(width, height))
+    dtype = np.dtype(dtype)
+    config = EncodeConfig()
+    config.channel_order = channel_order
+    config.width = shape[channel_order.index('W')]
+    config.height = shape[channel_order.index('H')]
     if 'C' in channel_order:
-        num_components = image.shape[channel_order.index('C')]
+        config.num_components = shape[channel_order.index('C')]
     else:
-        num_components = 1
-
-    bit_depth = image.dtype.itemsize * 8
-    is_signed = image.dtype.kind != 'u'
-    siz.set_num_components(num_components)
-    for i in range(num_components):
-        siz.set_component(
-            i,
-            Point(1, 1), # component downsampling
-            bit_depth,
-            is_signed,
+        config.num_components = 1
+    if dtype.kind == 'f':
+        # Float samples are quantized natively, as they are pushed, to
+        # round(value * scale + offset) in the range of storage_dtype.
+        if dtype.itemsize not in (2, 4):
+            raise ValueError(
+                f"Float images must be float16 or float32, got {dtype}."
+            )
+        storage_dtype = np.dtype(np.uint16 if storage_dtype is None else storage_dtype)
+        if storage_dtype.kind not in 'iu' or storage_dtype.itemsize > 2:
+            raise ValueError(
+                f"storage_dtype must be an 8- or 16-bit integer dtype, got "
+                f"{storage_dtype}."
+            )
+        if scale is None:
+            # A default of 1 would quietly store [0, 1] data as 0s and 1s.
+            raise ValueError(
+                "scale is required for float images: samples are stored as "
+                "round(value * scale + offset), e.g. scale=65535 for [0, 1] "
+                "data stored as uint16."
+            )
+        config.float_input = True
+        config.scale = scale
+        config.offset = 0.0 if offset is None else offset
+        dtype = storage_dtype
+    elif scale is not None or offset is not None or storage_dtype is not None:
+        raise ValueError(
+            "scale, offset and storage_dtype only apply to float16 and "
+            f"float32 images, got {dtype}."
         )
-    cod = codestream.access_cod()
+    config.bit_depth = dtype.itemsize * 8
+    config.is_signed = dtype.kind != 'u'
+
     if progression_order is None:
         progression_order = "RLCP"
 
@@ -144,7 +677,7 @@ def imwrite(
             f"Invalid progression_order '{progression_order}'. "
             f"Must be one of: {', '.join(sorted(valid_progressions))}"
         )
-    cod.set_progression_order(progression_order)
+    config.progression_order = progression_order
     # The wavelet kernel; 'rev53' and 'irv97' are the standard Part 1
     # kernels, selected by default through the reversible flag.  'rev13'
     # and 'rev12' are reversible predict-only kernels (JPEG 2000 Part 2,
@@ -176,25 +709,117 @@ def imwrite(
             )
     if reversible is None:
         reversible = True
-    cod.set_reversible(reversible)
+    config.reversible = reversible
     if wavelet == 'rev13':
-        cod.set_wavelet_kern(2)
+        config.wavelet_kern = 2
     elif wavelet == 'rev12':
-        cod.set_wavelet_kern(3)
-    cod.set_color_transform(False)
+        config.wavelet_kern = 3
     if num_decompositions is not None:
-        cod.set_num_decomposition(num_decompositions)
+        config.num_decompositions = num_decompositions
     if not reversible and qstep is not None:
-        codestream.access_qcd().set_irrev_quant(qstep)
-    codestream.set_planar(num_components > 1)
+        config.qstep = qstep
     if tileparts_at_resolutions is None:
         tileparts_at_resolutions = progression_order == "RLCP"
     if tileparts_at_components is None:
         tileparts_at_components = False
-    codestream.set_tilepart_divisions(tileparts_at_resolutions, tileparts_at_components)
-    codestream.request_tlm_marker(tlm_marker)
+    config.tileparts_at_resolutions = tileparts_at_resolutions
+    config.tileparts_at_components = tileparts_at_components
+    config.tlm_marker = tlm_marker
+    if tile_size is not None:
+        tile_height, tile_width = tile_size
+        if tile_height < 1 or tile_width < 1:
+            raise ValueError(
+                f"tile_size must be positive, got {tuple(tile_size)}."
+            )
+        config.tile_height = tile_height
+        config.tile_width = tile_width
+    return config
 
-    codestream.write_headers(ojph_file, None, 0)
+
+def imwrite(
+    filename,
+    image,
+    *,
+    channel_order=None,
+    codestream=None,
+    num_decompositions=None,
+    reversible=None,
+    wavelet=None,
+    qstep=None,
+    progression_order=None,
+    tlm_marker=True,
+    tileparts_at_resolutions=None,
+    tileparts_at_components=None,
+    tile_size=None,
+    scale=None,
+    offset=None,
+    storage_dtype=None,
+    num_threads=1,
+):
+    """Write a JPEG2000 codestream.
+
+    Parameters
+    ----------
+    filename : str or path-like or MemOutfile
+        Destination file, or a memory outfile to write into.
+    image : numpy.ndarray
+        The image to encode.
+    tile_size : tuple of int, optional
+        ``(tile_height, tile_width)`` to split the image into tiles. Tiles
+        are independently decodable, which also gives spatial random access
+        at read time. By default the whole image is a single tile.
+    num_threads : int, optional
+        Number of native threads encoding the tiles of a tiled image
+        concurrently (0: one per CPU). The default, 1, encodes on the calling
+        thread. Has no effect on a single-tile image. The threaded tiled
+        encode builds its own codestreams, so it cannot write through a
+        ``codestream`` given by the caller.
+    scale, offset : float, optional
+        For float16 and float32 images: each sample is stored as
+        ``round(value * scale + offset)``, clipped to the range of
+        ``storage_dtype`` (NaN is stored as its minimum). The quantization
+        is fused into the native encode loop. ``scale`` is required for
+        float images, as no default fits every value range: use e.g.
+        ``scale=65535`` to store [0, 1] data as uint16. ``offset`` defaults
+        to 0.
+    storage_dtype : numpy.dtype, optional
+        The 8- or 16-bit integer dtype float samples are stored as
+        (default: uint16).
+
+    The remaining keyword arguments select the coding parameters: the
+    wavelet and quantization, the number of decompositions, the progression
+    order, the tile-part divisions and the TLM marker.
+    """
+    tiled_threads = tile_size is not None and num_threads != 1
+    if tiled_threads and codestream is not None:
+        raise ValueError(
+            "codestream cannot be given for a threaded tiled encode "
+            f"(tile_size={tuple(tile_size)}, num_threads={num_threads}); "
+            "pass num_threads=1 to encode through it."
+        )
+    config = _encode_config(
+        image.shape,
+        image.dtype,
+        channel_order=channel_order,
+        num_decompositions=num_decompositions,
+        reversible=reversible,
+        wavelet=wavelet,
+        qstep=qstep,
+        progression_order=progression_order,
+        tlm_marker=tlm_marker,
+        tileparts_at_resolutions=tileparts_at_resolutions,
+        tileparts_at_components=tileparts_at_components,
+        tile_size=tile_size,
+        scale=scale,
+        offset=offset,
+        storage_dtype=storage_dtype,
+    )
+
+    if isinstance(filename, MemOutfile):
+        ojph_file = filename
+    else:
+        ojph_file = J2COutfile()
+        ojph_file.open(str(filename))
 
     # For native byte orders, even if the byte order of the input is
     # explicitely set
@@ -202,7 +827,27 @@ def imwrite(
     # and helps streamline code inside push_all_components
     if image.dtype.byteorder not in ("=", "|"):
         image = np.asarray(image,  dtype=image.dtype.newbyteorder('='))
-    codestream.push_all_components(image, num_components, channel_order)
+
+    if tiled_threads:
+        # OpenJPH encodes the tiles of one codestream serially; encode_tiled
+        # encodes them as independent codestreams on native threads and
+        # stitches those into a single multi-tile codestream.
+        encode_tiled(config, image, ojph_file, num_threads)
+        if ojph_file is not filename:
+            ojph_file.close()
+        return
+
+    close_codestream = codestream is None
+    if codestream is None:
+        codestream = Codestream()
+
+    config.apply(codestream)
+
+    codestream.write_headers(ojph_file, None, 0)
+
+    codestream.push_all_components(
+        image, config.num_components, config.channel_order,
+        config.scale, config.offset)
 
     codestream.flush()
     if close_codestream:
@@ -0,0 +1,156 @@
+"""Coroutines that decode and encode on a shared worker pool.
+
+The native decode and encode paths release the GIL, so the worker threads
+run them in parallel while the event loop stays free; results are handed
+back to the loop thread-safely by :meth:`asyncio.loop.run_in_executor`.
+
+At most ``max_workers`` jobs run at once. Once ``max_pending`` jobs are
+running or queued, further callers wait (asynchronously) for a slot
+instead of growing the queue, which keeps the latency of each job bounded
+under load.
+
+Example::
+
+    from ojph import aio
+
+    aio.configure(max_workers=8)
+    image = await aio.decode(data, level=2)
+"""
+import asyncio
+import functools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ._imread import imread_from_memory
+from ._imwrite import imwrite_to_memory
+from .ojph_bindings import read_j2c_fd_into
+
+__all__ = ['configure', 'decode', 'read_fd', 'encode']
+
+_lock = threading.Lock()
+_executor = None
+_max_workers = None
+_max_pending = None
+# asyncio primitives belong to one event loop, so each loop gets its own
+# semaphore over the shared pool.
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def configure(max_workers=None, max_pending=None):
+    """Size the shared worker pool.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Jobs that run concurrently. Defaults to ``os.cpu_count()``.
+    max_pending : int, optional
+        Jobs that may be running or queued before callers wait for a slot.
+        Defaults to twice ``max_workers``.
+
+    Jobs already submitted finish on the previous pool.
+    """
+    global _executor, _max_workers, _max_pending
+    if max_workers is not None and max_workers < 1:
+        raise ValueError(f"max_workers must be >= 1, got {max_workers}")
+    if max_pending is not None and max_pending < 1:
+        raise ValueError(f"max_pending must be >= 1, got {max_pending}")
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+        _max_workers = max_workers
+        _max_pending = max_pending
+        _semaphores.clear()
+
+
+def _limits():
+    max_workers = _max_workers or os.cpu_count() or 1
+    max_pending = _max_pending or 2 * max_workers
+    return max_workers, max(max_pending, max_workers)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            max_workers, _ = _limits()
+            _executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='ojph-aio')
+        return _executor
+
+
+def _get_semaphore(loop):
+    with _lock:
+        semaphore = _semaphores.get(loop)
+        if semaphore is None:
+            _, max_pending = _limits()
+            semaphore = asyncio.Semaphore(max_pending)
+            _semaphores[loop] = semaphore
+        return semaphore
+
+
+async def _run(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    semaphore = _get_semaphore(loop)
+    await semaphore.acquire()
+    try:
+        future = loop.run_in_executor(
+            _get_executor(), functools.partial(func, *args, **kwargs))
+    except BaseException:
+        semaphore.release()
+        raise
+    # A cancelled caller stops waiting, but the job keeps its worker; the
+    # slot is only given back once the job itself is done, so max_pending
+    # still bounds the work in the pool.
+    future.add_done_callback(lambda _: semaphore.release())
+    return await asyncio.shield(future)
+
+
+async def decode(data, **kwargs):
+    """Decode an in-memory codestream.
+
+    Takes the arguments of :func:`ojph.imread_from_memory` (``level``,
+    ``region``, ``channel_order``, ``out``, ...) and returns its result.
+    """
+    return await _run(imread_from_memory, data, **kwargs)
+
+
+def _clip_bounds(dtype):
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f' or dtype.itemsize > 2:
+        return None, None
+    info = np.iinfo(dtype)
+    return int(info.min), int(info.max)
+
+
+async def read_fd(fd, offset, nbytes, out, level=0, *, min_val=None,
+                  max_val=None, o_direct=False, channel_order='HWC'):
+    """Decode the codestream at ``[offset, offset+nbytes)`` of ``fd``.
+
+    Runs :func:`ojph.ojph_bindings.read_j2c_fd_into`, which reads only the
+    bytes ``level`` needs, into ``out``. The clip bounds default to the
+    range of ``out.dtype`` for 8- and 16-bit outputs.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``out``.
+    """
+    if min_val is None and max_val is None:
+        min_val, max_val = _clip_bounds(out.dtype)
+    await _run(read_j2c_fd_into, fd, offset, nbytes, out, level, min_val,
+               max_val, o_direct, channel_order=channel_order)
+    return out
+
+
+async def encode(image, **kwargs):
+    """Encode an image to memory.
+
+    Takes the arguments of :func:`ojph.imwrite_to_memory` and returns its
+    result.
+    """
+    return await _run(imwrite_to_memory, image, **kwargs)
@@ -0,0 +1,138 @@
+"""A numcodecs codec for storing chunks of Zarr arrays as JPEG2000.
+
+Importing this module registers :class:`OJPH` under the codec id
+``'ojph'``, so Zarr can open stores written with it::
+
+    import ojph.numcodecs
+    import zarr
+
+    z = zarr.open_array('slide.zarr', mode='w', shape=(40000, 30000),
+                        chunks=(1024, 1024), dtype='uint16',
+                        compressor=ojph.numcodecs.OJPH(reversible=True))
+
+Requires the optional ``numcodecs`` package.
+"""
+import numpy as np
+from numcodecs.abc import Codec
+from numcodecs.compat import ensure_contiguous_ndarray, ensure_ndarray_like
+from numcodecs.registry import register_codec
+
+from ._imread import OJPHImageFile
+from ._imwrite import imwrite_to_memory
+from .ojph_bindings import read_j2c_into
+
+__all__ = ['OJPH']
+
+
+class OJPH(Codec):
+    """JPEG2000 (HTJ2K) codec.
+
+    Chunks are 2-D images, or 3-D with ``channel_order`` set. Leading axes
+    of length 1 (for example the time and z axes of a 5-D image) are
+    dropped on encode and restored on decode.
+
+    :meth:`decode` decodes straight into the ``out`` buffer Zarr provides,
+    with the GIL released, so Zarr's threaded chunk loading decodes chunks
+    in parallel.
+
+    Parameters
+    ----------
+    level : int, optional
+        Resolution level that :meth:`decode` returns (default: 0 for full
+        resolution). Level ``n`` halves each image axis ``n`` times, rounding
+        up, which lets the reduced arrays of a multiscale store share the
+        chunks of the full-resolution one.
+    channel_order : str, optional
+        Channel order of 3-D chunks ('HWC' or 'CHW').
+    num_decompositions, reversible, wavelet, qstep, progression_order, \
+tlm_marker, tileparts_at_resolutions, tile_size, num_threads
+        Encode parameters; see :func:`ojph.imwrite_to_memory`.
+    """
+
+    codec_id = 'ojph'
+
+    def __init__(
+        self,
+        level=0,
+        channel_order=None,
+        num_decompositions=None,
+        reversible=None,
+        wavelet=None,
+        qstep=None,
+        progression_order=None,
+        tlm_marker=True,
+        tileparts_at_resolutions=None,
+        tile_size=None,
+        num_threads=1,
+    ):
+        if level < 0:
+            raise ValueError(f"level must be >= 0, got {level}")
+        if channel_order not in (None, 'HWC', 'CHW'):
+            raise ValueError(
+                f"channel_order must be None, 'HWC' or 'CHW', got {channel_order!r}")
+        self.level = level
+        self.channel_order = channel_order
+        self.num_decompositions = num_decompositions
+        self.reversible = reversible
+        self.wavelet = wavelet
+        self.qstep = qstep
+        self.progression_order = progression_order
+        self.tlm_marker = tlm_marker
+        self.tileparts_at_resolutions = tileparts_at_resolutions
+        # JSON configs hold lists; keep the attribute comparable after a
+        # round trip through get_config/from_config.
+        self.tile_size = None if tile_size is None else list(tile_size)
+        self.num_threads = num_threads
+
+    def encode(self, buf):
+        image = ensure_ndarray_like(buf)
+        ndim = 2 if self.channel_order is None else 3
+        if image.ndim < ndim or any(n != 1 for n in image.shape[:-ndim]):
+            raise ValueError(
+                f"Chunks must be {ndim}-D images, with any leading axes of "
+                f"length 1, got shape {image.shape}")
+        image = image.reshape(image.shape[-ndim:])
+        return imwrite_to_memory(
+            image,
+            channel_order=self.channel_order,
+            num_decompositions=self.num_decompositions,
+            reversible=self.reversible,
+            wavelet=self.wavelet,
+            qstep=self.qstep,
+            progression_order=self.progression_order,
+            tlm_marker=self.tlm_marker,
+            tileparts_at_resolutions=self.tileparts_at_resolutions,
+            tile_size=None if self.tile_size is None else tuple(self.tile_size),
+            num_threads=self.num_threads,
+        )
+
+    def decode(self, buf, out=None):
+        data = ensure_contiguous_ndarray(buf).reshape(-1).view(np.uint8)
+        image_file = OJPHImageFile.from_memory(
+            data, channel_order=self.channel_order)
+        shape = image_file.get_level_shape(self.level)
+        dtype = np.dtype(image_file.dtype)
+
+        if out is None:
+            out = np.empty(shape, dtype=dtype)
+            image = out
+        else:
+            image = ensure_ndarray_like(out)
+            if image.dtype != dtype:
+                # A raw byte buffer: reinterpret it as the decoded samples.
+                image = np.reshape(image, -1, copy=False).view(dtype)
+            # copy=False makes numpy raise instead of silently decoding into
+            # a copy of the caller's buffer.
+            image = np.reshape(image, shape, copy=False)
+
+        if dtype.itemsize > 2:
+            min_val = max_val = None
+        else:
+            iinfo = np.iinfo(dtype)
+            min_val, max_val = int(iinfo.min), int(iinfo.max)
+        read_j2c_into(data, image, self.level, min_val, max_val,
+                      channel_order=image_file._channel_order)
+        return out
+
+
+register_codec(OJPH)
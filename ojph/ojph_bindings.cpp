@@ -2,8 +2,24 @@
 #include <nanobind/ndarray.h>
 #include <nanobind/stl/string.h>
 #include <nanobind/stl/pair.h>
+#include <nanobind/stl/array.h>
+#include <nanobind/stl/optional.h>
+#include <nanobind/stl/tuple.h>
+#include <nanobind/stl/vector.h>
+#include <algorithm>
+#include <array>
+#include <atomic>
+#include <exception>
+#include <stdexcept>
 #include <limits>
+#include <memory>
+#include <optional>
 #include <string>
+#include <thread>
+#include <tuple>
+#include <type_traits>
+#include <vector>
+#include <cmath>
 #include <cstdlib>
 #include <cstring>
 #include <cstdint>
@@ -16,6 +32,17 @@
 #else
   #include <unistd.h>
 #endif
+#if defined(__linux__)
+  #include <sys/mman.h>
+  #include <sys/syscall.h>
+  #include <linux/io_uring.h>
+  #include <cerrno>
+  #include <sched.h>
+  // IORING_OP_READ arrived with Linux 5.6, as did this feature flag.
+  #if defined(__NR_io_uring_setup) && defined(IORING_FEAT_RW_CUR_POS)
+    #define OJPH_HAVE_IO_URING 1
+  #endif
+#endif
 
 #include <ojph/ojph_file.h>
 #include <ojph/ojph_codestream.h>
@@ -38,19 +65,39 @@ inline bool is_unsigned_dtype(const any_array& a) {
     return a.dtype().code == (uint8_t)nb::dlpack::dtype_code::UInt;
 }
 
+inline bool is_float_dtype(const any_array& a) {
+    return a.dtype().code == (uint8_t)nb::dlpack::dtype_code::Float;
+}
+
 inline size_t byte_stride(const any_array& a, size_t dim) {
     return (size_t)a.stride(dim) * item_size(a);
 }
 
 // C-contiguity for a 2D array, in the NumPy sense (dimensions of extent <= 1
 // impose no stride constraint).
-inline bool is_c_contig_2d(const any_array& a) {
-    if (a.ndim() != 2) return false;
-    if (a.shape(1) > 1 && a.stride(1) != 1) return false;
-    if (a.shape(0) > 1 && (size_t)a.stride(0) != (size_t)a.shape(1)) return false;
+inline bool is_c_contig(const any_array& a) {
+    // Strides are in elements; size-1 axes may have any stride.
+    int64_t expected = 1;
+    for (size_t i = a.ndim(); i-- > 0;) {
+        if (a.shape(i) > 1 && a.stride(i) != expected) return false;
+        expected *= (int64_t)a.shape(i);
+    }
     return true;
 }
 
+// The output arrays of the GIL-free decoders: 2D for a single component, or
+// 3D (HWC or CHW) for several. Only the batch decoders that write into
+// views of a larger array accept strided ones.
+inline const char* check_decode_out(const any_array& out,
+                                    bool require_contiguous = true) {
+    if (out.ndim() != 2 && out.ndim() != 3)
+        return "out must be 2-dimensional (single component) or "
+               "3-dimensional (HWC or CHW)";
+    if (require_contiguous && !is_c_contig(out))
+        return "out must be C-contiguous";
+    return nullptr;
+}
+
 // Alignment used for read buffers. 4096 satisfies O_DIRECT sector alignment on
 // every platform we target and keeps buffers page/cache-line friendly for SIMD
 // decode paths.
@@ -97,6 +144,165 @@ inline void line_to_out(const si32* line_data, size_t n, char* out,
     }
 }
 
+// An IEEE half-precision sample, handled by its bits: C++17 has no float16
+// type.
+struct half_bits { ui16 bits; };
+
+inline float to_float(float v) { return v; }
+
+inline float to_float(half_bits h) {
+  ui32 sign = (ui32)(h.bits & 0x8000) << 16;
+  ui32 exponent = (h.bits >> 10) & 0x1F;
+  ui32 mantissa = h.bits & 0x3FF;
+  if (exponent == 0) {
+    // Zero or subnormal: mantissa * 2^-24.
+    float v = std::ldexp((float)mantissa, -24);
+    return sign ? -v : v;
+  }
+  ui32 bits = exponent == 31
+      ? sign | 0x7F800000u | (mantissa << 13)           // inf or NaN
+      : sign | ((exponent + 112) << 23) | (mantissa << 13);
+  float v;
+  std::memcpy(&v, &bits, sizeof(v));
+  return v;
+}
+
+// The nearest half to ``v`` (ties to even), overflowing to infinity.
+inline half_bits to_half(float v) {
+  ui32 bits;
+  std::memcpy(&bits, &v, sizeof(bits));
+  ui16 sign = (ui16)((bits >> 16) & 0x8000);
+  ui32 magnitude = bits & 0x7FFFFFFFu;
+  ui32 h;
+  if (magnitude >= 0x7F800000u) {
+    h = magnitude > 0x7F800000u ? 0x7E00 : 0x7C00;      // NaN or inf
+  } else if (magnitude >= 0x477FF000u) {
+    h = 0x7C00;                                          // >= 65520: inf
+  } else if (magnitude < 0x38800000u) {
+    // Below the smallest normal half: a subnormal, in units of 2^-24 (the
+    // product is exact and lrint rounds ties to even).
+    float a;
+    std::memcpy(&a, &magnitude, sizeof(a));
+    h = (ui32)std::lrint(a * 16777216.f);
+  } else {
+    h = (((magnitude >> 23) - 112) << 10) | ((magnitude >> 13) & 0x3FF);
+    ui32 rest = magnitude & 0x1FFF;
+    if (rest > 0x1000 || (rest == 0x1000 && (h & 1)))
+      ++h;                                // a carry moves to the exponent
+  }
+  return half_bits{(ui16)(sign | h)};
+}
+
+inline void store(char* dst, float v) { std::memcpy(dst, &v, sizeof(v)); }
+
+inline void store(char* dst, half_bits v) {
+  std::memcpy(dst, &v.bits, sizeof(v.bits));
+}
+
+// Copy one decoded si32 line into a float output row as v * scale + offset.
+// Fusing the normalization into the copy saves a pass over the image and a
+// full-size integer temporary. As in line_to_out, the contiguous case is a
+// tight loop, which the compiler auto-vectorizes for float32.
+template <typename T>
+inline void line_to_float(const si32* line_data, size_t n, char* out,
+                          size_t col_stride, float scale, float offset)
+{
+    if (col_stride == sizeof(T)) {
+        T* dp = reinterpret_cast<T*>(out);
+        for (size_t i = 0; i < n; ++i) {
+            float v = static_cast<float>(line_data[i]) * scale + offset;
+            if constexpr (std::is_same_v<T, float>)
+                dp[i] = v;
+            else
+                dp[i] = to_half(v);
+        }
+    } else {
+        for (size_t i = 0; i < n; ++i) {
+            float v = static_cast<float>(line_data[i]) * scale + offset;
+            if constexpr (std::is_same_v<T, float>)
+                store(out + i * col_stride, v);
+            else
+                store(out + i * col_stride, to_half(v));
+        }
+    }
+}
+
+// How a uint8 output maps decoded samples, for previews of deeper data: a
+// right shift, a linear window [lo, hi] -> [0, 255] or a lookup table, each
+// clipped to [0, 255] in the copy loop.
+enum class output_map { none, shift, window, lut };
+
+// Each keeps a contiguous branch (col_stride == 1), as line_to_out does,
+// which the compiler auto-vectorizes for the shift and the window.
+inline void line_to_u8_shift(const si32* line_data, size_t n, char* out,
+                             size_t col_stride, int shift)
+{
+    auto map = [shift](si32 v) {
+        v >>= shift;
+        v = v < 0 ? 0 : v;
+        v = v > 255 ? 255 : v;
+        return static_cast<ui8>(v);
+    };
+    if (col_stride == 1) {
+        ui8* dp = reinterpret_cast<ui8*>(out);
+        for (size_t i = 0; i < n; ++i)
+            dp[i] = map(line_data[i]);
+    } else {
+        for (size_t i = 0; i < n; ++i)
+            *reinterpret_cast<ui8*>(out + i * col_stride) = map(line_data[i]);
+    }
+}
+
+inline void line_to_u8_window(const si32* line_data, size_t n, char* out,
+                              size_t col_stride, float lo, float gain)
+{
+    // Clip in integers: the compiler will not vectorize float compares that
+    // may trap. Samples are first held to [floor(lo), ceil(hi)], which keeps
+    // v within a step of [0, 255], and the rounded result is then clipped.
+    double hi = (double)lo + 255.0 / gain;
+    si32 s_lo = (si32)std::max(std::floor((double)lo), (double)INT32_MIN);
+    si32 s_hi = (si32)std::min(std::ceil(hi), (double)INT32_MAX);
+    auto map = [lo, gain, s_lo, s_hi](si32 s) {
+        s = s < s_lo ? s_lo : s;
+        s = s > s_hi ? s_hi : s;
+        float v = (static_cast<float>(s) - lo) * gain;
+        // Truncating v + 0.5 rounds to nearest once clipped to [0, 255].
+        si32 r = static_cast<si32>(v + 0.5f);
+        r = r < 0 ? 0 : r;
+        r = r > 255 ? 255 : r;
+        return static_cast<ui8>(r);
+    };
+    if (col_stride == 1) {
+        ui8* dp = reinterpret_cast<ui8*>(out);
+        for (size_t i = 0; i < n; ++i)
+            dp[i] = map(line_data[i]);
+    } else {
+        for (size_t i = 0; i < n; ++i)
+            *reinterpret_cast<ui8*>(out + i * col_stride) = map(line_data[i]);
+    }
+}
+
+inline void line_to_u8_lut(const si32* line_data, size_t n, char* out,
+                           size_t col_stride, const ui8* lut, size_t lut_size,
+                           si32 lut_base)
+{
+    si64 last = (si64)lut_size - 1;
+    auto map = [lut, last, lut_base](si32 v) {
+        si64 index = (si64)v + lut_base;
+        index = index < 0 ? 0 : index;
+        index = index > last ? last : index;
+        return lut[index];
+    };
+    if (col_stride == 1) {
+        ui8* dp = reinterpret_cast<ui8*>(out);
+        for (size_t i = 0; i < n; ++i)
+            dp[i] = map(line_data[i]);
+    } else {
+        for (size_t i = 0; i < n; ++i)
+            *reinterpret_cast<ui8*>(out + i * col_stride) = map(line_data[i]);
+    }
+}
+
 // Portable aligned allocation. The returned pointer must be released with
 // aligned_free(). Sized up to a multiple of ``align`` so O_DIRECT reads that
 // round their length up stay inside the allocation.
@@ -150,79 +356,1750 @@ inline int64_t pread_region(int fd, void* buf, size_t count, int64_t offset,
 #endif
 }
 
-// Parse the TLM marker segment out of an already-read main header to find how
-// many bytes of the codestream are needed to reconstruct ``level`` (number of
-// finest resolutions skipped). Returns 0 if the TLM is absent or inconsistent,
-// in which case the caller reads the whole tile. Assumes RLCP with one tile-part
-// per resolution.
-inline size_t tlm_bytes_to_read(const ui8* buf, size_t header_size,
-                                ui32 num_decompositions, int level) {
-  size_t search = header_size < 200 ? header_size : 200;
-  size_t idx = SIZE_MAX;
-  for (size_t i = 0; i + 1 < search; ++i)
-    if (buf[i] == 0xFF && buf[i + 1] == 0x55) { idx = i; break; }
-  if (idx == SIZE_MAX) return 0;
-
-  const ui8* p = buf + idx + 2;                 // past the 0xFF55 marker
-  ui32 Ltlm = ((ui32)p[0] << 8) | p[1]; p += 2; // segment length
-  p += 1;                                       // Ztlm
-  ui8 Stlm = p[0]; p += 1;
-  int ST = (Stlm & 0x30) >> 4;
-  int Ttlm_bytes = (ST == 0) ? 0 : (ST == 1 ? 1 : 2);
-  int SP = (Stlm & 0x40) >> 6;
-  int Ptlm_bytes = (SP == 0) ? 2 : 4;
-  int per = Ttlm_bytes + Ptlm_bytes;
-  if (per == 0) return 0;
-  int num_tile_parts = (int)(Ltlm - 4) / per;
-  if (num_tile_parts != (int)num_decompositions + 1) return 0;
-
-  if (level < 0) level = 0;
-  if (level > (int)num_decompositions) level = (int)num_decompositions;
-  int target = num_tile_parts - 1 - level;      // cumulative index for this level
-
-  // Guard against reading past what we actually have in the header buffer.
-  const ui8* end = buf + header_size;
-  size_t cum = 0;
-  for (int i = 0; i <= target; ++i) {
-    if (p + per > end) return 0;
-    p += Ttlm_bytes;
-    size_t ptlm = 0;
-    for (int b = 0; b < Ptlm_bytes; ++b) ptlm = (ptlm << 8) | p[b];
-    p += Ptlm_bytes;
-    cum += ptlm;
-  }
-  return header_size + cum;
-}
-
-// Pull every decoded line of a single component into a 2D output buffer, with
-// optional clipping. Shared by read_j2c_into and read_j2c_fd_into. Must be
+// One read of a batch: [offset, offset+len) of the fd into ``buf``. ``got``
+// is set to the bytes read, or a negative value on error.
+struct fd_read {
+  ui8* buf = nullptr;
+  size_t len = 0;
+  int64_t offset = 0;
+  int64_t got = 0;
+};
+
+#if defined(OJPH_HAVE_IO_URING)
+// A minimal io_uring over the raw system calls (no liburing): submit a batch
+// of reads at once, so that a single thread keeps many of them in flight.
+// Setting a ring up costs a few system calls and mappings, so each thread
+// keeps one (see thread_ring) for all its batches.
+class read_ring {
+ public:
+  read_ring() = default;
+  read_ring(const read_ring&) = delete;
+  read_ring& operator=(const read_ring&) = delete;
+  ~read_ring() { close(); }
+
+  bool is_open() const { return ring_fd_ >= 0; }
+  // The process that set the ring up; a forked child must not share it.
+  pid_t owner() const { return pid_; }
+
+  // False when io_uring is unavailable (old kernel, seccomp, ...).
+  bool open(unsigned entries) {
+    io_uring_params p;
+    std::memset(&p, 0, sizeof(p));
+    int fd = (int)syscall(__NR_io_uring_setup, entries, &p);
+    if (fd < 0)
+      return false;
+    ring_fd_ = fd;
+    pid_ = getpid();
+    entries_ = p.sq_entries;
+    sq_size_ = p.sq_off.array + p.sq_entries * sizeof(unsigned);
+    cq_size_ = p.cq_off.cqes + p.cq_entries * sizeof(io_uring_cqe);
+    bool single = (p.features & IORING_FEAT_SINGLE_MMAP) != 0;
+    if (single)
+      sq_size_ = cq_size_ = std::max(sq_size_, cq_size_);
+    sq_ = map(sq_size_, IORING_OFF_SQ_RING);
+    cq_ = single ? sq_ : map(cq_size_, IORING_OFF_CQ_RING);
+    sqes_size_ = p.sq_entries * sizeof(io_uring_sqe);
+    sqes_ = (io_uring_sqe*)map(sqes_size_, IORING_OFF_SQES);
+    if (!sq_ || !cq_ || !sqes_) {
+      close();
+      return false;
+    }
+    char* sq = (char*)sq_;
+    char* cq = (char*)cq_;
+    sq_head_ = (unsigned*)(sq + p.sq_off.head);
+    sq_tail_ = (unsigned*)(sq + p.sq_off.tail);
+    sq_mask_ = *(unsigned*)(sq + p.sq_off.ring_mask);
+    sq_array_ = (unsigned*)(sq + p.sq_off.array);
+    cq_head_ = (unsigned*)(cq + p.cq_off.head);
+    cq_tail_ = (unsigned*)(cq + p.cq_off.tail);
+    cq_mask_ = *(unsigned*)(cq + p.cq_off.ring_mask);
+    cqes_ = (io_uring_cqe*)(cq + p.cq_off.cqes);
+    return true;
+  }
+
+  // Issue every read, up to the ring size at a time, and wait for them all.
+  // Reads the kernel rejects, or that were never submitted, keep a negative
+  // ``got``. On a failed io_uring_enter the reads still queued are
+  // withdrawn, every read the kernel accepted is waited for (it may still
+  // be writing into its buffer), the ring is closed and false returned.
+  bool read_all(int fd, fd_read* reads, size_t n) {
+    size_t queued = 0;     // reads placed in the submission queue
+    size_t submitted = 0;  // of those, the reads the kernel consumed
+    size_t completed = 0;
+    bool ok = true;
+    while (ok ? completed < n : completed < submitted) {
+      unsigned tail = *sq_tail_;
+      while (ok && queued < n && queued - completed < entries_) {
+        unsigned idx = tail & sq_mask_;
+        io_uring_sqe* sqe = &sqes_[idx];
+        std::memset(sqe, 0, sizeof(*sqe));
+        sqe->opcode = IORING_OP_READ;
+        sqe->fd = fd;
+        sqe->addr = (unsigned long long)(uintptr_t)reads[queued].buf;
+        sqe->len = (unsigned)reads[queued].len;
+        sqe->off = (unsigned long long)reads[queued].offset;
+        sqe->user_data = queued;
+        sq_array_[idx] = idx;
+        ++tail;
+        ++queued;
+      }
+      __atomic_store_n(sq_tail_, tail, __ATOMIC_RELEASE);
+      unsigned to_submit = ok ? (unsigned)(queued - submitted) : 0;
+      long r = syscall(__NR_io_uring_enter, ring_fd_, to_submit, 1,
+                       IORING_ENTER_GETEVENTS, nullptr, 0);
+      if (r >= 0) {
+        submitted += (size_t)r;
+      } else if (errno != EINTR && errno != EAGAIN && errno != EBUSY) {
+        if (ok) {
+          // Withdraw what the kernel has not consumed; those reads fall
+          // back to pread.
+          ok = false;
+          __atomic_store_n(sq_tail_, __atomic_load_n(sq_head_, __ATOMIC_ACQUIRE),
+                           __ATOMIC_RELEASE);
+          queued = submitted;
+        } else {
+          // Waiting failed too: poll until the accepted reads complete.
+          sched_yield();
+        }
+      }
+      unsigned head = *cq_head_;
+      unsigned ctail = __atomic_load_n(cq_tail_, __ATOMIC_ACQUIRE);
+      for (; head != ctail; ++head, ++completed) {
+        const io_uring_cqe& cqe = cqes_[head & cq_mask_];
+        reads[cqe.user_data].got = cqe.res;
+      }
+      __atomic_store_n(cq_head_, head, __ATOMIC_RELEASE);
+    }
+    if (!ok)
+      close();
+    return ok;
+  }
+
+  void close() {
+    if (sqes_)
+      munmap(sqes_, sqes_size_);
+    if (cq_ && cq_ != sq_)
+      munmap(cq_, cq_size_);
+    if (sq_)
+      munmap(sq_, sq_size_);
+    if (ring_fd_ >= 0)
+      ::close(ring_fd_);
+    sq_ = cq_ = nullptr;
+    sqes_ = nullptr;
+    ring_fd_ = -1;
+  }
+
+ private:
+  void* map(size_t size, unsigned long long offset) {
+    void* p = mmap(nullptr, size, PROT_READ | PROT_WRITE,
+                   MAP_SHARED | MAP_POPULATE, ring_fd_, (off_t)offset);
+    return p == MAP_FAILED ? nullptr : p;
+  }
+
+  int ring_fd_ = -1;
+  pid_t pid_ = 0;
+  unsigned entries_ = 0;
+  size_t sq_size_ = 0, cq_size_ = 0, sqes_size_ = 0;
+  void* sq_ = nullptr;
+  void* cq_ = nullptr;
+  io_uring_sqe* sqes_ = nullptr;
+  unsigned* sq_head_ = nullptr;
+  unsigned* sq_tail_ = nullptr;
+  unsigned sq_mask_ = 0;
+  unsigned* sq_array_ = nullptr;
+  unsigned* cq_head_ = nullptr;
+  unsigned* cq_tail_ = nullptr;
+  unsigned cq_mask_ = 0;
+  io_uring_cqe* cqes_ = nullptr;
+};
+
+// The calling thread's ring, set up on first use and kept until the thread
+// exits, or nullptr when io_uring is unavailable. A ring inherited across
+// fork() belongs to the parent and is replaced by a new one.
+inline read_ring* thread_ring() {
+  constexpr unsigned RING_ENTRIES = 64;
+  thread_local read_ring ring;
+  if (ring.is_open() && ring.owner() != getpid())
+    ring.close();
+  if (!ring.is_open() && !ring.open(RING_ENTRIES))
+    return nullptr;
+  return &ring;
+}
+#endif
+
+// Whether read_many can use io_uring on this system, probed once.
+inline bool io_uring_supported() {
+#if defined(OJPH_HAVE_IO_URING)
+  static const bool supported = [] {
+    read_ring ring;
+    return ring.open(1);
+  }();
+  return supported;
+#else
+  return false;
+#endif
+}
+
+// Perform every read of ``reads``. With ``use_io_uring`` (and io_uring
+// available) they are submitted together and complete in any order; reads
+// it rejects or cuts short are finished with pread_region, which is also
+// the fallback for the whole batch. Must be called with the GIL released.
+inline void read_many(int fd, fd_read* reads, size_t n, bool o_direct,
+                      bool use_io_uring) {
+  for (size_t i = 0; i < n; ++i)
+    reads[i].got = -1;
+#if defined(OJPH_HAVE_IO_URING)
+  if (use_io_uring && n > 0 && io_uring_supported()) {
+    if (read_ring* ring = thread_ring())
+      ring->read_all(fd, reads, n);
+  }
+#else
+  (void)use_io_uring;
+#endif
+  for (size_t i = 0; i < n; ++i) {
+    fd_read& r = reads[i];
+    if (r.got < 0) {
+      r.got = pread_region(fd, r.buf, r.len, r.offset, o_direct);
+    } else if ((size_t)r.got < r.len && r.got > 0 && !o_direct) {
+      int64_t more = pread_region(fd, r.buf + r.got, r.len - (size_t)r.got,
+                                  r.offset + r.got, false);
+      if (more > 0)
+        r.got += more;
+    }
+  }
+}
+
+// ---------------------------------------------------------------------------
+// Codestream marker-segment utilities (ITU-T T.800 Annex A). These work on raw
+// codestream bytes, independently of OpenJPH, for the features OpenJPH has no
+// API for: assembling tiles encoded on different threads into one codestream,
+// and locating the tile-parts a partial decode needs.
+// ---------------------------------------------------------------------------
+constexpr ui16 J2K_SOC = 0xFF4F;
+constexpr ui16 J2K_SIZ = 0xFF51;
+constexpr ui16 J2K_COD = 0xFF52;
+constexpr ui16 J2K_TLM = 0xFF55;
+constexpr ui16 J2K_SOT = 0xFF90;
+constexpr ui16 J2K_EOC = 0xFFD9;
+
+inline ui16 read_be16(const ui8* p) { return (ui16)((p[0] << 8) | p[1]); }
+inline ui32 read_be32(const ui8* p) {
+  return ((ui32)p[0] << 24) | ((ui32)p[1] << 16) | ((ui32)p[2] << 8) | p[3];
+}
+inline void write_be16(ui8* p, ui16 v) { p[0] = (ui8)(v >> 8); p[1] = (ui8)v; }
+inline void write_be32(ui8* p, ui32 v) {
+  p[0] = (ui8)(v >> 24); p[1] = (ui8)(v >> 16); p[2] = (ui8)(v >> 8); p[3] = (ui8)v;
+}
+
+// The image and tile geometry of a SIZ marker segment.
+struct siz_geometry {
+  ui32 Xsiz = 0, Ysiz = 0, XOsiz = 0, YOsiz = 0;
+  ui32 XTsiz = 0, YTsiz = 0, XTOsiz = 0, YTOsiz = 0;
+  ui16 Csiz = 0;
+
+  ui32 num_tiles_x() const { return (Xsiz - XTOsiz + XTsiz - 1) / XTsiz; }
+  ui32 num_tiles_y() const { return (Ysiz - YTOsiz + YTsiz - 1) / YTsiz; }
+};
+
+// Where the main header's marker segments are. Positions are byte offsets of
+// the marker itself; ``end`` is the offset of the first SOT marker, i.e. the
+// size of the main header.
+struct main_header {
+  size_t siz_pos = 0;
+  siz_geometry siz;
+  std::vector<size_t> tlm_pos;
+  size_t end = 0;
+  // From the COD segment (Table A.12, A.13).
+  bool have_cod = false;
+  ui8 progression_order = 0;  // 0 LRCP, 1 RLCP, 2 RPCL, 3 PCRL, 4 CPRL
+  ui16 num_layers = 1;
+  ui8 num_decompositions = 0;
+};
+
+// Parse the main header of the codestream in [buf, buf+size). Returns false
+// if it is malformed or does not fit in ``size`` bytes.
+inline bool parse_main_header(const ui8* buf, size_t size, main_header& mh) {
+  if (size < 4 || read_be16(buf) != J2K_SOC)
+    return false;
+  bool have_siz = false;
+  size_t pos = 2;
+  while (pos + 4 <= size) {
+    ui16 marker = read_be16(buf + pos);
+    if (marker == J2K_SOT) {
+      mh.end = pos;
+      return have_siz;
+    }
+    size_t len = read_be16(buf + pos + 2);
+    if (len < 2 || pos + 2 + len > size)
+      return false;
+    if (marker == J2K_SIZ && len >= 38) {
+      const ui8* p = buf + pos + 6;  // past the marker, Lsiz and Rsiz
+      siz_geometry& g = mh.siz;
+      g.Xsiz = read_be32(p);       g.Ysiz = read_be32(p + 4);
+      g.XOsiz = read_be32(p + 8);  g.YOsiz = read_be32(p + 12);
+      g.XTsiz = read_be32(p + 16); g.YTsiz = read_be32(p + 20);
+      g.XTOsiz = read_be32(p + 24); g.YTOsiz = read_be32(p + 28);
+      g.Csiz = read_be16(p + 32);
+      have_siz = g.XTsiz && g.YTsiz && g.Xsiz > g.XOsiz && g.Ysiz > g.YOsiz;
+      mh.siz_pos = pos;
+    } else if (marker == J2K_COD && len >= 12) {
+      const ui8* p = buf + pos + 5;  // past the marker, Lcod and Scod
+      mh.have_cod = true;
+      mh.progression_order = p[0];
+      mh.num_layers = read_be16(p + 1);
+      mh.num_decompositions = p[4];
+    } else if (marker == J2K_TLM) {
+      mh.tlm_pos.push_back(pos);
+    }
+    pos += 2 + len;
+  }
+  return false;
+}
+
+// Overwrite the geometry of the SIZ segment at ``siz_pos``, keeping the rest.
+inline void write_siz_geometry(ui8* buf, size_t siz_pos, const siz_geometry& g) {
+  ui8* p = buf + siz_pos + 6;
+  write_be32(p, g.Xsiz);       write_be32(p + 4, g.Ysiz);
+  write_be32(p + 8, g.XOsiz);  write_be32(p + 12, g.YOsiz);
+  write_be32(p + 16, g.XTsiz); write_be32(p + 20, g.YTsiz);
+  write_be32(p + 24, g.XTOsiz); write_be32(p + 28, g.YTOsiz);
+}
+
+// One tile-part: its position and length (SOT marker to the end of its
+// data, i.e. Psot resolved), tile index, and index within its tile.
+struct tile_part {
+  size_t pos = 0;
+  size_t length = 0;
+  ui16 tile = 0;
+  ui8 part = 0;
+  ui8 num_parts = 0;
+};
+
+// Walk the chain of tile-parts starting at the SOT marker at ``pos`` until
+// the EOC marker or the end of the buffer. A Psot of 0 (last tile-part, runs
+// to the EOC) is resolved against ``size``. Returns false on a malformed SOT.
+inline bool list_tile_parts(const ui8* buf, size_t size, size_t pos,
+                            std::vector<tile_part>& parts) {
+  while (pos + 2 <= size) {
+    ui16 marker = read_be16(buf + pos);
+    if (marker == J2K_EOC)
+      return true;
+    if (marker != J2K_SOT || pos + 12 > size)
+      return false;
+    tile_part tp;
+    tp.pos = pos;
+    tp.tile = read_be16(buf + pos + 4);
+    tp.length = read_be32(buf + pos + 6);
+    tp.part = buf[pos + 10];
+    tp.num_parts = buf[pos + 11];
+    if (tp.length == 0) {
+      tp.length = size - pos;
+      if (size >= pos + 14 && read_be16(buf + size - 2) == J2K_EOC)
+        tp.length -= 2;
+    }
+    if (tp.length < 12 || pos + tp.length > size)
+      return false;
+    parts.push_back(tp);
+    pos += tp.length;
+  }
+  return true;
+}
+
+// Append TLM marker segments indexing ``parts`` (in codestream order) to
+// ``out``, using 16-bit tile indices and 32-bit lengths (Stlm = 0x60), split
+// over as many segments as the 16-bit segment length requires.
+inline void append_tlm(std::vector<ui8>& out, const std::vector<tile_part>& parts) {
+  constexpr size_t per_segment = (65535 - 4) / 6;
+  for (size_t first = 0, z = 0; first < parts.size(); first += per_segment, ++z) {
+    size_t count = parts.size() - first;
+    if (count > per_segment) count = per_segment;
+    size_t at = out.size();
+    out.resize(at + 6 + 6 * count);
+    ui8* p = out.data() + at;
+    write_be16(p, J2K_TLM);
+    write_be16(p + 2, (ui16)(4 + 6 * count));
+    p[4] = (ui8)z;
+    p[5] = 0x60;
+    p += 6;
+    for (size_t i = first; i < first + count; ++i, p += 6) {
+      write_be16(p, parts[i].tile);
+      write_be32(p + 2, (ui32)parts[i].length);
+    }
+  }
+}
+
+// The part of a codestream that a region decode needs (see crop_to_region).
+// An empty ``data`` means the original codestream must be decoded whole; the
+// region then starts at (row_offset, col_offset) of the decoded image.
+struct region_codestream {
+  std::vector<ui8> data;
+  size_t row_offset = 0, col_offset = 0;
+};
+
+inline ui64 ceil_shift(ui64 v, ui32 shift) {
+  return (v + ((ui64)1 << shift) - 1) >> shift;
+}
+
+// Reduce the codestream in [buf, buf+size) to the tiles that intersect the
+// window [y0, y1) x [x0, x1) of the image at ``level`` (``region`` holds
+// y0, y1, x0, x1). The selected tiles are rewritten as a codestream of their
+// own: the SIZ image area and tile origin are moved onto the first selected
+// tile, the tile grid itself is unchanged, the surviving SOTs are renumbered
+// for the smaller grid and the (now stale) TLM segments are dropped. The
+// region's position within that smaller image is returned in ``rc``.
+// When every tile is needed, or the tile-parts cannot be indexed (e.g. a
+// truncated partial read), ``rc.data`` stays empty. Throws
+// std::invalid_argument for a region outside the image.
+inline void crop_to_region(const ui8* buf, size_t size, ui32 level,
+                           const size_t* region, region_codestream& rc) {
+  size_t y0 = region[0], y1 = region[1], x0 = region[2], x1 = region[3];
+  rc.data.clear();
+  rc.row_offset = y0;
+  rc.col_offset = x0;
+  main_header mh;
+  if (level > 31 || !parse_main_header(buf, size, mh))
+    return;
+  const siz_geometry& g = mh.siz;
+  ui64 lx0 = ceil_shift(g.XOsiz, level), ly0 = ceil_shift(g.YOsiz, level);
+  if (x1 > ceil_shift(g.Xsiz, level) - lx0 || y1 > ceil_shift(g.Ysiz, level) - ly0)
+    throw std::invalid_argument("region is outside the image at this level");
+  ui64 ax0 = lx0 + x0, ax1 = lx0 + x1, ay0 = ly0 + y0, ay1 = ly0 + y1;
+
+  // The tile columns (rows) whose extent at ``level`` meets [ax0, ax1).
+  auto select = [level](ui32 num, ui64 origin, ui64 tile, ui64 lo, ui64 hi,
+                        ui64 a0, ui64 a1, ui32& first, ui32& last) {
+    first = num;
+    last = 0;
+    for (ui32 i = 0; i < num; ++i) {
+      ui64 t0 = std::max(lo, origin + i * tile);
+      ui64 t1 = std::min(hi, origin + (i + 1) * tile);
+      if (ceil_shift(t0, level) < a1 && ceil_shift(t1, level) > a0) {
+        first = std::min(first, i);
+        last = i;
+      }
+    }
+  };
+  ui32 ntx = g.num_tiles_x(), nty = g.num_tiles_y();
+  ui32 i0, i1, j0, j1;
+  select(ntx, g.XTOsiz, g.XTsiz, g.XOsiz, g.Xsiz, ax0, ax1, i0, i1);
+  select(nty, g.YTOsiz, g.YTsiz, g.YOsiz, g.Ysiz, ay0, ay1, j0, j1);
+  if (i0 > i1 || j0 > j1)
+    return;
+  if (i0 == 0 && j0 == 0 && i1 == ntx - 1 && j1 == nty - 1)
+    return;
+  std::vector<tile_part> parts;
+  if (!list_tile_parts(buf, size, mh.end, parts))
+    return;
+
+  siz_geometry ng = g;
+  ng.XTOsiz = (ui32)(g.XTOsiz + (ui64)i0 * g.XTsiz);
+  ng.YTOsiz = (ui32)(g.YTOsiz + (ui64)j0 * g.YTsiz);
+  ng.XOsiz = std::max(g.XOsiz, ng.XTOsiz);
+  ng.YOsiz = std::max(g.YOsiz, ng.YTOsiz);
+  ng.Xsiz = (ui32)std::min<ui64>(g.Xsiz, g.XTOsiz + (ui64)(i1 + 1) * g.XTsiz);
+  ng.Ysiz = (ui32)std::min<ui64>(g.Ysiz, g.YTOsiz + (ui64)(j1 + 1) * g.YTsiz);
+
+  std::vector<ui8>& out = rc.data;
+  size_t pos = 0;
+  for (size_t tlm : mh.tlm_pos) {
+    out.insert(out.end(), buf + pos, buf + tlm);
+    pos = tlm + 2 + read_be16(buf + tlm + 2);
+  }
+  out.insert(out.end(), buf + pos, buf + mh.end);
+  write_siz_geometry(out.data(), mh.siz_pos, ng);
+
+  ui32 nsx = i1 - i0 + 1;
+  for (const tile_part& tp : parts) {
+    ui32 i = tp.tile % ntx, j = tp.tile / ntx;
+    if (i < i0 || i > i1 || j < j0 || j > j1)
+      continue;
+    size_t at = out.size();
+    out.insert(out.end(), buf + tp.pos, buf + tp.pos + tp.length);
+    write_be16(out.data() + at + 4, (ui16)((j - j0) * nsx + (i - i0)));
+    write_be32(out.data() + at + 6, (ui32)tp.length);
+  }
+  out.push_back(0xFF);
+  out.push_back(0xD9);
+  rc.row_offset = (size_t)(ay0 - ceil_shift(ng.YOsiz, level));
+  rc.col_offset = (size_t)(ax0 - ceil_shift(ng.XOsiz, level));
+}
+
+// Index every tile-part of the codestream from the TLM segments of its main
+// header ``mh`` (parsed from ``buf``), without touching the tile data: the
+// segments are concatenated in Ztlm order, and each tile-part starts where
+// the previous one ends, the first one at the end of the main header.
+// Returns false when there is no TLM or it is malformed.
+inline bool index_tile_parts(const ui8* buf, const main_header& mh,
+                             std::vector<tile_part>& parts) {
+  if (mh.tlm_pos.empty())
+    return false;
+  std::vector<size_t> segments = mh.tlm_pos;
+  std::stable_sort(segments.begin(), segments.end(),
+                   [buf](size_t a, size_t b) { return buf[a + 4] < buf[b + 4]; });
+  ui32 num_tiles = mh.siz.num_tiles_x() * mh.siz.num_tiles_y();
+  std::vector<ui32> parts_in_tile(num_tiles, 0);
+  size_t pos = mh.end;
+  ui32 next_tile = 0;
+  for (size_t seg : segments) {
+    size_t len = read_be16(buf + seg + 2);
+    if (len < 4)
+      return false;
+    ui8 Stlm = buf[seg + 5];
+    int ST = (Stlm >> 4) & 3, SP = (Stlm >> 6) & 1;
+    if (ST == 3)
+      return false;
+    size_t t_bytes = (size_t)ST, p_bytes = SP ? 4 : 2;
+    size_t per = t_bytes + p_bytes;
+    if ((len - 4) % per)
+      return false;
+    const ui8* p = buf + seg + 6;
+    for (size_t i = 0; i < (len - 4) / per; ++i, p += per) {
+      tile_part tp;
+      // Without Ttlm every tile has one tile-part, in tile order.
+      ui32 tile = ST == 0 ? next_tile++ : ST == 1 ? p[0] : read_be16(p);
+      if (tile >= num_tiles)
+        return false;
+      tp.tile = (ui16)tile;
+      tp.part = (ui8)parts_in_tile[tile]++;
+      tp.pos = pos;
+      tp.length = SP ? read_be32(p + t_bytes) : read_be16(p + t_bytes);
+      if (tp.length < 14)
+        return false;
+      pos += tp.length;
+      parts.push_back(tp);
+    }
+  }
+  for (tile_part& tp : parts)
+    tp.num_parts = (ui8)parts_in_tile[tp.tile];
+  return !parts.empty();
+}
+
+// How many leading tile-parts of a tile split into ``num_parts`` hold
+// everything needed to reconstruct with ``level`` finest resolutions
+// skipped. That is only fewer than ``num_parts`` when the progression puts
+// resolutions first (RLCP, RPCL, or LRCP with a single layer) and the tile
+// is divided at resolutions, or for RLCP/LRCP at resolutions and
+// components, as OpenJPH's tile-part divisions do. OpenJPH reads the
+// tile-parts of a tile strictly in sequence, so only a prefix can be kept.
+inline ui32 tile_parts_for_level(const main_header& mh, ui32 num_parts,
+                                 ui32 level) {
+  ui32 nres = (ui32)mh.num_decompositions + 1;
+  ui32 keep = nres - std::min(level, (ui32)mh.num_decompositions);
+  ui32 nc = mh.siz.Csiz;
+  ui8 po = mh.progression_order;
+  bool single_layer_lrcp = po == 0 && mh.num_layers == 1;
+  if (!mh.have_cod || !(po == 1 || po == 2 || single_layer_lrcp))
+    return num_parts;
+  // With as many components as resolutions a component-only division
+  // would look the same; it cannot be told apart, so keep everything.
+  if (num_parts == nres && !(nc == nres && nc > 1))
+    return keep;
+  if (num_parts == nres * nc && po != 2)
+    return keep * nc;
+  return num_parts;
+}
+
+// The byte ranges [first, second) of the codestream, after its main header
+// and in codestream order, that a decode of ``level`` needs. Adjacent
+// tile-parts are merged. Returns false when the codestream cannot be
+// indexed or every tile-part is needed anyway.
+inline bool plan_level_read(const ui8* buf, const main_header& mh, ui32 level,
+                            std::vector<std::pair<size_t, size_t>>& ranges) {
+  std::vector<tile_part> parts;
+  if (!index_tile_parts(buf, mh, parts))
+    return false;
+  bool skipped = false;
+  for (const tile_part& tp : parts) {
+    if (tp.part >= tile_parts_for_level(mh, tp.num_parts, level)) {
+      skipped = true;
+      continue;
+    }
+    if (!ranges.empty() && ranges.back().second == tp.pos)
+      ranges.back().second += tp.length;
+    else
+      ranges.emplace_back(tp.pos, tp.pos + tp.length);
+  }
+  if (!skipped)
+    ranges.clear();
+  return skipped;
+}
+
+// An aligned read buffer (see aligned_read_alloc) that frees itself.
+struct aligned_buffer {
+  ui8* data = nullptr;
+  size_t size = 0;  // bytes of codestream held
+
+  aligned_buffer() = default;
+  aligned_buffer(const aligned_buffer&) = delete;
+  aligned_buffer& operator=(const aligned_buffer&) = delete;
+  ~aligned_buffer() { reset(); }
+
+  // Allocate room for ``capacity`` bytes plus an alignment block of slack.
+  bool allocate(size_t capacity) {
+    reset();
+    data = (ui8*)aligned_read_alloc(capacity + OJPH_READ_ALIGN);
+    return data != nullptr;
+  }
+  void reset() {
+    if (data)
+      aligned_free(data);
+    data = nullptr;
+    size = 0;
+  }
+  void swap(aligned_buffer& other) {
+    std::swap(data, other.data);
+    std::swap(size, other.size);
+  }
+  // Hand the allocation over to the caller (to free with aligned_free).
+  ui8* release() {
+    ui8* p = data;
+    data = nullptr;
+    size = 0;
+    return p;
+  }
+};
+
+// Read the start of the codestream at [offset, offset+nbytes) of ``fd`` into
+// ``head``, in one read that usually also covers a deep zoom-out, and parse
+// its main header into ``mh``; ``parsed`` tells whether that succeeded.
+// Returns an error message for a failed read, or nullptr. Must be called
+// with the GIL released.
+inline const char* read_main_header(int fd, int64_t offset, size_t nbytes,
+                                    bool o_direct, aligned_buffer& head,
+                                    main_header& mh, bool& parsed) {
+  constexpr size_t INITIAL = 65536;
+  parsed = false;
+  for (size_t want = std::min(INITIAL, nbytes);; want = std::min(want * 4, nbytes)) {
+    size_t read_len = o_direct ? round_up(want, OJPH_READ_ALIGN) : want;
+    if (!head.allocate(read_len))
+      return "allocation failed";
+    int64_t got = pread_region(fd, head.data, read_len, offset, o_direct);
+    if (got <= 0)
+      return "short read";
+    head.size = std::min((size_t)got, nbytes);
+    parsed = parse_main_header(head.data, head.size, mh);
+    // A main header longer than the first read (e.g. a large TLM) is read
+    // again with a larger buffer.
+    if (parsed || want >= nbytes || head.size < want)
+      break;
+  }
+  return nullptr;
+}
+
+// The length of the codestream stored from ``offset`` of ``fd``, at most
+// ``nbytes``: up to the end of its EOC marker, found from the TLM index of
+// the main header or else by walking the SOT markers, with one 12-byte read
+// per tile-part. ``nbytes`` when the end cannot be told, e.g. when the last
+// tile-part has a Psot of 0. Must be called with the GIL released.
+inline size_t codestream_extent(int fd, int64_t offset, size_t nbytes) {
+  aligned_buffer head;
+  main_header mh;
+  bool parsed = false;
+  if (read_main_header(fd, offset, nbytes, false, head, mh, parsed) || !parsed)
+    return nbytes;
+  std::vector<tile_part> parts;
+  size_t end = mh.end;
+  if (index_tile_parts(head.data, mh, parts)) {
+    end = parts.back().pos + parts.back().length;
+  } else {
+    ui8 sot[12];
+    while (end + sizeof(sot) <= nbytes) {
+      if (pread_region(fd, sot, sizeof(sot), offset + (int64_t)end, false)
+          < (int64_t)sizeof(sot))
+        return nbytes;
+      if (read_be16(sot) != J2K_SOT)
+        break;
+      size_t psot = read_be32(sot + 6);
+      if (psot < sizeof(sot))
+        return nbytes;
+      end += psot;
+    }
+  }
+  // The EOC marker follows the last tile-part.
+  return std::min(end + 2, nbytes);
+}
+
+// Read what a decode of ``level`` needs from the codestream stored at
+// [offset, offset+nbytes) of ``fd`` into ``out``. The main header is read
+// first, in one read that usually also covers a deep zoom-out; when its TLM
+// index allows (see plan_level_read), only the tile-parts of the kept
+// resolutions follow, each run of adjacent ones in one read, and an EOC
+// marker is appended. Otherwise the whole codestream is read. O_DIRECT
+// reads keep aligned offsets and lengths. Returns an error message, or
+// nullptr on success. Must be called with the GIL released.
+inline const char* read_level_from_fd(int fd, int64_t offset, size_t nbytes,
+                                      int level, bool o_direct,
+                                      aligned_buffer& out,
+                                      bool use_io_uring = false) {
+  aligned_buffer head;
+  main_header mh;
+  bool parsed = false;
+  if (const char* msg = read_main_header(fd, offset, nbytes, o_direct, head,
+                                         mh, parsed))
+    return msg;
+
+  std::vector<std::pair<size_t, size_t>> ranges;
+  if (parsed && plan_level_read(head.data, mh, (ui32)std::max(level, 0), ranges)
+      && ranges.back().second <= nbytes) {
+    size_t needed = mh.end;
+    for (const auto& r : ranges)
+      needed += r.second - r.first;
+    if (ranges.size() == 1 && ranges[0].first == mh.end &&
+        ranges[0].second <= head.size) {
+      // A prefix already in the first read: decode it in place.
+      out.swap(head);
+    } else if (ranges.size() == 1 && ranges[0].first == mh.end) {
+      // A longer prefix: one read of all of it.
+      size_t read_len = o_direct ? round_up(needed, OJPH_READ_ALIGN) : needed;
+      if (!out.allocate(read_len))
+        return "allocation failed";
+      if (pread_region(fd, out.data, read_len, offset, o_direct) < (int64_t)needed)
+        return "short read";
+    } else {
+      if (!out.allocate(needed + 2))
+        return "allocation failed";
+      std::memcpy(out.data, head.data, mh.end);
+      // The ranges past the first read are read together; for O_DIRECT each
+      // is widened to aligned bounds in a scratch buffer.
+      std::vector<fd_read> reads;
+      std::vector<aligned_buffer> scratch(ranges.size());
+      std::vector<size_t> lead(ranges.size(), 0);
+      size_t at = mh.end;
+      for (size_t i = 0; i < ranges.size(); ++i) {
+        size_t len = ranges[i].second - ranges[i].first;
+        int64_t pos = offset + (int64_t)ranges[i].first;
+        if (ranges[i].second <= head.size) {
+          std::memcpy(out.data + at, head.data + ranges[i].first, len);
+        } else {
+          fd_read r;
+          r.buf = out.data + at;
+          r.len = len;
+          r.offset = pos;
+          if (o_direct) {
+            r.offset = pos / (int64_t)OJPH_READ_ALIGN * (int64_t)OJPH_READ_ALIGN;
+            lead[i] = (size_t)(pos - r.offset);
+            r.len = round_up(lead[i] + len, OJPH_READ_ALIGN);
+            if (!scratch[i].allocate(r.len))
+              return "allocation failed";
+            r.buf = scratch[i].data;
+          }
+          reads.push_back(r);
+        }
+        at += len;
+      }
+      read_many(fd, reads.data(), reads.size(), o_direct, use_io_uring);
+      size_t k = 0;
+      at = mh.end;
+      for (size_t i = 0; i < ranges.size(); ++i) {
+        size_t len = ranges[i].second - ranges[i].first;
+        if (ranges[i].second > head.size) {
+          const fd_read& r = reads[k++];
+          if (r.got < (int64_t)(lead[i] + len))
+            return "short read";
+          if (o_direct)
+            std::memcpy(out.data + at, scratch[i].data + lead[i], len);
+        }
+        at += len;
+      }
+    }
+    // Room for the EOC is guaranteed by the alignment slack of the buffer.
+    out.data[needed] = 0xFF;
+    out.data[needed + 1] = 0xD9;
+    out.size = needed + 2;
+    return nullptr;
+  }
+
+  if (head.size >= nbytes) {
+    out.swap(head);
+    out.size = nbytes;
+    return nullptr;
+  }
+  size_t read_len = o_direct ? round_up(nbytes, OJPH_READ_ALIGN) : nbytes;
+  if (!out.allocate(read_len))
+    return "allocation failed";
+  if (pread_region(fd, out.data, read_len, offset, o_direct) < (int64_t)nbytes)
+    return "short read";
+  out.size = nbytes;
+  return nullptr;
+}
+
+// Byte ranges of one file read in a few large reads. Ranges are queued with
+// want(); read() merges the queued ranges that are at most ``max_gap`` bytes
+// apart (after widening them to aligned bounds for O_DIRECT) and reads each
+// merged extent once, skipping ranges earlier reads already hold. find()
+// then locates any queued range in memory. A failed or short read leaves
+// the bytes past it missing, so find() returns nullptr for them.
+class extent_reader {
+ public:
+  void want(int64_t start, int64_t end) {
+    if (end > start)
+      pending_.emplace_back(start, end);
+  }
+
+  void read(int fd, bool o_direct, size_t max_gap, bool use_io_uring) {
+    std::vector<std::pair<int64_t, int64_t>> todo;
+    for (auto r : pending_) {
+      if (find(r.first, (size_t)(r.second - r.first)))
+        continue;
+      if (o_direct) {
+        r.first = r.first / (int64_t)OJPH_READ_ALIGN * (int64_t)OJPH_READ_ALIGN;
+        r.second = (int64_t)round_up((size_t)r.second, OJPH_READ_ALIGN);
+      }
+      todo.push_back(r);
+    }
+    pending_.clear();
+    std::sort(todo.begin(), todo.end());
+    size_t first = extents_.size();
+    std::vector<fd_read> reads;
+    for (size_t i = 0; i < todo.size();) {
+      int64_t start = todo[i].first, end = todo[i].second;
+      for (++i; i < todo.size() && todo[i].first <= end + (int64_t)max_gap; ++i)
+        end = std::max(end, todo[i].second);
+      extent e;
+      e.start = start;
+      if (e.buf.allocate((size_t)(end - start))) {
+        fd_read r;
+        r.buf = e.buf.data;
+        r.len = (size_t)(end - start);
+        r.offset = start;
+        reads.push_back(r);
+        extents_.push_back(std::move(e));
+      }
+    }
+    read_many(fd, reads.data(), reads.size(), o_direct, use_io_uring);
+    for (size_t i = 0; i < reads.size(); ++i)
+      extents_[first + i].buf.size = reads[i].got > 0 ? (size_t)reads[i].got : 0;
+    std::sort(extents_.begin(), extents_.end(),
+              [](const extent& a, const extent& b) { return a.start < b.start; });
+  }
+
+  const ui8* find(int64_t pos, size_t len) const {
+    for (const extent& e : extents_) {
+      if (e.start > pos)
+        break;
+      if (pos + (int64_t)len <= e.start + (int64_t)e.buf.size)
+        return e.buf.data + (pos - e.start);
+    }
+    return nullptr;
+  }
+
+ private:
+  struct extent {
+    int64_t start = 0;
+    aligned_buffer buf;
+    extent() = default;
+    extent(extent&& other) noexcept : start(other.start) { buf.swap(other.buf); }
+    extent& operator=(extent&& other) noexcept {
+      start = other.start;
+      buf.swap(other.buf);
+      return *this;
+    }
+  };
+  std::vector<std::pair<int64_t, int64_t>> pending_;
+  std::vector<extent> extents_;
+};
+
+// Where decoded lines go: a 2D (single component) or HWC/CHW (multiple
+// components) output array, described by byte strides.
+struct decode_view {
+  char* data = nullptr;
+  ui32 num_components = 1;
+  bool has_channel_axis = false;
+  size_t height = 0, width = 0;
+  size_t row_stride = 0, col_stride = 0, component_stride = 0;
+  size_t element_size = 1;
+  bool is_unsigned = true;
+  // A float16/float32 output receives v * scale + offset.
+  bool is_float = false;
+  float scale = 1.f, offset = 0.f;
+  // A uint8 output may map the samples instead (see output_map).
+  output_map map = output_map::none;
+  int shift = 0;
+  float window_lo = 0.f, window_gain = 1.f;
+  const ui8* lut = nullptr;
+  size_t lut_size = 0;
+  si32 lut_base = 0;
+};
+
+// Describe a 2D or 3D output array. For a 3D array the channel axis is the
+// first one for "CHW" and the last one otherwise. The caller checks ndim.
+inline decode_view make_decode_view(const any_array& out,
+                                    const std::string& channel_order) {
+  decode_view v;
+  v.data = static_cast<char*>(out.data());
+  v.element_size = item_size(out);
+  v.is_unsigned = is_unsigned_dtype(out);
+  v.is_float = is_float_dtype(out);
+  if (v.is_float && v.element_size != 2 && v.element_size != 4)
+    throw nb::value_error("A float out must be float16 or float32");
+  if (out.ndim() == 2) {
+    v.height = out.shape(0);
+    v.width = out.shape(1);
+    v.row_stride = byte_stride(out, 0);
+    v.col_stride = byte_stride(out, 1);
+  } else if (channel_order == "CHW") {
+    v.has_channel_axis = true;
+    v.num_components = (ui32)out.shape(0);
+    v.height = out.shape(1);
+    v.width = out.shape(2);
+    v.component_stride = byte_stride(out, 0);
+    v.row_stride = byte_stride(out, 1);
+    v.col_stride = byte_stride(out, 2);
+  } else {
+    v.has_channel_axis = true;
+    v.num_components = (ui32)out.shape(2);
+    v.height = out.shape(0);
+    v.width = out.shape(1);
+    v.component_stride = byte_stride(out, 2);
+    v.row_stride = byte_stride(out, 0);
+    v.col_stride = byte_stride(out, 1);
+  }
+  return v;
+}
+
+using u8_lut = nb::ndarray<const ui8, nb::ndim<1>, nb::c_contig, nb::device::cpu>;
+
+// Set the output mapping of ``view`` from the optional ``shift``, ``window``
+// (lo, hi) and ``lut`` decode arguments, at most one of which may be given.
+// A lut is indexed by sample + lut_offset. Raises ValueError (GIL held).
+inline void set_output_map(decode_view& view, std::optional<int> shift,
+                           std::optional<std::array<float, 2>> window,
+                           const std::optional<u8_lut>& lut, si32 lut_offset) {
+  int given = (int)shift.has_value() + (int)window.has_value()
+              + (int)lut.has_value();
+  if (given == 0)
+    return;
+  if (given > 1)
+    throw nb::value_error("give at most one of shift, window and lut");
+  if (view.is_float || view.element_size != 1 || !view.is_unsigned)
+    throw nb::value_error("shift, window and lut need a uint8 out");
+  if (shift) {
+    if (*shift < 0 || *shift > 31)
+      throw nb::value_error("shift must be in [0, 31]");
+    view.map = output_map::shift;
+    view.shift = *shift;
+  } else if (window) {
+    float lo = (*window)[0], hi = (*window)[1];
+    if (!(hi > lo))
+      throw nb::value_error("window must be (low, high) with low < high");
+    view.map = output_map::window;
+    view.window_lo = lo;
+    view.window_gain = 255.f / (hi - lo);
+  } else {
+    if (lut->size() == 0)
+      throw nb::value_error("lut must not be empty");
+    view.map = output_map::lut;
+    view.lut = lut->data();
+    view.lut_size = lut->size();
+    view.lut_base = lut_offset;
+  }
+}
+
+inline void write_line(const si32* line_data, size_t n, char* dst,
+                       const decode_view& out, bool do_clip,
+                       si32 min_val, si32 max_val) {
+  size_t cs = out.col_stride;
+  if (out.map == output_map::shift) {
+    line_to_u8_shift(line_data, n, dst, cs, out.shift);
+  } else if (out.map == output_map::window) {
+    line_to_u8_window(line_data, n, dst, cs, out.window_lo, out.window_gain);
+  } else if (out.map == output_map::lut) {
+    line_to_u8_lut(line_data, n, dst, cs, out.lut, out.lut_size, out.lut_base);
+  } else if (out.is_float) {
+    if (out.element_size == 2)
+      line_to_float<half_bits>(line_data, n, dst, cs, out.scale, out.offset);
+    else
+      line_to_float<float>(line_data, n, dst, cs, out.scale, out.offset);
+  } else if (out.element_size == 1) {
+    if (out.is_unsigned)
+      line_to_out<ui8>(line_data, n, dst, cs, do_clip, min_val, max_val);
+    else
+      line_to_out<si8>(line_data, n, dst, cs, do_clip, min_val, max_val);
+  } else if (out.element_size == 2) {
+    if (out.is_unsigned)
+      line_to_out<ui16>(line_data, n, dst, cs, do_clip, min_val, max_val);
+    else
+      line_to_out<si16>(line_data, n, dst, cs, do_clip, min_val, max_val);
+  } else {
+    if (out.is_unsigned)
+      line_to_out<ui32>(line_data, n, dst, cs, do_clip, min_val, max_val);
+    else
+      line_to_out<si32>(line_data, n, dst, cs, do_clip, min_val, max_val);
+  }
+}
+
+// Pull decoded lines into ``out``, with optional clipping. ``out`` receives
+// the window of the decoded image starting at (row_offset, col_offset) in
+// every component. Lines are placed by the component number pull() reports,
+// so planar and interleaved codestreams are both handled; pulling stops as
+// soon as the window is complete. Returns an error message, or nullptr on
+// success. Must be called with the GIL released on a created codestream.
+inline const char* pull_into(codestream& cs, const decode_view& out,
+                             bool do_clip, si32 min_val, si32 max_val,
+                             size_t row_offset = 0, size_t col_offset = 0) {
+  param_siz siz = cs.access_siz();
+  for (ui32 c = 0; c < out.num_components; ++c)
+    if (row_offset + out.height > siz.get_recon_height(c))
+      return "Region exceeds the decoded image";
+  bool window = row_offset != 0 || col_offset != 0;
+  std::vector<size_t> rows_pulled(out.num_components, 0);
+  size_t remaining = out.num_components * out.height;
+  while (remaining) {
+    ui32 c = 0;
+    line_buf* line = cs.pull(c);
+    if (!line || c >= out.num_components)
+      return "Unexpected line from the codestream";
+    size_t r = rows_pulled[c]++;
+    if (r < row_offset || r >= row_offset + out.height)
+      continue;
+    if (window ? line->size < col_offset + out.width : line->size != out.width)
+      return window ? "Region exceeds the decoded image" : "Line size mismatch";
+    char* dst = out.data + c * out.component_stride
+              + (r - row_offset) * out.row_stride;
+    write_line(line->i32 + col_offset, out.width, dst, out, do_clip,
+               min_val, max_val);
+    --remaining;
+  }
+  return nullptr;
+}
+
+// Decode ``level`` of a codestream whose headers have been read into
+// ``out``. The output receives the whole level, or with a ``region`` (y0,
+// y1, x0, x1 at that level) the window found at (row_offset, col_offset) of
+// the decoded image. (h, w) always receive the level (or region) shape.
+// Closes ``cs``. Returns an error message, empty on success; codec errors
+// propagate as the std::runtime_error OpenJPH throws, and a region outside
+// the image as std::invalid_argument. Must be called with the GIL released.
+inline std::string finish_decode_into(
+    codestream& cs, int level, const size_t* region, size_t row_offset,
+    size_t col_offset, const decode_view& out, bool do_clip, si32 min_val,
+    si32 max_val, ui32& h, ui32& w) {
+  cs.restrict_input_resolution((ui32)level, (ui32)level);
+  param_siz siz = cs.access_siz();
+  ui32 num_components = siz.get_num_components();
+  h = siz.get_recon_height(0);
+  w = siz.get_recon_width(0);
+  if (region) {
+    if (row_offset + (region[1] - region[0]) > h ||
+        col_offset + (region[3] - region[2]) > w) {
+      cs.close();
+      throw std::invalid_argument("region is outside the image at this level");
+    }
+    h = (ui32)(region[1] - region[0]);
+    w = (ui32)(region[3] - region[2]);
+  }
+  std::string err;
+  if (num_components == 1 && out.has_channel_axis) {
+    err = "out must be 2-dimensional for a single-component codestream";
+  } else if (num_components > 1 && !out.has_channel_axis) {
+    err = "out must be 3-dimensional (HWC or CHW) for a multi-component "
+          "codestream";
+  } else if (out.num_components != num_components) {
+    err = "out has " + std::to_string(out.num_components) +
+          " components but the codestream has " +
+          std::to_string(num_components);
+  } else if ((size_t)h != out.height || (size_t)w != out.width) {
+    err = region ? "out shape does not match the region shape"
+                 : "out shape does not match decoded level shape";
+  } else {
+    cs.create();
+    const char* msg = pull_into(cs, out, do_clip, min_val, max_val,
+                                row_offset, col_offset);
+    if (msg)
+      err = msg;
+  }
+  cs.close();
+  return err;
+}
+
+// Decode ``level`` of the codestream in [data, data+size) into ``out``. With
+// a ``region`` only the tiles intersecting it are decoded (see
+// crop_to_region) and just the window is written. Errors are reported as by
+// finish_decode_into. Must be called with the GIL released.
+inline std::string decode_into(
+    const ui8* data, size_t size, int level, const size_t* region,
+    const decode_view& out, bool do_clip, si32 min_val, si32 max_val,
+    ui32& h, ui32& w) {
+  region_codestream rc;
+  if (region) {
+    if (region[0] >= region[1] || region[2] >= region[3])
+      throw std::invalid_argument("region must not be empty");
+    crop_to_region(data, size, (ui32)level, region, rc);
+    if (!rc.data.empty()) {
+      data = rc.data.data();
+      size = rc.data.size();
+    }
+  }
+  mem_infile infile;
+  infile.open(data, size);
+  codestream cs;
+  cs.read_headers(&infile);
+  return finish_decode_into(cs, level, region, rc.row_offset, rc.col_offset,
+                            out, do_clip, min_val, max_val, h, w);
+}
+
+// Run fn(i) for every i in [0, n) on up to ``num_threads`` native threads
+// (0 means one per hardware thread). The calling thread is one of the workers,
+// so a single-threaded run spawns nothing. ``fn`` must not throw; callers
+// record per-item failures themselves. Must be called with the GIL released.
+template <typename F>
+inline void parallel_for(size_t n, unsigned num_threads, F&& fn) {
+  if (num_threads == 0) {
+    num_threads = std::thread::hardware_concurrency();
+    if (num_threads == 0) num_threads = 1;
+  }
+  if ((size_t)num_threads > n) num_threads = (unsigned)n;
+  std::atomic<size_t> next{0};
+  auto worker = [&]() {
+    for (size_t i = next.fetch_add(1); i < n; i = next.fetch_add(1))
+      fn(i);
+  };
+  std::vector<std::thread> threads;
+  for (unsigned t = 1; t < num_threads; ++t)
+    threads.emplace_back(worker);
+  worker();
+  for (auto& t : threads)
+    t.join();
+}
+
+// One codestream of a batch read from a file descriptor: what a decode of
+// ``level`` needs from [offset, offset+nbytes), as planned from its main
+// header by plan_fd_pages.
+struct fd_page {
+  int64_t offset = 0;
+  size_t nbytes = 0;
+  int level = 0;
+  main_header mh;
+  bool planned = false;  // the header parsed: read mh.end bytes + ranges
+  std::vector<std::pair<size_t, size_t>> ranges;  // empty: whole codestream
+  aligned_buffer own;    // read separately (a main header over 64 KiB)
+};
+
+// Read what every page needs with as few reads as possible: first all the
+// main headers, then all the tile-parts the levels keep, each time merging
+// ranges at most ``max_gap`` apart into one read (see extent_reader). The
+// reads are issued one after the other, so a shared fd is never seeked
+// concurrently. Must be called with the GIL released.
+inline void read_fd_pages(int fd, bool o_direct, size_t max_gap,
+                          bool use_io_uring, std::vector<fd_page>& pages,
+                          extent_reader& reader) {
+  constexpr size_t HEADER = 65536;
+  for (const fd_page& p : pages)
+    reader.want(p.offset, p.offset + (int64_t)std::min(HEADER, p.nbytes));
+  reader.read(fd, o_direct, max_gap, use_io_uring);
+
+  for (fd_page& p : pages) {
+    size_t len = std::min(HEADER, p.nbytes);
+    const ui8* head = reader.find(p.offset, len);
+    if (head && parse_main_header(head, len, p.mh)) {
+      p.planned = true;
+      if (!plan_level_read(head, p.mh, (ui32)std::max(p.level, 0), p.ranges) ||
+          p.ranges.back().second > p.nbytes)
+        p.ranges.clear();
+      reader.want(p.offset, p.offset + (int64_t)p.mh.end);
+      if (p.ranges.empty())
+        reader.want(p.offset, p.offset + (int64_t)p.nbytes);
+      for (const auto& r : p.ranges)
+        reader.want(p.offset + (int64_t)r.first, p.offset + (int64_t)r.second);
+    } else if (head) {
+      read_level_from_fd(fd, p.offset, p.nbytes, p.level, o_direct, p.own,
+                         use_io_uring);
+    }
+  }
+  reader.read(fd, o_direct, max_gap, use_io_uring);
+}
+
+// Decode one page read by read_fd_pages into ``out``, or just ``region`` of
+// it (see decode_into). Errors are reported as by decode_into. Must be
 // called with the GIL released.
-inline void pull_single_component_into(
-    codestream& cs, char* out_ptr, size_t rows, size_t cols,
-    size_t row_stride, size_t element_size, bool is_unsigned,
-    bool do_clip, si32 min_val, si32 max_val) {
-  ui32 comp = 0;
-  for (size_t r = 0; r < rows; ++r) {
-    line_buf* line = cs.pull(comp);
-    const si32* ld = line->i32;
-    char* dst = out_ptr + r * row_stride;
-    if (element_size == 1) {
-      if (is_unsigned)
-        line_to_out<ui8>(ld, cols, dst, 1, do_clip, min_val, max_val);
-      else
-        line_to_out<si8>(ld, cols, dst, 1, do_clip, min_val, max_val);
-    } else if (element_size == 2) {
-      if (is_unsigned)
-        line_to_out<ui16>(ld, cols, dst, 2, do_clip, min_val, max_val);
-      else
-        line_to_out<si16>(ld, cols, dst, 2, do_clip, min_val, max_val);
+inline std::string decode_fd_page(const fd_page& p, const extent_reader& reader,
+                                  const size_t* region, const decode_view& out,
+                                  bool do_clip, si32 min_val, si32 max_val) {
+  ui32 h = 0, w = 0;
+  if (!p.planned) {
+    if (!p.own.data)
+      return "short read";
+    return decode_into(p.own.data, p.own.size, p.level, region, out, do_clip,
+                       min_val, max_val, h, w);
+  }
+  if (p.ranges.empty()) {
+    const ui8* data = reader.find(p.offset, p.nbytes);
+    if (!data)
+      return "short read";
+    return decode_into(data, p.nbytes, p.level, region, out, do_clip,
+                       min_val, max_val, h, w);
+  }
+  size_t needed = p.mh.end;
+  for (const auto& r : p.ranges)
+    needed += r.second - r.first;
+  std::vector<ui8> cs(needed + 2);
+  const ui8* head = reader.find(p.offset, p.mh.end);
+  if (!head)
+    return "short read";
+  std::memcpy(cs.data(), head, p.mh.end);
+  size_t at = p.mh.end;
+  for (const auto& r : p.ranges) {
+    size_t len = r.second - r.first;
+    const ui8* src = reader.find(p.offset + (int64_t)r.first, len);
+    if (!src)
+      return "short read";
+    std::memcpy(cs.data() + at, src, len);
+    at += len;
+  }
+  cs[needed] = 0xFF;
+  cs[needed + 1] = 0xD9;
+  return decode_into(cs.data(), cs.size(), p.level, region, out, do_clip,
+                     min_val, max_val, h, w);
+}
+
+// Widen one row of the caller's image into a codec si32 line. As with
+// line_to_out, the contiguous case (col_stride == sizeof(T)) is a tight loop
+// the compiler auto-vectorizes into packed widening loads, which the generic
+// strided loop cannot.
+template <typename T>
+inline void image_to_line(const char* row, size_t n, size_t col_stride,
+                          si32* line_data)
+{
+    if (col_stride == sizeof(T)) {
+        const T* sp = reinterpret_cast<const T*>(row);
+        for (size_t i = 0; i < n; ++i)
+            line_data[i] = static_cast<si32>(sp[i]);
+    } else {
+        for (size_t i = 0; i < n; ++i)
+            line_data[i] = static_cast<si32>(
+                *reinterpret_cast<const T*>(row + i * col_stride));
+    }
+}
+
+// ``v`` rounded to the nearest integer, ties to even, as lrint rounds in the
+// default mode but without a libm call, which keeps loops vectorizable:
+// adding and subtracting 1.5 * 2^23 drops the fraction. Exact for
+// |v| <= 2^22.
+inline float round_even(float v) { return (v + 12582912.f) - 12582912.f; }
+
+// Quantize one row of a float image into a codec si32 line: round(v * scale
+// + offset), clipped to [lo, hi], the sample range of the codestream. NaN
+// maps to lo. Fusing this into the push loop saves a full-size integer
+// temporary and a pass over the image. As in image_to_line, the contiguous
+// case is a tight loop the compiler auto-vectorizes for float32; it covers
+// the 8- and 16-bit sample ranges floats are stored as, where round_even is
+// exact.
+template <typename T>
+inline void float_to_line(const char* row, size_t n, size_t col_stride,
+                          si32* line_data, float scale, float offset,
+                          float lo, float hi)
+{
+    if (col_stride == sizeof(T) && lo >= -4194304.f && hi <= 4194304.f) {
+        const T* sp = reinterpret_cast<const T*>(row);
+        for (size_t i = 0; i < n; ++i) {
+            float v = to_float(sp[i]) * scale + offset;
+            v = v >= lo ? v : lo;
+            v = v <= hi ? v : hi;
+            line_data[i] = static_cast<si32>(round_even(v));
+        }
+    } else {
+        for (size_t i = 0; i < n; ++i) {
+            T sample;
+            std::memcpy(&sample, row + i * col_stride, sizeof(T));
+            float v = to_float(sample) * scale + offset;
+            v = v >= lo ? v : lo;
+            v = v <= hi ? v : hi;
+            line_data[i] = static_cast<si32>(std::lrint(v));
+        }
+    }
+}
+
+// The geometry of an image to encode, resolved (with the GIL held) from the
+// caller's array and channel order so the push loop can run without it.
+// Float images are quantized with ``scale`` and ``offset`` as they are pushed.
+struct image_view {
+  const char* data = nullptr;
+  ui32 num_components = 1;
+  size_t height = 0, width = 0;
+  size_t row_stride = 0, col_stride = 0, component_stride = 0;
+  size_t element_size = 1;
+  bool is_unsigned = true;
+  bool is_float = false;
+  float scale = 1.f, offset = 0.f;
+};
+
+inline image_view make_image_view(const any_array& image, ui32 num_components,
+                                  const std::string& channel_order) {
+  image_view v;
+  v.data = static_cast<const char*>(image.data());
+  v.num_components = num_components;
+  v.element_size = item_size(image);
+  v.is_unsigned = is_unsigned_dtype(image);
+  v.is_float = is_float_dtype(image);
+  if (v.is_float && v.element_size != 2 && v.element_size != 4)
+    throw nb::value_error("Float images must be float16 or float32");
+  if (num_components == 1) {
+    if (!(image.ndim() == 2 || (image.ndim() == 3 && image.shape(2) == 1)))
+      throw nb::value_error("Image must be 2-dimensional or 3-dimensional with last dimension of 1 for single component");
+    v.height = image.shape(0);
+    v.width = image.shape(1);
+    v.row_stride = byte_stride(image, 0);
+    v.col_stride = byte_stride(image, 1);
+  } else {
+    if (image.ndim() != 3)
+      throw nb::value_error("Image must be 3-dimensional for multiple components");
+    if (channel_order == "CHW") {
+      v.height = image.shape(1);
+      v.width = image.shape(2);
+      v.component_stride = byte_stride(image, 0);
+      v.row_stride = byte_stride(image, 1);
+      v.col_stride = byte_stride(image, 2);
+    } else {
+      v.height = image.shape(0);
+      v.width = image.shape(1);
+      v.component_stride = byte_stride(image, 2);
+      v.row_stride = byte_stride(image, 0);
+      v.col_stride = byte_stride(image, 1);
+    }
+  }
+  return v;
+}
+
+// The sample range [lo, hi] of the codestream, which float images are
+// clipped to.
+struct sample_range {
+  float lo = 0.f, hi = 0.f;
+
+  explicit sample_range(codestream& cs) {
+    param_siz siz = cs.access_siz();
+    ui32 bit_depth = siz.get_bit_depth(0);
+    if (siz.is_signed(0)) {
+      lo = -std::ldexp(1.f, (int)bit_depth - 1);
+      hi = std::ldexp(1.f, (int)bit_depth - 1) - 1.f;
     } else {
-      if (is_unsigned)
-        line_to_out<ui32>(ld, cols, dst, 4, do_clip, min_val, max_val);
-      else
-        line_to_out<si32>(ld, cols, dst, 4, do_clip, min_val, max_val);
+      hi = std::ldexp(1.f, (int)bit_depth) - 1.f;
+    }
+  }
+};
+
+// Widen (or, for a float image, quantize) row ``h`` of component ``c`` of
+// ``img`` into ``line``. Returns an error message, or nullptr on success.
+inline const char* row_to_line(const image_view& img, ui32 c, size_t h,
+                               line_buf* line, const sample_range& range) {
+  const char* row_start = img.data + c * img.component_stride
+                          + h * img.row_stride;
+  si32* line_data = line->i32;
+  size_t line_size = line->size;
+  if (line_size != img.width)
+    return "Line size mismatch";
+
+  if (img.is_float) {
+    if (img.element_size == 2)
+      float_to_line<half_bits>(row_start, line_size, img.col_stride, line_data,
+                               img.scale, img.offset, range.lo, range.hi);
+    else
+      float_to_line<float>(row_start, line_size, img.col_stride, line_data,
+                           img.scale, img.offset, range.lo, range.hi);
+  } else if (img.element_size == 1) {
+    if (img.is_unsigned)
+      image_to_line<ui8>(row_start, line_size, img.col_stride, line_data);
+    else
+      image_to_line<si8>(row_start, line_size, img.col_stride, line_data);
+  } else if (img.element_size == 2) {
+    if (img.is_unsigned)
+      image_to_line<ui16>(row_start, line_size, img.col_stride, line_data);
+    else
+      image_to_line<si16>(row_start, line_size, img.col_stride, line_data);
+  } else {
+    if (img.is_unsigned)
+      image_to_line<ui32>(row_start, line_size, img.col_stride, line_data);
+    else
+      image_to_line<si32>(row_start, line_size, img.col_stride, line_data);
+  }
+  return nullptr;
+}
+
+// Push every line of every component of ``img`` into a codestream whose
+// headers have been written. Returns an error message, or nullptr on success.
+// Must be called with the GIL released.
+inline const char* push_image(codestream& cs, const image_view& img) {
+  sample_range range(cs);
+  ui32 next_comp = 0;
+  line_buf* line = cs.exchange(nullptr, next_comp);
+  for (ui32 c = 0; c < img.num_components; ++c) {
+    for (size_t h = 0; h < img.height; ++h) {
+      if (const char* err = row_to_line(img, c, h, line, range))
+        return err;
+      next_comp = (h == img.height - 1 && c < img.num_components - 1) ? c + 1 : c;
+      line = cs.exchange(line, next_comp);
+    }
+  }
+  return nullptr;
+}
+
+// Push the rows of a stripe ``img`` into a codestream set to non-planar
+// (set_planar(false)), which asks for every component of a row before the
+// next row, so an image can be pushed a stripe at a time. ``line`` is the
+// line the codestream handed out last (for component 0 of the stripe's first
+// row); it is updated to the next one. Returns an error message, or nullptr
+// on success. Must be called with the GIL released.
+inline const char* push_stripe(codestream& cs, const image_view& img,
+                               line_buf*& line) {
+  sample_range range(cs);
+  for (size_t h = 0; h < img.height; ++h) {
+    for (ui32 c = 0; c < img.num_components; ++c) {
+      if (line == nullptr)
+        return "More rows than the image height";
+      if (const char* err = row_to_line(img, c, h, line, range))
+        return err;
+      ui32 next_comp = 0;
+      line = cs.exchange(line, next_comp);
+      if (line != nullptr && next_comp != (c + 1) % img.num_components)
+        return "The codestream is not set to non-planar line exchange";
+    }
+  }
+  return nullptr;
+}
+
+// Encode parameters shared by every native encode entry point. Python
+// validates the user-facing arguments once (ojph._imwrite._encode_config) and
+// fills one of these; apply() then configures a fresh codestream the same way
+// imwrite always has.
+struct encode_config {
+  ui32 width = 0, height = 0;
+  ui32 num_components = 1;
+  ui32 bit_depth = 8;
+  bool is_signed = false;
+  // Float images are quantized to bit_depth/is_signed samples as
+  // round(v * scale + offset).
+  bool float_input = false;
+  float scale = 1.f, offset = 0.f;
+  std::string channel_order = "HW";
+  int num_decompositions = -1;   // < 0: the OpenJPH default
+  bool reversible = true;
+  int wavelet_kern = -1;         // < 0: the Part 1 kernel picked by reversible
+  float qstep = 0.f;             // <= 0: the OpenJPH default
+  std::string progression_order = "RLCP";
+  bool tlm_marker = true;
+  bool tileparts_at_resolutions = true;
+  bool tileparts_at_components = false;
+  ui32 tile_width = 0, tile_height = 0;  // 0: the whole image is one tile
+  // Position of the image on the reference grid. Always 0 for user images;
+  // encode_tiled sets it to encode one tile of a larger image on its own.
+  ui32 x0 = 0, y0 = 0;
+
+  bool is_tiled() const {
+    return tile_width && tile_height &&
+           (tile_width < width || tile_height < height);
+  }
+
+  void apply(codestream& cs) const {
+    param_siz siz = cs.access_siz();
+    siz.set_image_extent(point(x0 + width, y0 + height));
+    if (x0 || y0) {
+      siz.set_image_offset(point(x0, y0));
+      siz.set_tile_offset(point(x0, y0));
+    }
+    if (tile_width && tile_height)
+      siz.set_tile_size(ojph::size(tile_width, tile_height));
+    siz.set_num_components(num_components);
+    for (ui32 c = 0; c < num_components; ++c)
+      siz.set_component(c, point(1, 1), bit_depth, is_signed);
+    param_cod cod = cs.access_cod();
+    cod.set_progression_order(progression_order.c_str());
+    cod.set_reversible(reversible);
+    if (wavelet_kern >= 0)
+      cod.set_wavelet_kern((ui32)wavelet_kern);
+    cod.set_color_transform(false);
+    if (num_decompositions >= 0)
+      cod.set_num_decomposition((ui32)num_decompositions);
+    if (!reversible && qstep > 0.f)
+      cs.access_qcd().set_irrev_quant(qstep);
+    cs.set_planar(num_components > 1);
+    cs.set_tilepart_divisions(tileparts_at_resolutions, tileparts_at_components);
+    cs.request_tlm_marker(tlm_marker);
+  }
+
+  // Raise ValueError (GIL held) unless ``img`` has the configured geometry,
+  // and hand a float image the configured quantization.
+  void check(image_view& img, const any_array& image) const {
+    if (img.height != height || img.width != width)
+      throw nb::value_error("image shape does not match the encoder configuration");
+    if (img.is_float != float_input ||
+        (!float_input && (item_size(image) * 8 != bit_depth ||
+                          is_unsigned_dtype(image) == is_signed)))
+      throw nb::value_error("image dtype does not match the encoder configuration");
+    img.scale = scale;
+    img.offset = offset;
+  }
+};
+
+// The whole encode of one image into ``file``: configure, write the headers,
+// push every line and flush. The codestream is deliberately not closed, since
+// closing it would also close (and, for a mem_outfile, free) ``file``. Returns
+// an error message, or nullptr on success; codec errors propagate as the
+// std::runtime_error OpenJPH throws. Must be called with the GIL released.
+inline const char* encode_image(const encode_config& cfg,
+                                const image_view& img, outfile_base* file) {
+  codestream cs;
+  cfg.apply(cs);
+  cs.write_headers(file, nullptr, 0);
+  const char* err = push_image(cs, img);
+  if (!err)
+    cs.flush();
+  return err;
+}
+
+// Stitch independently encoded single-tile codestreams into one multi-tile
+// codestream for the tile grid of ``cfg`` and write it to ``file``. Tile t of
+// the grid must have been encoded on its own at its reference-grid position
+// (encode_config::x0/y0), which makes its packets exactly those of tile t in
+// a multi-tile encode: only the SIZ geometry of the main header and the tile
+// index of each SOT need rewriting. Tile-parts are written part-major
+// (the first tile-part of every tile, then the second, ...) so that, with
+// tile-parts at resolutions, a reduced-resolution read needs only a prefix
+// of the codestream. Returns an error message, or nullptr on success.
+inline const char* assemble_tiles(const encode_config& cfg,
+                                  const std::vector<mem_outfile>& tiles,
+                                  outfile_base* file) {
+  std::vector<std::vector<tile_part>> tile_parts(tiles.size());
+  main_header mh;
+  size_t max_parts = 0;
+  for (size_t t = 0; t < tiles.size(); ++t) {
+    const ui8* buf = tiles[t].get_data();
+    size_t size = (size_t)tiles[t].get_used_size();
+    main_header tile_mh;
+    if (!parse_main_header(buf, size, tile_mh) ||
+        !list_tile_parts(buf, size, tile_mh.end, tile_parts[t]) ||
+        tile_parts[t].empty())
+      return "assemble_tiles: could not parse an encoded tile";
+    if (t == 0)
+      mh = tile_mh;
+    if (tile_parts[t].size() > max_parts)
+      max_parts = tile_parts[t].size();
+  }
+  if (tiles.size() > 65535)
+    return "assemble_tiles: too many tiles";
+
+  // Main header of tile 0 with the geometry of the whole tile grid.
+  std::vector<ui8> header(tiles[0].get_data(), tiles[0].get_data() + mh.end);
+  siz_geometry g;
+  g.Xsiz = cfg.width;
+  g.Ysiz = cfg.height;
+  g.XTsiz = cfg.tile_width;
+  g.YTsiz = cfg.tile_height;
+  write_siz_geometry(header.data(), mh.siz_pos, g);
+
+  std::vector<tile_part> order;
+  std::vector<const ui8*> sources;
+  for (size_t k = 0; k < max_parts; ++k)
+    for (size_t t = 0; t < tiles.size(); ++t)
+      if (k < tile_parts[t].size()) {
+        tile_part tp = tile_parts[t][k];
+        tp.tile = (ui16)t;
+        order.push_back(tp);
+        sources.push_back(tiles[t].get_data() + tp.pos);
+      }
+  if (cfg.tlm_marker)
+    append_tlm(header, order);
+
+  if (file->write(header.data(), header.size()) != header.size())
+    return "assemble_tiles: write failed";
+  for (size_t i = 0; i < order.size(); ++i) {
+    ui8 sot[12];
+    std::memcpy(sot, sources[i], 12);
+    write_be16(sot + 4, order[i].tile);
+    write_be32(sot + 6, (ui32)order[i].length);
+    if (file->write(sot, 12) != 12 ||
+        file->write(sources[i] + 12, order[i].length - 12) != order[i].length - 12)
+      return "assemble_tiles: write failed";
+  }
+  ui8 eoc[2];
+  write_be16(eoc, J2K_EOC);
+  if (file->write(eoc, 2) != 2)
+    return "assemble_tiles: write failed";
+  return nullptr;
+}
+
+// Encode ``img`` as a multi-tile codestream with the tile grid of ``cfg``,
+// encoding the tiles concurrently on ``num_threads`` native threads (each as
+// a standalone codestream at its grid position) and then assembling them
+// with assemble_tiles. Errors are returned as a message (empty on success).
+// Must be called with the GIL released.
+inline std::string encode_tiled(const encode_config& cfg, const image_view& img,
+                                outfile_base* file, unsigned num_threads) {
+  if (!cfg.is_tiled()) {
+    try {
+      const char* err = encode_image(cfg, img, file);
+      return err ? err : "";
+    } catch (const std::exception& e) {
+      return e.what();
+    }
+  }
+  ui32 ntx = (cfg.width + cfg.tile_width - 1) / cfg.tile_width;
+  ui32 nty = (cfg.height + cfg.tile_height - 1) / cfg.tile_height;
+  size_t n = (size_t)ntx * nty;
+  std::vector<mem_outfile> tiles(n);
+  std::vector<std::string> errors(n);
+  parallel_for(n, num_threads, [&](size_t t) {
+    ui32 tx0 = (ui32)(t % ntx) * cfg.tile_width;
+    ui32 ty0 = (ui32)(t / ntx) * cfg.tile_height;
+    encode_config tile_cfg = cfg;
+    tile_cfg.x0 = tx0;
+    tile_cfg.y0 = ty0;
+    tile_cfg.width = std::min(cfg.tile_width, cfg.width - tx0);
+    tile_cfg.height = std::min(cfg.tile_height, cfg.height - ty0);
+    tile_cfg.tlm_marker = false;
+    image_view tile_img = img;
+    tile_img.data += ty0 * img.row_stride + tx0 * img.col_stride;
+    tile_img.height = tile_cfg.height;
+    tile_img.width = tile_cfg.width;
+    try {
+      tiles[t].open(65536, false);
+      const char* err = encode_image(tile_cfg, tile_img, &tiles[t]);
+      if (err)
+        errors[t] = err;
+    } catch (const std::exception& e) {
+      errors[t] = e.what();
+      if (errors[t].empty())
+        errors[t] = "encode_tiled: encode failed";
+    }
+  });
+  for (const std::string& err : errors)
+    if (!err.empty())
+      return err;
+  try {
+    const char* err = assemble_tiles(cfg, tiles, file);
+    return err ? err : "";
+  } catch (const std::exception& e) {
+    return e.what();
+  }
+}
+
+// An outfile writing into a caller-provided buffer of fixed capacity. Writes
+// past the capacity are dropped but still counted, so after an encode size()
+// is the full codestream size whether or not it fitted. Seeking (used to
+// back-fill the TLM marker) works within everything written so far.
+class buffer_outfile : public outfile_base {
+public:
+  buffer_outfile(ui8* data, size_t capacity)
+  : data(data), capacity(capacity) {}
+
+  size_t write(const void* ptr, size_t size) override {
+    if (pos < capacity)
+      std::memcpy(data + pos, ptr, std::min(size, capacity - pos));
+    pos += size;
+    used = std::max(used, pos);
+    return size;
+  }
+  si64 tell() override { return (si64)pos; }
+  int seek(si64 offset, enum outfile_base::seek origin) override {
+    si64 base = 0;
+    if (origin == OJPH_SEEK_CUR)
+      base = (si64)pos;
+    else if (origin == OJPH_SEEK_END)
+      base = (si64)used;
+    if (base + offset < 0)
+      return -1;
+    pos = (size_t)(base + offset);
+    return 0;
+  }
+
+  size_t size() const { return used; }
+  bool overflowed() const { return used > capacity; }
+
+private:
+  ui8* data;
+  size_t capacity;
+  size_t pos = 0, used = 0;
+};
+
+// A growable in-memory outfile that keeps its allocation when rewound with
+// reset(), so a stream of encodes into it stops allocating once it has held
+// the largest codestream. Seeking (used to back-fill the TLM marker) works
+// within everything written so far.
+class growable_outfile : public outfile_base {
+public:
+  size_t write(const void* ptr, size_t size) override {
+    if (pos + size > capacity) {
+      size_t grown = std::max(pos + size, capacity * 2);
+      std::unique_ptr<ui8[]> bigger(new ui8[grown]);
+      if (used)
+        std::memcpy(bigger.get(), buf.get(), used);
+      buf = std::move(bigger);
+      capacity = grown;
+    }
+    std::memcpy(buf.get() + pos, ptr, size);
+    pos += size;
+    used = std::max(used, pos);
+    return size;
+  }
+  si64 tell() override { return (si64)pos; }
+  int seek(si64 offset, enum outfile_base::seek origin) override {
+    si64 base = 0;
+    if (origin == OJPH_SEEK_CUR)
+      base = (si64)pos;
+    else if (origin == OJPH_SEEK_END)
+      base = (si64)used;
+    if (base + offset < 0 || base + offset > (si64)used)
+      return -1;
+    pos = (size_t)(base + offset);
+    return 0;
+  }
+
+  void reset() { pos = used = 0; }
+  const ui8* data() const { return buf.get(); }
+  size_t size() const { return used; }
+
+private:
+  std::unique_ptr<ui8[]> buf;
+  size_t capacity = 0;
+  size_t pos = 0, used = 0;
+};
+
+// One codestream reused for a stream of images with the same encode_config.
+// After the first image, codestream::restart() resets it in place before
+// each encode, keeping its allocations (line buffers, codeblock state), so
+// only the parameters are set again. Like any codestream, it must not be
+// used by two threads at once.
+class frame_encoder {
+public:
+  explicit frame_encoder(const encode_config& config) : config(config) {}
+
+  // Encode ``img`` into ``file``, which is not closed; tiled images go to
+  // encode_tiled when ``num_threads`` is not 1. Returns an error message,
+  // empty on success. Must be called with the GIL released.
+  std::string encode(const image_view& img, outfile_base* file,
+                     unsigned num_threads) {
+    if (config.is_tiled() && num_threads != 1)
+      return encode_tiled(config, img, file, num_threads);
+    try {
+      if (used)
+        cs.restart();
+      used = true;
+      config.apply(cs);
+      cs.write_headers(file, nullptr, 0);
+      const char* err = push_image(cs, img);
+      if (err)
+        return err;
+      cs.flush();
+      return "";
+    } catch (const std::exception& e) {
+      return e.what();
     }
   }
+
+  encode_config config;
+  // Where encode() without a caller buffer writes, kept between images.
+  growable_outfile out;
+
+private:
+  codestream cs;
+  bool used = false;
+};
+
+// A 1D NumPy array that owns a fresh heap allocation of ``n`` elements.
+template <typename T>
+inline nb::ndarray<nb::numpy, T, nb::ndim<1>> owned_array(size_t n, T** ptr) {
+  T* buf = new T[n ? n : 1];
+  nb::capsule owner(buf, [](void* p) noexcept { delete[] static_cast<T*>(p); });
+  *ptr = buf;
+  return nb::ndarray<nb::numpy, T, nb::ndim<1>>(buf, {n}, owner);
 }
 
 }  // anonymous namespace
@@ -360,152 +2237,41 @@ NB_MODULE(ojph_bindings, m) {
              nb::arg("line_buf_obj") = nb::none(), nb::arg("next_component") = 0,
              nb::rv_policy::reference)
         .def("push_all_components",
-             [](codestream &self, any_array image, ui32 num_components, const std::string& channel_order) {
-                 size_t element_size = item_size(image);
-                 bool src_unsigned = is_unsigned_dtype(image);
-
-                 size_t height, width;
-                 size_t component_stride;
-
-                 if (num_components == 1) {
-                     if (image.ndim() == 2) {
-                         height = image.shape(0);
-                         width = image.shape(1);
-                         component_stride = 0;
-                     } else if (image.ndim() == 3 && image.shape(2) == 1) {
-                         height = image.shape(0);
-                         width = image.shape(1);
-                         component_stride = 0;
-                     } else {
-                         throw nb::value_error("Image must be 2-dimensional or 3-dimensional with last dimension of 1 for single component");
-                     }
-                 } else {
-                     if (image.ndim() != 3) {
-                         throw nb::value_error("Image must be 3-dimensional for multiple components");
-                     }
-                     if (channel_order == "CHW") {
-                         height = image.shape(1);
-                         width = image.shape(2);
-                         component_stride = byte_stride(image, 0);
-                     } else {
-                         height = image.shape(0);
-                         width = image.shape(1);
-                         component_stride = byte_stride(image, 2);
-                     }
-                 }
-
-                 size_t row_stride, col_stride;
-                 if (num_components == 1) {
-                     row_stride = byte_stride(image, 0);
-                     col_stride = byte_stride(image, 1);
-                 } else if (channel_order == "CHW") {
-                     row_stride = byte_stride(image, 1);
-                     col_stride = byte_stride(image, 2);
-                 } else {
-                     row_stride = byte_stride(image, 0);
-                     col_stride = byte_stride(image, 1);
+             [](codestream &self, any_array image, ui32 num_components, const std::string& channel_order,
+                float scale, float offset) {
+                 image_view img = make_image_view(image, num_components, channel_order);
+                 img.scale = scale;
+                 img.offset = offset;
+                 const char* err = nullptr;
+                 {
+                     nb::gil_scoped_release release;
+                     err = push_image(self, img);
                  }
-
+                 if (err)
+                     throw nb::value_error(err);
+             },
+             nb::arg("image"), nb::arg("num_components"), nb::arg("channel_order"),
+             nb::arg("scale") = 1.f, nb::arg("offset") = 0.f)
+        // Push a stripe of rows into a non-planar codestream; ``line`` is the
+        // line returned by the previous exchange or push_rows, and the next
+        // one is returned. See StreamingEncoder.
+        .def("push_rows",
+             [](codestream &self, line_buf* line, any_array rows, ui32 num_components, const std::string& channel_order,
+                float scale, float offset) -> line_buf* {
+                 image_view img = make_image_view(rows, num_components, channel_order);
+                 img.scale = scale;
+                 img.offset = offset;
                  const char* err = nullptr;
                  {
                      nb::gil_scoped_release release;
-                     ui32 next_comp = 0;
-                     ui32& next_comp_ref = next_comp;
-                     line_buf* line = self.exchange(nullptr, next_comp_ref);
-
-                     for (ui32 c = 0; c < num_components && !err; ++c) {
-                         char* component_base = static_cast<char*>(image.data());
-                         if (num_components > 1)
-                             component_base += c * component_stride;
-
-                         for (size_t h = 0; h < height; ++h) {
-                             char* row_start = component_base + h * row_stride;
-                             si32* line_data = line->i32;
-                             size_t line_size = line->size;
-
-                             if (line_size != width) {
-                                 err = "Line size mismatch";
-                                 break;
-                             }
-
-                             if (col_stride == element_size) {
-                                 // Contiguous row: with the stride known to
-                                 // equal the element size, these tight loops
-                                 // auto-vectorize into packed widening loads,
-                                 // which the generic strided loops below
-                                 // cannot.
-                                 if (element_size == 1) {
-                                     if (src_unsigned) {
-                                         const ui8* sp = reinterpret_cast<const ui8*>(row_start);
-                                         for (size_t i = 0; i < line_size; ++i)
-                                             line_data[i] = static_cast<si32>(sp[i]);
-                                     } else {
-                                         const si8* sp = reinterpret_cast<const si8*>(row_start);
-                                         for (size_t i = 0; i < line_size; ++i)
-                                             line_data[i] = static_cast<si32>(sp[i]);
-                                     }
-                                 } else if (element_size == 2) {
-                                     if (src_unsigned) {
-                                         const ui16* sp = reinterpret_cast<const ui16*>(row_start);
-                                         for (size_t i = 0; i < line_size; ++i)
-                                             line_data[i] = static_cast<si32>(sp[i]);
-                                     } else {
-                                         const si16* sp = reinterpret_cast<const si16*>(row_start);
-                                         for (size_t i = 0; i < line_size; ++i)
-                                             line_data[i] = static_cast<si32>(sp[i]);
-                                     }
-                                 } else {
-                                     if (src_unsigned) {
-                                         const ui32* sp = reinterpret_cast<const ui32*>(row_start);
-                                         for (size_t i = 0; i < line_size; ++i)
-                                             line_data[i] = static_cast<si32>(sp[i]);
-                                     } else {
-                                         const si32* sp = reinterpret_cast<const si32*>(row_start);
-                                         for (size_t i = 0; i < line_size; ++i)
-                                             line_data[i] = sp[i];
-                                     }
-                                 }
-                             } else if (element_size == 1) {
-                                 if (src_unsigned) {
-                                     for (size_t i = 0; i < line_size; ++i) {
-                                         line_data[i] = static_cast<si32>(*reinterpret_cast<const ui8*>(row_start + i * col_stride));
-                                     }
-                                 } else {
-                                     for (size_t i = 0; i < line_size; ++i) {
-                                         line_data[i] = static_cast<si32>(*reinterpret_cast<const si8*>(row_start + i * col_stride));
-                                     }
-                                 }
-                             } else if (element_size == 2) {
-                                 if (src_unsigned) {
-                                     for (size_t i = 0; i < line_size; ++i) {
-                                         line_data[i] = static_cast<si32>(*reinterpret_cast<const ui16*>(row_start + i * col_stride));
-                                     }
-                                 } else {
-                                     for (size_t i = 0; i < line_size; ++i) {
-                                         line_data[i] = static_cast<si32>(*reinterpret_cast<const si16*>(row_start + i * col_stride));
-                                     }
-                                 }
-                             } else {
-                                 if (src_unsigned) {
-                                     for (size_t i = 0; i < line_size; ++i) {
-                                         line_data[i] = static_cast<si32>(*reinterpret_cast<const ui32*>(row_start + i * col_stride));
-                                     }
-                                 } else {
-                                     for (size_t i = 0; i < line_size; ++i) {
-                                         line_data[i] = *reinterpret_cast<const si32*>(row_start + i * col_stride);
-                                     }
-                                 }
-                             }
-
-                             next_comp = (h == height - 1 && c < num_components - 1) ? c + 1 : c;
-                             line = self.exchange(line, next_comp_ref);
-                         }
-                     }
+                     err = push_stripe(self, img, line);
                  }
                  if (err)
                      throw nb::value_error(err);
+                 return line;
              },
-             nb::arg("image"), nb::arg("num_components"), nb::arg("channel_order"))
+             nb::arg("line"), nb::arg("rows"), nb::arg("num_components"), nb::arg("channel_order"),
+             nb::arg("scale") = 1.f, nb::arg("offset") = 0.f, nb::rv_policy::reference)
         .def("flush", &codestream::flush, nb::call_guard<nb::gil_scoped_release>())
         .def("enable_resilience", &codestream::enable_resilience)
         .def("read_headers", &codestream::read_headers, nb::call_guard<nb::gil_scoped_release>())
@@ -514,7 +2280,10 @@ NB_MODULE(ojph_bindings, m) {
         .def("pull", &codestream::pull, nb::call_guard<nb::gil_scoped_release>(),
              nb::rv_policy::reference)
         .def("pull_all_components",
-             [](codestream &self, any_array output, ui32 num_components, const std::string& channel_order, nb::object min_val_obj, nb::object max_val_obj) {
+             [](codestream &self, any_array output, ui32 num_components, const std::string& channel_order, nb::object min_val_obj, nb::object max_val_obj,
+                size_t row_offset, size_t col_offset, float scale, float offset,
+                std::optional<int> shift, std::optional<std::array<float, 2>> window,
+                std::optional<u8_lut> lut, si32 lut_offset) {
                  bool do_clip = !min_val_obj.is_none() && !max_val_obj.is_none();
                  si32 min_val = 0;
                  si32 max_val = 0;
@@ -523,94 +2292,32 @@ NB_MODULE(ojph_bindings, m) {
                      max_val = nb::cast<si32>(max_val_obj);
                  }
 
-                 bool is_unsigned = is_unsigned_dtype(output);
-                 size_t element_size = item_size(output);
-
-                 size_t height, width;
-                 size_t component_stride;
-
-                 if (num_components == 1) {
-                     if (output.ndim() != 2) {
-                         throw nb::value_error("Output must be 2-dimensional for single component");
-                     }
-                     height = output.shape(0);
-                     width = output.shape(1);
-                     component_stride = 0;
-                 } else {
-                     if (output.ndim() != 3) {
-                         throw nb::value_error("Output must be 3-dimensional for multiple components");
-                     }
-                     if (channel_order == "CHW") {
-                         height = output.shape(1);
-                         width = output.shape(2);
-                         component_stride = byte_stride(output, 0);
-                     } else {
-                         height = output.shape(0);
-                         width = output.shape(1);
-                         component_stride = byte_stride(output, 2);
-                     }
-                 }
-
-                 size_t row_stride = (num_components == 1 || channel_order == "CHW")
-                     ? byte_stride(output, output.ndim() - 2) : byte_stride(output, 0);
-                 size_t col_stride = (num_components == 1 || channel_order == "CHW")
-                     ? byte_stride(output, output.ndim() - 1) : byte_stride(output, 1);
+                 if (num_components == 1 && output.ndim() != 2)
+                     throw nb::value_error("Output must be 2-dimensional for single component");
+                 if (num_components > 1 && output.ndim() != 3)
+                     throw nb::value_error("Output must be 3-dimensional for multiple components");
+                 decode_view view = make_decode_view(output, channel_order);
+                 if (view.num_components != num_components)
+                     throw nb::value_error("Output does not have num_components components");
+                 view.scale = scale;
+                 view.offset = offset;
+                 set_output_map(view, shift, window, lut, lut_offset);
 
                  const char* err = nullptr;
                  {
                      nb::gil_scoped_release release;
-                     for (ui32 c = 0; c < num_components && !err; ++c) {
-                         char* component_base = static_cast<char*>(output.data());
-                         if (num_components > 1)
-                             component_base += c * component_stride;
-
-                         line_buf* first_line = self.pull(c);
-                         size_t line_size = first_line->size;
-                         if (line_size != width) {
-                             err = "Line size mismatch";
-                             break;
-                         }
-
-                         for (size_t h = 0; h < height; ++h) {
-                             line_buf* line = (h == 0) ? first_line : self.pull(c);
-                             si32* line_data = line->i32;
-                             char* out_row_start = component_base + h * row_stride;
-
-                             if (element_size == 1) {
-                                 if (is_unsigned)
-                                     line_to_out<ui8>(line_data, line_size,
-                                         out_row_start, col_stride,
-                                         do_clip, min_val, max_val);
-                                 else
-                                     line_to_out<si8>(line_data, line_size,
-                                         out_row_start, col_stride,
-                                         do_clip, min_val, max_val);
-                             } else if (element_size == 2) {
-                                 if (is_unsigned)
-                                     line_to_out<ui16>(line_data, line_size,
-                                         out_row_start, col_stride,
-                                         do_clip, min_val, max_val);
-                                 else
-                                     line_to_out<si16>(line_data, line_size,
-                                         out_row_start, col_stride,
-                                         do_clip, min_val, max_val);
-                             } else {
-                                 if (is_unsigned)
-                                     line_to_out<ui32>(line_data, line_size,
-                                         out_row_start, col_stride,
-                                         do_clip, min_val, max_val);
-                                 else
-                                     line_to_out<si32>(line_data, line_size,
-                                         out_row_start, col_stride,
-                                         do_clip, min_val, max_val);
-                             }
-                         }
-                     }
+                     err = pull_into(self, view, do_clip, min_val, max_val,
+                                     row_offset, col_offset);
                  }
                  if (err)
                      throw nb::value_error(err);
              },
-             nb::arg("output"), nb::arg("num_components"), nb::arg("channel_order"), nb::arg("min_val") = nb::none(), nb::arg("max_val") = nb::none())
+             nb::arg("output"), nb::arg("num_components"), nb::arg("channel_order"), nb::arg("min_val") = nb::none(), nb::arg("max_val") = nb::none(),
+             nb::arg("row_offset") = 0, nb::arg("col_offset") = 0,
+             nb::arg("scale") = 1.f, nb::arg("offset") = 0.f,
+             nb::arg("shift") = nb::none(), nb::arg("window") = nb::none(),
+             nb::arg("lut") = nb::none(), nb::arg("lut_offset") = 0)
+        .def("restart", &codestream::restart)
         .def("close", &codestream::close)
         .def("access_siz", &codestream::access_siz)
         .def("access_cod", &codestream::access_cod)
@@ -627,66 +2334,205 @@ NB_MODULE(ojph_bindings, m) {
     // letting a Python ThreadPoolExecutor actually parallelise many small
     // reduced-resolution decodes: with the orchestration living in Python the
     // threads serialise on the GIL, whereas here the GIL is released for the
-    // whole decode. Single-component (grayscale) uint8/uint16 only for now.
+    // whole decode.
     //
     // ``data``  : compressed codestream bytes (a full or partial read; if
     //             partial, the caller must have written an EOF marker).
-    // ``out``   : pre-allocated, C-contiguous 2D array at the level shape,
-    //             using the caller's own (aligned) allocator.
+    // ``out``   : pre-allocated, C-contiguous array at the level shape,
+    //             using the caller's own (aligned) allocator: 2D for a single
+    //             component, 3D in ``channel_order`` ("HWC" or "CHW") for
+    //             several, as pull_all_components lays them out.
     // ``level`` : number of finest resolutions to skip (0 == full res).
+    // ``region``: optional (y0, y1, x0, x1) window of the level; only the
+    //             tiles intersecting it are decoded and ``out`` must have
+    //             the window's shape.
+    // ``scale``, ``value_offset``: a float16/float32 ``out`` receives
+    //             v * scale + value_offset, fused into the line copy.
+    // ``shift``, ``window``, ``lut``: a uint8 ``out`` may instead receive
+    //             v >> shift, the window (lo, hi) stretched to [0, 255], or
+    //             lut[v + lut_offset], clipped (see set_output_map).
     // Returns (height, width) actually decoded so the caller can slice.
     // -----------------------------------------------------------------------
     m.def("read_j2c_into",
         [](nb::ndarray<const ui8, nb::ndim<1>, nb::device::cpu> data,
            any_array out, int level,
-           nb::object min_val_obj, nb::object max_val_obj)
+           nb::object min_val_obj, nb::object max_val_obj,
+           std::optional<std::array<size_t, 4>> region,
+           const std::string& channel_order, float scale, float value_offset,
+           std::optional<int> shift, std::optional<std::array<float, 2>> window,
+           std::optional<u8_lut> lut, si32 lut_offset)
             -> std::pair<ui32, ui32> {
-            if (out.ndim() != 2)
-                throw nb::value_error("out must be 2-dimensional (single component)");
-            if (!is_c_contig_2d(out))
-                throw nb::value_error("out must be C-contiguous");
-
-            const ui8* data_ptr = data.data();
-            size_t data_size = data.size();
-            char* out_ptr = static_cast<char*>(out.data());
-            size_t out_rows = out.shape(0);
-            size_t out_cols = out.shape(1);
-            size_t row_stride = byte_stride(out, 0);
-            size_t element_size = item_size(out);
-            bool is_unsigned = is_unsigned_dtype(out);
+            if (const char* msg = check_decode_out(out))
+                throw nb::value_error(msg);
+            decode_view view = make_decode_view(out, channel_order);
+            view.scale = scale;
+            view.offset = value_offset;
+            set_output_map(view, shift, window, lut, lut_offset);
 
             bool do_clip = !min_val_obj.is_none() && !max_val_obj.is_none();
             si32 min_val = do_clip ? nb::cast<si32>(min_val_obj) : 0;
             si32 max_val = do_clip ? nb::cast<si32>(max_val_obj) : 0;
 
             ui32 h = 0, w = 0;
-            bool shape_ok = false;
+            std::string err;
             {
                 nb::gil_scoped_release release;
-
-                mem_infile infile;
-                infile.open(data_ptr, data_size);
-                codestream cs;
-                cs.read_headers(&infile);
-                cs.restrict_input_resolution((ui32)level, (ui32)level);
-                param_siz siz = cs.access_siz();
-                h = siz.get_recon_height(0);
-                w = siz.get_recon_width(0);
-                shape_ok = ((size_t)h == out_rows && (size_t)w == out_cols);
-                if (shape_ok) {
-                    cs.create();
-                    pull_single_component_into(
-                        cs, out_ptr, out_rows, out_cols, row_stride,
-                        element_size, is_unsigned, do_clip, min_val, max_val);
-                }
-                cs.close();
+                err = decode_into(data.data(), data.size(), level,
+                                  region ? region->data() : nullptr, view,
+                                  do_clip, min_val, max_val, h, w);
             }
-            if (!shape_ok)
-                throw nb::value_error("out shape does not match decoded level shape");
+            if (!err.empty())
+                throw nb::value_error(err.c_str());
             return std::make_pair(h, w);
         },
         nb::arg("data"), nb::arg("out"), nb::arg("level"),
-        nb::arg("min_val") = nb::none(), nb::arg("max_val") = nb::none());
+        nb::arg("min_val") = nb::none(), nb::arg("max_val") = nb::none(),
+        nb::arg("region") = nb::none(), nb::arg("channel_order") = "HWC",
+        nb::arg("scale") = 1.f, nb::arg("value_offset") = 0.f,
+        nb::arg("shift") = nb::none(), nb::arg("window") = nb::none(),
+        nb::arg("lut") = nb::none(), nb::arg("lut_offset") = 0);
+
+    // -----------------------------------------------------------------------
+    // j2c_main_header_size: the length of the main header (SOC up to the
+    // first SOT) of the codestream in ``data``, or 0 if it cannot be parsed.
+    // Everything read_headers reports about the image comes from these bytes.
+    // -----------------------------------------------------------------------
+    m.def("j2c_main_header_size",
+        [](nb::ndarray<const ui8, nb::ndim<1>, nb::device::cpu> data) -> size_t {
+            main_header mh;
+            if (!parse_main_header(data.data(), data.size(), mh))
+                return 0;
+            return mh.end;
+        },
+        nb::arg("data"));
+
+    // -----------------------------------------------------------------------
+    // j2c_level_ranges: the byte ranges [start, stop) of the tile-parts a
+    // decode of ``level`` needs, as indexed from the TLM segments of the main
+    // header in ``data`` (which may be just the main header). None when the
+    // whole codestream must be read.
+    // -----------------------------------------------------------------------
+    m.def("j2c_level_ranges",
+        [](nb::ndarray<const ui8, nb::ndim<1>, nb::device::cpu> data,
+           ui32 level) -> std::optional<std::vector<std::pair<size_t, size_t>>> {
+            main_header mh;
+            std::vector<std::pair<size_t, size_t>> ranges;
+            if (!parse_main_header(data.data(), data.size(), mh) ||
+                !plan_level_read(data.data(), mh, level, ranges))
+                return std::nullopt;
+            return ranges;
+        },
+        nb::arg("data"), nb::arg("level"));
+
+    // -----------------------------------------------------------------------
+    // crop_j2c_to_region: the codestream a decode of ``region`` (y0, y1, x0,
+    // x1 at ``level``) needs. Returns (data, row_offset, col_offset) where
+    // ``data`` holds only the intersecting tiles (None when every tile is
+    // needed) and the offsets locate the region within the image that
+    // decoding ``data`` (or the original) produces at ``level``.
+    // -----------------------------------------------------------------------
+    m.def("crop_j2c_to_region",
+        [](nb::ndarray<const ui8, nb::ndim<1>, nb::device::cpu> data,
+           ui32 level, std::array<size_t, 4> region)
+            -> std::tuple<nb::object, size_t, size_t> {
+            if (region[0] >= region[1] || region[2] >= region[3])
+                throw nb::value_error("region must not be empty");
+            region_codestream rc;
+            {
+                nb::gil_scoped_release release;
+                crop_to_region(data.data(), data.size(), level,
+                               region.data(), rc);
+            }
+            nb::object cropped = nb::none();
+            if (!rc.data.empty()) {
+                ui8* ptr = nullptr;
+                auto arr = owned_array<ui8>(rc.data.size(), &ptr);
+                std::memcpy(ptr, rc.data.data(), rc.data.size());
+                cropped = nb::cast(arr);
+            }
+            return std::make_tuple(cropped, rc.row_offset, rc.col_offset);
+        },
+        nb::arg("data"), nb::arg("level"), nb::arg("region"));
+
+    // -----------------------------------------------------------------------
+    // read_j2c_batch: read_j2c_into for many codestreams in ONE native call.
+    //
+    // Every (data, out, level) item is decoded exactly as read_j2c_into would,
+    // but the items are fanned out over ``num_threads`` native threads (0 ==
+    // one per hardware thread) under a single nb::gil_scoped_release. For
+    // small tiles this removes the per-item Python dispatch and future
+    // overhead of a ThreadPoolExecutor, and it scales on GIL-enabled builds
+    // as well as on free-threaded ones.
+    //
+    // ``levels`` is either one int shared by every item or a sequence with
+    // one level per item. A failing item does not stop the batch: the result
+    // is a list with ``None`` for every item that decoded and the error
+    // message for every item that did not. Only malformed arguments (e.g.
+    // lists of different lengths) raise.
+    // -----------------------------------------------------------------------
+    m.def("read_j2c_batch",
+        [](std::vector<nb::ndarray<const ui8, nb::ndim<1>, nb::device::cpu>> datas,
+           std::vector<any_array> outs, nb::object levels_obj,
+           nb::object min_val_obj, nb::object max_val_obj, unsigned num_threads,
+           const std::string& channel_order)
+            -> nb::list {
+            size_t n = datas.size();
+            if (outs.size() != n)
+                throw nb::value_error("datas and outs must have the same length");
+            std::vector<int> levels;
+            if (nb::isinstance<nb::int_>(levels_obj))
+                levels.assign(n, nb::cast<int>(levels_obj));
+            else
+                levels = nb::cast<std::vector<int>>(levels_obj);
+            if (levels.size() != n)
+                throw nb::value_error("levels must be an int or have one entry per item");
+
+            bool do_clip = !min_val_obj.is_none() && !max_val_obj.is_none();
+            si32 min_val = do_clip ? nb::cast<si32>(min_val_obj) : 0;
+            si32 max_val = do_clip ? nb::cast<si32>(max_val_obj) : 0;
+
+            std::vector<std::string> errors(n);
+            {
+                nb::gil_scoped_release release;
+                parallel_for(n, num_threads, [&](size_t i) {
+                    const any_array& out = outs[i];
+                    if (const char* msg = check_decode_out(out)) {
+                        errors[i] = msg;
+                        return;
+                    }
+                    ui32 h = 0, w = 0;
+                    try {
+                        errors[i] = decode_into(
+                            datas[i].data(), datas[i].size(), levels[i],
+                            nullptr, make_decode_view(out, channel_order),
+                            do_clip, min_val, max_val, h, w);
+                    } catch (const std::exception& e) {
+                        errors[i] = e.what();
+                        if (errors[i].empty())
+                            errors[i] = "read_j2c_batch: decode failed";
+                    }
+                });
+            }
+
+            nb::list status;
+            for (size_t i = 0; i < n; ++i) {
+                if (errors[i].empty())
+                    status.append(nb::none());
+                else
+                    status.append(nb::str(errors[i].c_str()));
+            }
+            return status;
+        },
+        nb::arg("datas"), nb::arg("outs"), nb::arg("levels"),
+        nb::arg("min_val") = nb::none(), nb::arg("max_val") = nb::none(),
+        nb::arg("num_threads") = 0, nb::arg("channel_order") = "HWC");
+
+    // -----------------------------------------------------------------------
+    // io_uring_available: whether the ``io_uring=True`` option of the fd
+    // readers submits through io_uring here, rather than falling back to
+    // pread (not Linux, a kernel older than 5.6, or blocked by seccomp).
+    // -----------------------------------------------------------------------
+    m.def("io_uring_available", []() { return io_uring_supported(); });
 
     // -----------------------------------------------------------------------
     // peek_j2c_fd: read just the main header of a codestream stored at
@@ -733,148 +2579,421 @@ NB_MODULE(ojph_bindings, m) {
         nb::arg("fd"), nb::arg("offset"), nb::arg("nbytes"),
         nb::arg("o_direct") = false);
 
+    // -----------------------------------------------------------------------
+    // read_j2c_level_fd: the codestream stored at [offset, offset+nbytes) of
+    // ``fd``, reduced to what a decode of ``level`` needs, read GIL-free
+    // exactly as read_j2c_fd_into reads it. The result decodes like the full
+    // codestream at ``level`` and any coarser level, e.g. via MemInfile.
+    // -----------------------------------------------------------------------
+    m.def("read_j2c_level_fd",
+        [](int fd, int64_t offset, int64_t nbytes, int level, bool o_direct,
+           bool io_uring)
+            -> nb::ndarray<nb::numpy, ui8, nb::ndim<1>> {
+            if (offset < 0 || nbytes <= 0)
+                throw nb::value_error("offset must be >= 0 and nbytes > 0");
+            aligned_buffer buf;
+            const char* msg;
+            {
+                nb::gil_scoped_release release;
+                msg = read_level_from_fd(fd, offset, (size_t)nbytes, level,
+                                         o_direct, buf, io_uring);
+            }
+            if (msg)
+                throw std::runtime_error(std::string("read_j2c_level_fd: ") + msg);
+            size_t size = buf.size;
+            ui8* data = buf.release();
+            nb::capsule owner(data, [](void* p) noexcept { aligned_free(p); });
+            return nb::ndarray<nb::numpy, ui8, nb::ndim<1>>(data, {size}, owner);
+        },
+        nb::arg("fd"), nb::arg("offset"), nb::arg("nbytes"), nb::arg("level"),
+        nb::arg("o_direct") = false, nb::arg("io_uring") = false);
+
+    // -----------------------------------------------------------------------
+    // j2c_codestream_size: the length of the codestream stored at ``offset``
+    // of ``fd``, within at most ``nbytes`` (see codestream_extent), so that a
+    // codestream inside a larger container can be read without the rest.
+    // -----------------------------------------------------------------------
+    m.def("j2c_codestream_size",
+        [](int fd, int64_t offset, int64_t nbytes) -> size_t {
+            if (offset < 0 || nbytes <= 0)
+                throw nb::value_error("offset must be >= 0 and nbytes > 0");
+            nb::gil_scoped_release release;
+            return codestream_extent(fd, offset, (size_t)nbytes);
+        },
+        nb::arg("fd"), nb::arg("offset"), nb::arg("nbytes"));
+
     // -----------------------------------------------------------------------
     // read_j2c_fd_into: the whole reduced-resolution read for one codestream,
     // GIL-free, straight from a file descriptor.
     //
-    // Under a single nb::gil_scoped_release it: aligned-reads the header, parses
-    // the TLM to learn how many bytes ``level`` needs, aligned-reads exactly
-    // those bytes into an aligned buffer (falling back to the whole tile if the
-    // TLM is absent), writes the EOC marker, then decodes into ``out``. All I/O
+    // Under a single nb::gil_scoped_release it: aligned-reads the main header,
+    // indexes the tile-parts from every TLM segment, reads only the tile-parts
+    // of the resolutions ``level`` keeps (one read per run of adjacent ones;
+    // the whole codestream when there is no TLM or the division does not
+    // allow it), writes the EOC marker, then decodes into ``out``. All I/O
     // uses O_DIRECT-compatible aligned buffers/lengths when ``o_direct`` is set,
-    // so the caller's O_DIRECT fast path is preserved.
+    // so the caller's O_DIRECT fast path is preserved. With ``io_uring`` the
+    // reads of separate tile-part ranges are submitted together through
+    // io_uring (Linux), falling back to pread when it is unavailable.
     //
-    // ``out`` must be a pre-allocated C-contiguous 2D array at the level shape
-    // (use peek_j2c_fd + get_level_shape math, cached per file). Returns the
-    // decoded (height, width). Single-component uint8/uint16/int8/int16.
+    // ``out`` must be a pre-allocated C-contiguous array at the level shape
+    // (use peek_j2c_fd + get_level_shape math, cached per file): 2D for a
+    // single component, 3D in ``channel_order`` ("HWC" or "CHW") for several.
+    // A float16/float32 ``out`` receives v * scale + value_offset.
+    // Returns the decoded (height, width).
     // -----------------------------------------------------------------------
     m.def("read_j2c_fd_into",
         [](int fd, int64_t offset, int64_t nbytes, any_array out, int level,
-           nb::object min_val_obj, nb::object max_val_obj, bool o_direct)
+           nb::object min_val_obj, nb::object max_val_obj, bool o_direct,
+           const std::string& channel_order, bool io_uring, float scale,
+           float value_offset, std::optional<int> shift,
+           std::optional<std::array<float, 2>> window,
+           std::optional<u8_lut> lut, si32 lut_offset)
             -> std::pair<ui32, ui32> {
-            if (out.ndim() != 2)
-                throw nb::value_error("out must be 2-dimensional (single component)");
-            if (!is_c_contig_2d(out))
-                throw nb::value_error("out must be C-contiguous");
-
-            char* out_ptr = static_cast<char*>(out.data());
-            size_t out_rows = out.shape(0);
-            size_t out_cols = out.shape(1);
-            size_t row_stride = byte_stride(out, 0);
-            size_t element_size = item_size(out);
-            bool is_unsigned = is_unsigned_dtype(out);
+            if (const char* msg = check_decode_out(out))
+                throw nb::value_error(msg);
+            decode_view view = make_decode_view(out, channel_order);
+            view.scale = scale;
+            view.offset = value_offset;
+            set_output_map(view, shift, window, lut, lut_offset);
             bool do_clip = !min_val_obj.is_none() && !max_val_obj.is_none();
             si32 min_val = do_clip ? nb::cast<si32>(min_val_obj) : 0;
             si32 max_val = do_clip ? nb::cast<si32>(max_val_obj) : 0;
 
             ui32 h = 0, w = 0;
-            const char* err = nullptr;
+            std::string err;
             {
                 nb::gil_scoped_release release;
 
-                // First read: enough to cover the main header plus, for a deep
-                // zoom-out, all the bytes that level actually needs -- so the
-                // common case is a SINGLE read and a SINGLE header parse. The
-                // codestream parsed here is reused to decode when the data fits.
-                constexpr size_t INITIAL = 65536;
-                size_t cap = (size_t)nbytes;
-                size_t first_len = INITIAL < cap ? INITIAL : cap;
-                if (o_direct) first_len = round_up(first_len, OJPH_READ_ALIGN);
-                ui8* buf = (ui8*)aligned_read_alloc(first_len + OJPH_READ_ALIGN);
-                if (!buf) {
-                    err = "read_j2c_fd_into: allocation failed";
+                aligned_buffer buf;
+                const char* msg = read_level_from_fd(
+                    fd, offset, (size_t)nbytes, level, o_direct, buf, io_uring);
+                if (msg) {
+                    err = std::string("read_j2c_fd_into: ") + msg;
                 } else {
-                    int64_t got = pread_region(fd, buf, first_len, offset, o_direct);
-                    if (got <= 0) {
-                        err = "read_j2c_fd_into: short read";
-                        aligned_free(buf);
-                    } else {
-                        size_t have = (size_t)got;
-                        mem_infile mf;
-                        mf.open(buf, have);
-                        codestream cs;
-                        cs.read_headers(&mf);
-                        ui32 nd = cs.access_cod().get_num_decompositions();
-                        size_t header_size = (size_t)mf.tell();
-                        size_t bytes_to_read =
-                            tlm_bytes_to_read(buf, header_size, nd, level);
-                        if (bytes_to_read == 0 || bytes_to_read > cap)
-                            bytes_to_read = cap;  // no/!TLM -> whole tile
-
-                        if (bytes_to_read <= have) {
-                            // Fast path: needed bytes are already in buf. Reuse
-                            // the codestream we just parsed -- no second read,
-                            // no second read_headers.
-                            buf[bytes_to_read - 2] = 0xFF;
-                            buf[bytes_to_read - 1] = 0xD9;
-                            cs.restrict_input_resolution((ui32)level, (ui32)level);
-                            param_siz siz = cs.access_siz();
-                            h = siz.get_recon_height(0);
-                            w = siz.get_recon_width(0);
-                            if ((size_t)h != out_rows || (size_t)w != out_cols)
-                                err = "out shape does not match decoded level shape";
-                            else {
-                                cs.create();
-                                pull_single_component_into(
-                                    cs, out_ptr, out_rows, out_cols, row_stride,
-                                    element_size, is_unsigned, do_clip,
-                                    min_val, max_val);
-                            }
-                            cs.close();
-                            aligned_free(buf);
-                        } else {
-                            // Shallow level: read the full extent this level
-                            // needs into a fresh buffer, then decode.
-                            cs.close();
-                            aligned_free(buf);
-                            size_t read_len = o_direct
-                                ? round_up(bytes_to_read, OJPH_READ_ALIGN)
-                                : bytes_to_read;
-                            ui8* dbuf =
-                                (ui8*)aligned_read_alloc(read_len + OJPH_READ_ALIGN);
-                            if (!dbuf) {
-                                err = "read_j2c_fd_into: allocation failed";
-                            } else {
-                                int64_t g2 = pread_region(fd, dbuf, read_len,
-                                                          offset, o_direct);
-                                if (g2 < (int64_t)bytes_to_read) {
-                                    err = "read_j2c_fd_into: short read";
-                                } else {
-                                    dbuf[bytes_to_read - 2] = 0xFF;
-                                    dbuf[bytes_to_read - 1] = 0xD9;
-                                    mem_infile mf2;
-                                    mf2.open(dbuf, bytes_to_read);
-                                    codestream cs2;
-                                    cs2.read_headers(&mf2);
-                                    cs2.restrict_input_resolution((ui32)level,
-                                                                  (ui32)level);
-                                    param_siz siz = cs2.access_siz();
-                                    h = siz.get_recon_height(0);
-                                    w = siz.get_recon_width(0);
-                                    if ((size_t)h != out_rows || (size_t)w != out_cols)
-                                        err = "out shape does not match decoded level shape";
-                                    else {
-                                        cs2.create();
-                                        pull_single_component_into(
-                                            cs2, out_ptr, out_rows, out_cols,
-                                            row_stride, element_size, is_unsigned,
-                                            do_clip, min_val, max_val);
-                                    }
-                                    cs2.close();
-                                }
-                                aligned_free(dbuf);
-                            }
-                        }
-                    }
+                    mem_infile mf;
+                    mf.open(buf.data, buf.size);
+                    codestream cs;
+                    cs.read_headers(&mf);
+                    err = finish_decode_into(cs, level, nullptr, 0, 0, view,
+                                             do_clip, min_val, max_val, h, w);
                 }
             }
-            if (err)
-                throw nb::value_error(err);
+            if (!err.empty())
+                throw nb::value_error(err.c_str());
             return std::make_pair(h, w);
         },
         nb::arg("fd"), nb::arg("offset"), nb::arg("nbytes"), nb::arg("out"),
         nb::arg("level"), nb::arg("min_val") = nb::none(),
-        nb::arg("max_val") = nb::none(), nb::arg("o_direct") = false);
+        nb::arg("max_val") = nb::none(), nb::arg("o_direct") = false,
+        nb::arg("channel_order") = "HWC", nb::arg("io_uring") = false,
+        nb::arg("scale") = 1.f, nb::arg("value_offset") = 0.f,
+        nb::arg("shift") = nb::none(), nb::arg("window") = nb::none(),
+        nb::arg("lut") = nb::none(), nb::arg("lut_offset") = 0);
+
+    // -----------------------------------------------------------------------
+    // read_j2c_fd_batch: read_j2c_fd_into for many codestreams of one file
+    // (e.g. the pages or tiles of a TIFF) in ONE native call.
+    //
+    // The reads are planned up front: one pass reads every main header, a
+    // second every tile-part the levels keep, and within each pass byte
+    // ranges at most ``max_gap`` bytes apart are merged into a single
+    // (O_DIRECT-aligned when ``o_direct`` is set) pread. The pages are then
+    // decoded on ``num_threads`` native threads (0 == one per hardware
+    // thread). With ``io_uring`` all the reads of a pass are in flight at
+    // once (see io_uring_available). ``levels`` is one int or one level per
+    // page; the result is a list as for read_j2c_batch.
+    //
+    // With ``regions`` (one ``(y0, y1, x0, x1)`` or None per page) only that
+    // window of a page is decoded into its ``out``. ``outs`` may be strided
+    // views, e.g. the tiles of one larger array.
+    // -----------------------------------------------------------------------
+    m.def("read_j2c_fd_batch",
+        [](int fd, std::vector<int64_t> offsets, std::vector<int64_t> nbytes,
+           std::vector<any_array> outs, nb::object levels_obj,
+           nb::object min_val_obj, nb::object max_val_obj, bool o_direct,
+           unsigned num_threads, const std::string& channel_order,
+           size_t max_gap, bool io_uring, nb::object regions_obj)
+            -> nb::list {
+            size_t n = offsets.size();
+            if (nbytes.size() != n || outs.size() != n)
+                throw nb::value_error("offsets, nbytes and outs must have the same length");
+            std::vector<int> levels;
+            if (nb::isinstance<nb::int_>(levels_obj))
+                levels.assign(n, nb::cast<int>(levels_obj));
+            else
+                levels = nb::cast<std::vector<int>>(levels_obj);
+            if (levels.size() != n)
+                throw nb::value_error("levels must be an int or have one entry per item");
+
+            std::vector<std::optional<std::array<size_t, 4>>> regions(n);
+            if (!regions_obj.is_none()) {
+                regions = nb::cast<std::vector<std::optional<std::array<size_t, 4>>>>(
+                    regions_obj);
+                if (regions.size() != n)
+                    throw nb::value_error("regions must have one entry per item");
+            }
+
+            bool do_clip = !min_val_obj.is_none() && !max_val_obj.is_none();
+            si32 min_val = do_clip ? nb::cast<si32>(min_val_obj) : 0;
+            si32 max_val = do_clip ? nb::cast<si32>(max_val_obj) : 0;
+
+            std::vector<std::string> errors(n);
+            std::vector<fd_page> pages(n);
+            for (size_t i = 0; i < n; ++i) {
+                if (offsets[i] < 0 || nbytes[i] <= 0)
+                    throw nb::value_error("offsets must be >= 0 and nbytes > 0");
+                pages[i].offset = offsets[i];
+                pages[i].nbytes = (size_t)nbytes[i];
+                pages[i].level = levels[i];
+            }
+            {
+                nb::gil_scoped_release release;
+                extent_reader reader;
+                read_fd_pages(fd, o_direct, max_gap, io_uring, pages, reader);
+                parallel_for(n, num_threads, [&](size_t i) {
+                    const any_array& out = outs[i];
+                    if (const char* msg = check_decode_out(out, false)) {
+                        errors[i] = msg;
+                        return;
+                    }
+                    try {
+                        errors[i] = decode_fd_page(
+                            pages[i], reader,
+                            regions[i] ? regions[i]->data() : nullptr,
+                            make_decode_view(out, channel_order),
+                            do_clip, min_val, max_val);
+                    } catch (const std::exception& e) {
+                        errors[i] = e.what();
+                        if (errors[i].empty())
+                            errors[i] = "read_j2c_fd_batch: decode failed";
+                    }
+                });
+            }
+
+            nb::list status;
+            for (size_t i = 0; i < n; ++i) {
+                if (errors[i].empty())
+                    status.append(nb::none());
+                else
+                    status.append(nb::str(errors[i].c_str()));
+            }
+            return status;
+        },
+        nb::arg("fd"), nb::arg("offsets"), nb::arg("nbytes"), nb::arg("outs"),
+        nb::arg("levels"), nb::arg("min_val") = nb::none(),
+        nb::arg("max_val") = nb::none(), nb::arg("o_direct") = false,
+        nb::arg("num_threads") = 0, nb::arg("channel_order") = "HWC",
+        nb::arg("max_gap") = 65536, nb::arg("io_uring") = false,
+        nb::arg("regions") = nb::none());
+
+    // -----------------------------------------------------------------------
+    // EncodeConfig: the validated encode parameters (see encode_config above).
+    // Built by ojph._imwrite._encode_config; apply() configures a Codestream
+    // exactly as imwrite does, and the native encoders below consume it
+    // directly so the per-image setup never touches Python.
+    // -----------------------------------------------------------------------
+    nb::class_<encode_config>(m, "EncodeConfig")
+        .def(nb::init<>())
+        .def_rw("width", &encode_config::width)
+        .def_rw("height", &encode_config::height)
+        .def_rw("num_components", &encode_config::num_components)
+        .def_rw("bit_depth", &encode_config::bit_depth)
+        .def_rw("is_signed", &encode_config::is_signed)
+        .def_rw("float_input", &encode_config::float_input)
+        .def_rw("scale", &encode_config::scale)
+        .def_rw("offset", &encode_config::offset)
+        .def_rw("channel_order", &encode_config::channel_order)
+        .def_rw("num_decompositions", &encode_config::num_decompositions)
+        .def_rw("reversible", &encode_config::reversible)
+        .def_rw("wavelet_kern", &encode_config::wavelet_kern)
+        .def_rw("qstep", &encode_config::qstep)
+        .def_rw("progression_order", &encode_config::progression_order)
+        .def_rw("tlm_marker", &encode_config::tlm_marker)
+        .def_rw("tileparts_at_resolutions", &encode_config::tileparts_at_resolutions)
+        .def_rw("tileparts_at_components", &encode_config::tileparts_at_components)
+        .def_rw("tile_width", &encode_config::tile_width)
+        .def_rw("tile_height", &encode_config::tile_height)
+        .def("apply", &encode_config::apply, nb::arg("codestream"));
+
+    // -----------------------------------------------------------------------
+    // encode_batch: encode many same-shaped images with one EncodeConfig, in
+    // ONE native call. Each image gets its own codestream and memory outfile
+    // and the images are spread over ``num_threads`` native threads (0 == one
+    // per hardware thread) under a single nb::gil_scoped_release, so encode
+    // throughput scales with cores with no Python in the loop.
+    //
+    // Returns (data, offsets): every codestream concatenated into one uint8
+    // array, and an int64 array of n + 1 offsets such that codestream i is
+    // data[offsets[i]:offsets[i + 1]].
+    // -----------------------------------------------------------------------
+    m.def("encode_batch",
+        [](const encode_config& config, std::vector<any_array> images,
+           unsigned num_threads) -> nb::tuple {
+            size_t n = images.size();
+            std::vector<image_view> views;
+            views.reserve(n);
+            for (const any_array& image : images) {
+                views.push_back(make_image_view(
+                    image, config.num_components, config.channel_order));
+                config.check(views.back(), image);
+            }
+
+            std::vector<mem_outfile> files(n);
+            std::vector<std::string> errors(n);
+            {
+                nb::gil_scoped_release release;
+                parallel_for(n, num_threads, [&](size_t i) {
+                    try {
+                        files[i].open(65536, false);
+                        const char* err = encode_image(config, views[i], &files[i]);
+                        if (err)
+                            errors[i] = err;
+                    } catch (const std::exception& e) {
+                        errors[i] = e.what();
+                        if (errors[i].empty())
+                            errors[i] = "encode_batch: encode failed";
+                    }
+                });
+            }
+            for (size_t i = 0; i < n; ++i)
+                if (!errors[i].empty())
+                    throw std::runtime_error(
+                        "image " + std::to_string(i) + ": " + errors[i]);
+
+            si64* offsets_ptr = nullptr;
+            auto offsets = owned_array<si64>(n + 1, &offsets_ptr);
+            offsets_ptr[0] = 0;
+            for (size_t i = 0; i < n; ++i)
+                offsets_ptr[i + 1] = offsets_ptr[i] + files[i].get_used_size();
+            ui8* data_ptr = nullptr;
+            auto data = owned_array<ui8>((size_t)offsets_ptr[n], &data_ptr);
+            {
+                nb::gil_scoped_release release;
+                for (size_t i = 0; i < n; ++i)
+                    std::memcpy(data_ptr + offsets_ptr[i], files[i].get_data(),
+                                (size_t)(offsets_ptr[i + 1] - offsets_ptr[i]));
+            }
+            return nb::make_tuple(data, offsets);
+        },
+        nb::arg("config"), nb::arg("images"), nb::arg("num_threads") = 0);
+
+    // -----------------------------------------------------------------------
+    // encode_tiled: encode one image as a multi-tile codestream, encoding its
+    // tiles concurrently on ``num_threads`` native threads (0 == one per
+    // hardware thread) under a single nb::gil_scoped_release.
+    //
+    // OpenJPH encodes the tiles of a codestream one after the other, so each
+    // tile is instead encoded as a standalone codestream placed at the
+    // tile's position on the reference grid -- which yields exactly the
+    // packets of that tile in a multi-tile encode -- and the tiles are then
+    // stitched into one conformant codestream (main header with the full
+    // SIZ geometry, an optional TLM, every tile-part with its tile index
+    // rewritten). The result is written to ``file``, which is not closed.
+    // -----------------------------------------------------------------------
+    m.def("encode_tiled",
+        [](const encode_config& config, any_array image, outfile_base* file,
+           unsigned num_threads) {
+            image_view img = make_image_view(
+                image, config.num_components, config.channel_order);
+            config.check(img, image);
+            std::string err;
+            {
+                nb::gil_scoped_release release;
+                err = encode_tiled(config, img, file, num_threads);
+            }
+            if (!err.empty())
+                throw std::runtime_error(err);
+        },
+        nb::arg("config"), nb::arg("image"), nb::arg("file"),
+        nb::arg("num_threads") = 0);
+
+    // -----------------------------------------------------------------------
+    // encode_into: encode one image straight into a caller-provided byte
+    // buffer (e.g. a slot of a shared-memory arena) under a single
+    // nb::gil_scoped_release, with no intermediate MemOutfile to grow and
+    // copy. Tiled images are encoded on ``num_threads`` threads as in
+    // encode_tiled.
+    //
+    // Returns the size of the codestream in bytes. When that exceeds
+    // ``len(out)`` the codestream was truncated and the caller must retry
+    // with a buffer of at least the returned size.
+    // -----------------------------------------------------------------------
+    m.def("encode_into",
+        [](const encode_config& config, any_array image,
+           nb::ndarray<ui8, nb::ndim<1>, nb::c_contig, nb::device::cpu> out,
+           unsigned num_threads) -> size_t {
+            image_view img = make_image_view(
+                image, config.num_components, config.channel_order);
+            config.check(img, image);
+            buffer_outfile file(out.data(), out.size());
+            std::string err;
+            {
+                nb::gil_scoped_release release;
+                if (config.is_tiled() && num_threads != 1) {
+                    err = encode_tiled(config, img, &file, num_threads);
+                } else {
+                    const char* msg = encode_image(config, img, &file);
+                    if (msg)
+                        err = msg;
+                }
+            }
+            if (!err.empty())
+                throw std::runtime_error(err);
+            return file.size();
+        },
+        nb::arg("config"), nb::arg("image"), nb::arg("out"),
+        nb::arg("num_threads") = 1);
+
+    // -----------------------------------------------------------------------
+    // FrameEncoder: encode a stream of images with one EncodeConfig through
+    // one reused codestream (see frame_encoder). ``encode`` writes into an
+    // internal buffer that is kept between images and returns a copy of the
+    // codestream; ``encode_into`` writes into ``out`` as encode_into does.
+    // -----------------------------------------------------------------------
+    nb::class_<frame_encoder>(m, "FrameEncoder")
+        .def(nb::init<const encode_config&>(), nb::arg("config"))
+        .def_ro("config", &frame_encoder::config)
+        .def("encode",
+             [](frame_encoder& self, any_array image, unsigned num_threads)
+                 -> nb::ndarray<nb::numpy, ui8, nb::ndim<1>> {
+                 image_view img = make_image_view(
+                     image, self.config.num_components,
+                     self.config.channel_order);
+                 self.config.check(img, image);
+                 std::string err;
+                 {
+                     nb::gil_scoped_release release;
+                     self.out.reset();
+                     err = self.encode(img, &self.out, num_threads);
+                 }
+                 if (!err.empty())
+                     throw std::runtime_error(err);
+                 ui8* ptr = nullptr;
+                 auto arr = owned_array<ui8>(self.out.size(), &ptr);
+                 std::memcpy(ptr, self.out.data(), self.out.size());
+                 return arr;
+             },
+             nb::arg("image"), nb::arg("num_threads") = 1)
+        .def("encode_into",
+             [](frame_encoder& self, any_array image,
+                nb::ndarray<ui8, nb::ndim<1>, nb::c_contig, nb::device::cpu> out,
+                unsigned num_threads) -> size_t {
+                 image_view img = make_image_view(
+                     image, self.config.num_components,
+                     self.config.channel_order);
+                 self.config.check(img, image);
+                 buffer_outfile file(out.data(), out.size());
+                 std::string err;
+                 {
+                     nb::gil_scoped_release release;
+                     err = self.encode(img, &file, num_threads);
+                 }
+                 if (!err.empty())
+                     throw std::runtime_error(err);
+                 return file.size();
+             },
+             nb::arg("image"), nb::arg("out"), nb::arg("num_threads") = 1);
 
     nb::class_<point>(m, "Point")
         .def(nb::init<ui32, ui32>(), nb::arg("x") = 0, nb::arg("y") = 0)  // Constructor with default args
@@ -0,0 +1,726 @@
+"""Read and write JPEG2000-compressed TIFF files.
+
+Each tile (or strip) of a JPEG2000 TIFF page is a standalone codestream.
+:class:`TiffReader` walks the IFD chain, and :meth:`TiffPage.read` decodes
+the tiles a page, level or region needs on native threads, straight into
+one output array, with the reads of neighboring tiles merged (see
+``read_j2c_fd_batch``).
+
+Example::
+
+    from ojph.tiff import TiffReader
+
+    with TiffReader('slide.tif') as tif:
+        page = tif.pages[0]
+        thumbnail = page.read(level=3)
+        window = page.read(region=(1000, 2000, 5000, 7000))
+
+:class:`TiffWriter` goes the other way: it encodes the tiles of each tile
+row concurrently and writes them while the next row encodes, so images
+larger than memory can be streamed in as row stripes::
+
+    from ojph.tiff import TiffWriter
+
+    with TiffWriter('slide.tif') as tif:
+        tif.write(stripes, shape=(100000, 80000, 3), dtype='uint8',
+                  subifds=4)
+"""
+import collections
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ._imwrite import imwrite_batch_to_memory
+from .ojph_bindings import peek_j2c_fd, read_j2c_fd_batch
+
+__all__ = ['TiffReader', 'TiffPage', 'imread_tiff', 'TiffWriter',
+           'imwrite_tiff']
+
+_O_RDONLY_BINARY = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+_O_WRONLY_BINARY = os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+
+# Compression values used for JPEG2000 tiles (Aperio and tifffile).
+JPEG2000_COMPRESSIONS = (33003, 33004, 33005, 34712)
+
+_NEW_SUBFILE_TYPE = 254
+_IMAGE_WIDTH = 256
+_IMAGE_LENGTH = 257
+_BITS_PER_SAMPLE = 258
+_COMPRESSION = 259
+_PHOTOMETRIC = 262
+_STRIP_OFFSETS = 273
+_SAMPLES_PER_PIXEL = 277
+_ROWS_PER_STRIP = 278
+_STRIP_BYTE_COUNTS = 279
+_PLANAR_CONFIGURATION = 284
+_TILE_WIDTH = 322
+_TILE_LENGTH = 323
+_TILE_OFFSETS = 324
+_TILE_BYTE_COUNTS = 325
+_SUB_IFDS = 330
+_SAMPLE_FORMAT = 339
+
+# TIFF field type: (size in bytes, numpy type code or None for raw bytes).
+_FIELD_TYPES = {
+    1: (1, 'u1'), 2: (1, None), 3: (2, 'u2'), 4: (4, 'u4'), 5: (8, None),
+    6: (1, 'i1'), 7: (1, None), 8: (2, 'i2'), 9: (4, 'i4'), 10: (8, None),
+    11: (4, 'f4'), 12: (8, 'f8'), 13: (4, 'u4'), 16: (8, 'u8'),
+    17: (8, 'i8'), 18: (8, 'u8'),
+}
+
+
+def _read_ifd(f, offset, byteorder, bigtiff):
+    """The tags of the IFD at ``offset`` and the offset of the next one."""
+    if bigtiff:
+        count_format, entry_format, next_format = 'Q', 'HHQ8s', 'Q'
+        inline = 8
+    else:
+        count_format, entry_format, next_format = 'H', 'HHI4s', 'I'
+        inline = 4
+    f.seek(offset)
+    count_size = struct.calcsize(count_format)
+    (count,) = struct.unpack(byteorder + count_format, f.read(count_size))
+    entry_size = struct.calcsize(byteorder + entry_format)
+    entries = f.read(count * entry_size)
+    (next_offset,) = struct.unpack(
+        byteorder + next_format, f.read(struct.calcsize(next_format)))
+
+    tags = {}
+    for i in range(count):
+        tag, field_type, n, value = struct.unpack_from(
+            byteorder + entry_format, entries, i * entry_size)
+        if field_type not in _FIELD_TYPES:
+            continue
+        size, code = _FIELD_TYPES[field_type]
+        if n * size > inline:
+            (value_offset,) = struct.unpack(byteorder + next_format, value)
+            f.seek(value_offset)
+            value = f.read(n * size)
+        else:
+            value = value[:n * size]
+        if code is not None:
+            value = np.frombuffer(value, dtype=byteorder + code).astype(code)
+        tags[tag] = value
+    return tags, next_offset
+
+
+def _scalar(tags, tag, default=None):
+    if tag not in tags:
+        if default is None:
+            raise ValueError(f"TIFF tag {tag} is missing")
+        return default
+    return int(tags[tag][0])
+
+
+class TiffPage:
+    """One image (IFD) of a JPEG2000 TIFF.
+
+    Attributes
+    ----------
+    shape : tuple of int
+        ``(height, width)``, or ``(height, width, samples)``.
+    dtype : numpy.dtype
+        The sample type (None if not an integer type of 8, 16 or 32 bits).
+    tile_shape : tuple of int
+        ``(tile_height, tile_width)``; strips are tiles as wide as the page.
+    offsets, bytecounts : numpy.ndarray
+        Where each tile's codestream is in the file, row-major (and sample
+        by sample for planar pages).
+    subifds : list of TiffPage
+        Reduced-resolution images of a pyramid stored as SubIFDs.
+    """
+
+    def __init__(self, reader, tags, subifds=()):
+        self._reader = reader
+        self.compression = _scalar(tags, _COMPRESSION, 1)
+        height = _scalar(tags, _IMAGE_LENGTH)
+        width = _scalar(tags, _IMAGE_WIDTH)
+        samples = _scalar(tags, _SAMPLES_PER_PIXEL, 1)
+        self.planar = _scalar(tags, _PLANAR_CONFIGURATION, 1)
+        self.shape = (height, width) if samples == 1 else (height, width, samples)
+
+        bits = _scalar(tags, _BITS_PER_SAMPLE, 1)
+        sample_format = _scalar(tags, _SAMPLE_FORMAT, 1)
+        if sample_format in (1, 2) and bits in (8, 16, 32):
+            kind = 'u' if sample_format == 1 else 'i'
+            self.dtype = np.dtype(f"{kind}{bits // 8}")
+        else:
+            # Not something a JPEG2000 tile decodes to; read() refuses it.
+            self.dtype = None
+
+        if _TILE_OFFSETS in tags:
+            self.tile_shape = (_scalar(tags, _TILE_LENGTH),
+                               _scalar(tags, _TILE_WIDTH))
+            offsets = tags[_TILE_OFFSETS]
+            bytecounts = tags.get(_TILE_BYTE_COUNTS, ())
+        else:
+            rows = min(_scalar(tags, _ROWS_PER_STRIP, height), height)
+            self.tile_shape = (rows, width)
+            offsets = tags.get(_STRIP_OFFSETS, ())
+            bytecounts = tags.get(_STRIP_BYTE_COUNTS, ())
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.bytecounts = np.asarray(bytecounts, dtype=np.int64)
+        self.subifds = list(subifds)
+        self._levels = None
+
+    @property
+    def is_jpeg2000(self):
+        return self.compression in JPEG2000_COMPRESSIONS
+
+    @property
+    def tiles(self):
+        """The number of tiles ``(down, across)``."""
+        tile_height, tile_width = self.tile_shape
+        return (-(-self.shape[0] // tile_height),
+                -(-self.shape[1] // tile_width))
+
+    @property
+    def levels(self):
+        """The number of wavelet decompositions of the tiles."""
+        if self._levels is None:
+            index = int(np.argmax(self.bytecounts > 0))
+            fd = os.open(self._reader.filename, _O_RDONLY_BINARY)
+            try:
+                self._levels, _, _ = peek_j2c_fd(
+                    fd, int(self.offsets[index]), int(self.bytecounts[index]),
+                    False)
+            finally:
+                os.close(fd)
+        return self._levels
+
+    def get_level_shape(self, level):
+        """The shape of the page at ``level``, as for ``OJPHImageFile``."""
+        divisor = 1 << level
+        return ((-(-self.shape[0] // divisor), -(-self.shape[1] // divisor))
+                + self.shape[2:])
+
+    def read(self, *, level=0, region=None, out=None, num_threads=0,
+             io_uring=False):
+        """Decode the page, or a window of it, at a reduced resolution.
+
+        Parameters
+        ----------
+        level : int, optional
+            Resolution level (0 for full resolution). The tile height and
+            width must be multiples of ``2**level``, so that the tiles of a
+            level still line up.
+        region : tuple of int, optional
+            ``(y0, y1, x0, x1)`` window at ``level``. Only the tiles that
+            intersect it are read and decoded.
+        out : numpy.ndarray, optional
+            Buffer to decode into, with the shape of the result.
+        num_threads : int, optional
+            Native threads to decode tiles on (0: one per hardware thread).
+        io_uring : bool, optional
+            Submit the tile reads through io_uring where available.
+
+        Returns
+        -------
+        numpy.ndarray
+            The decoded image.
+        """
+        if not self.is_jpeg2000 or self.dtype is None:
+            raise ValueError(
+                f"Page is not JPEG2000 compressed integer samples "
+                f"(compression {self.compression})")
+        if level < 0:
+            raise ValueError(f"level must be >= 0, got {level}")
+        scale = 1 << level
+        tile_height, tile_width = self.tile_shape
+        if tile_height % scale or tile_width % scale:
+            raise ValueError(
+                f"level {level} does not divide the tile shape "
+                f"{self.tile_shape}")
+        level_shape = self.get_level_shape(level)
+        height, width = level_shape[:2]
+        if region is None:
+            region = (0, height, 0, width)
+        if len(region) != 4:
+            raise ValueError(f"region must be (y0, y1, x0, x1), got {region}")
+        y0, y1, x0, x1 = (int(v) for v in region)
+        if not (0 <= y0 < y1 <= height and 0 <= x0 < x1 <= width):
+            raise ValueError(
+                f"region {region} is empty or outside the image of shape "
+                f"({height}, {width}) at level {level}")
+
+        shape = (y1 - y0, x1 - x0) + level_shape[2:]
+        if out is None:
+            out = np.empty(shape, dtype=self.dtype)
+        elif out.shape != shape or out.dtype != self.dtype:
+            raise ValueError(
+                f"out must have shape {shape} and dtype {self.dtype}, got "
+                f"{out.shape} and {out.dtype}")
+
+        level_tile_height = tile_height // scale
+        level_tile_width = tile_width // scale
+        down, across = self.tiles
+        samples = self.shape[2] if len(self.shape) == 3 else 1
+        offsets, nbytes, outs, regions = [], [], [], []
+        for row in range(y0 // level_tile_height,
+                         (y1 - 1) // level_tile_height + 1):
+            top = row * level_tile_height
+            a0, a1 = max(y0, top), min(y1, top + level_tile_height)
+            for col in range(x0 // level_tile_width,
+                             (x1 - 1) // level_tile_width + 1):
+                left = col * level_tile_width
+                b0, b1 = max(x0, left), min(x1, left + level_tile_width)
+                view = out[a0 - y0:a1 - y0, b0 - x0:b1 - x0]
+                tile_region = (a0 - top, a1 - top, b0 - left, b1 - left)
+                if self.planar == 2 and samples > 1:
+                    chunks = [((s * down + row) * across + col, view[..., s])
+                              for s in range(samples)]
+                else:
+                    chunks = [(row * across + col, view)]
+                for index, chunk_out in chunks:
+                    if self.bytecounts[index] == 0:
+                        # A sparse tile was never written.
+                        chunk_out[...] = 0
+                        continue
+                    offsets.append(int(self.offsets[index]))
+                    nbytes.append(int(self.bytecounts[index]))
+                    outs.append(chunk_out)
+                    regions.append(tile_region)
+
+        if self.dtype.itemsize > 2:
+            min_val = max_val = None
+        else:
+            info = np.iinfo(self.dtype)
+            min_val, max_val = int(info.min), int(info.max)
+
+        fd = os.open(self._reader.filename, _O_RDONLY_BINARY)
+        try:
+            status = read_j2c_fd_batch(
+                fd, offsets, nbytes, outs, level, min_val, max_val,
+                num_threads=num_threads, channel_order='HWC',
+                io_uring=io_uring, regions=regions)
+        finally:
+            os.close(fd)
+        for offset, error in zip(offsets, status):
+            if error is not None:
+                raise ValueError(f"tile at offset {offset}: {error}")
+        return out
+
+
+class TiffReader:
+    """The pages of a (Big)TIFF file.
+
+    Parameters
+    ----------
+    filename : str or path-like
+        The file to read. Its IFDs are parsed on construction; tiles are
+        only read by :meth:`TiffPage.read`.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.fspath(filename)
+        with open(self.filename, 'rb') as f:
+            header = f.read(16)
+            if header[:2] == b'II':
+                byteorder = '<'
+            elif header[:2] == b'MM':
+                byteorder = '>'
+            else:
+                raise ValueError(f"{self.filename} is not a TIFF file")
+            (version,) = struct.unpack(byteorder + 'H', header[2:4])
+            if version == 42:
+                bigtiff = False
+                (offset,) = struct.unpack(byteorder + 'I', header[4:8])
+            elif version == 43:
+                bigtiff = True
+                (offset,) = struct.unpack(byteorder + 'Q', header[8:16])
+            else:
+                raise ValueError(f"{self.filename} is not a TIFF file")
+            self.byteorder = byteorder
+            self.is_bigtiff = bigtiff
+
+            self.pages = []
+            seen = set()
+            while offset and offset not in seen:
+                seen.add(offset)
+                tags, offset = _read_ifd(f, offset, byteorder, bigtiff)
+                subifds = [
+                    TiffPage(self, _read_ifd(f, int(sub), byteorder, bigtiff)[0])
+                    for sub in tags.get(_SUB_IFDS, ())
+                ]
+                self.pages.append(TiffPage(self, tags, subifds))
+
+    def close(self):
+        """Nothing stays open between reads; kept for symmetry."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def imread_tiff(filename, *, page=0, level=0, region=None, out=None,
+                num_threads=0):
+    """Read one page of a JPEG2000 TIFF file.
+
+    See :meth:`TiffPage.read` for the arguments.
+    """
+    return TiffReader(filename).pages[page].read(
+        level=level, region=region, out=out, num_threads=num_threads)
+
+
+# Room for the classic or the BigTIFF header, written last.
+_HEADER_SIZE = 16
+_CLASSIC_LIMIT = 2**32 - 1
+
+# Field kind: ((classic type, format), (BigTIFF type, format)).
+_WRITE_TYPES = {
+    'short': ((3, 'u2'), (3, 'u2')),
+    'long': ((4, 'u4'), (4, 'u4')),
+    'offset': ((4, 'u4'), (16, 'u8')),
+    'ifd': ((13, 'u4'), (18, 'u8')),
+}
+
+
+def _pack_ifd(tags, position, next_offset, bigtiff):
+    """An IFD placed at ``position``, with its out-of-line values after it.
+
+    ``tags`` maps each tag to ``(kind, values)``. The size of the result
+    does not depend on ``position`` or ``next_offset``.
+    """
+    if bigtiff:
+        count_format, entry_format, offset_format, inline = 'Q', 'HHQ', 'Q', 8
+    else:
+        count_format, entry_format, offset_format, inline = 'H', 'HHI', 'I', 4
+    values_start = position + (
+        struct.calcsize('<' + count_format)
+        + len(tags) * (struct.calcsize('<' + entry_format) + inline)
+        + struct.calcsize('<' + offset_format))
+    entries = bytearray(struct.pack('<' + count_format, len(tags)))
+    values = bytearray()
+    for tag in sorted(tags):
+        kind, tag_values = tags[tag]
+        field_type, fmt = _WRITE_TYPES[kind][bigtiff]
+        packed = np.asarray(tag_values, '<' + fmt).tobytes()
+        entries += struct.pack('<' + entry_format, tag, field_type,
+                               len(tag_values))
+        if len(packed) <= inline:
+            entries += packed.ljust(inline, b'\0')
+        else:
+            entries += struct.pack('<' + offset_format,
+                                   values_start + len(values))
+            values += packed
+            if len(values) % 2:
+                values += b'\0'
+    entries += struct.pack('<' + offset_format, next_offset)
+    return bytes(entries + values)
+
+
+def _pwrite(fd, data, position):
+    view = memoryview(data).cast('B')
+    while view:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, view, position)
+        else:
+            # Only the writer thread touches the file position.
+            os.lseek(fd, position, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        position += written
+
+
+def _downsample(rows):
+    """Halve ``rows`` with a rounded 2x2 mean, repeating the last row and
+    column when the size is odd."""
+    if rows.shape[0] % 2:
+        rows = np.concatenate([rows, rows[-1:]])
+    if rows.shape[1] % 2:
+        rows = np.concatenate([rows, rows[:, -1:]], axis=1)
+    total = rows[0::2, 0::2].astype(np.int64)
+    total += rows[1::2, 0::2]
+    total += rows[0::2, 1::2]
+    total += rows[1::2, 1::2]
+    total += 2
+    return (total // 4).astype(rows.dtype)
+
+
+class _TiledImage:
+    """A page or pyramid level being written.
+
+    Rows are copied into a padded tile row; each full tile row is encoded
+    in one batch and handed to the writer. The rows are also downsampled
+    into the next pyramid level, if any, as they arrive.
+    """
+
+    def __init__(self, writer, shape, dtype, tile_shape, subifds, encode):
+        self.shape = shape
+        self.dtype = dtype
+        self.tile_shape = tile_shape
+        tile_height, tile_width = tile_shape
+        self._down = -(-shape[0] // tile_height)
+        self._across = -(-shape[1] // tile_width)
+        self.offsets = np.zeros(self._down * self._across, np.int64)
+        self.bytecounts = np.zeros(self._down * self._across, np.int64)
+        self._writer = writer
+        self._encode = encode
+        # Columns past the image edge stay zero, so edge tiles are padded.
+        self._row_buffer = np.zeros(
+            (tile_height, self._across * tile_width) + shape[2:], dtype)
+        self._filled = 0
+        self._tile_row = 0
+        self._rows = 0
+        self._carry = None
+        self.child = None
+        if subifds:
+            self.child = _TiledImage(
+                writer, (-(-shape[0] // 2), -(-shape[1] // 2)) + shape[2:],
+                dtype, tile_shape, subifds - 1, encode)
+
+    def levels(self):
+        """This image followed by its pyramid levels."""
+        image, levels = self, []
+        while image is not None:
+            levels.append(image)
+            image = image.child
+        return levels
+
+    def push(self, stripe):
+        if self._rows + len(stripe) > self.shape[0]:
+            raise ValueError(
+                f"Got more than the {self.shape[0]} rows of the image.")
+        self._rows += len(stripe)
+        tile_height = self.tile_shape[0]
+        width = self.shape[1]
+        start = 0
+        while start < len(stripe):
+            take = min(tile_height - self._filled, len(stripe) - start)
+            self._row_buffer[self._filled:self._filled + take, :width] = (
+                stripe[start:start + take])
+            self._filled += take
+            start += take
+            if self._filled == tile_height:
+                self._encode_row()
+
+        if self.child is not None:
+            if self._carry is not None:
+                stripe = np.concatenate([self._carry, stripe])
+            even = len(stripe) - len(stripe) % 2
+            self._carry = stripe[even:].copy() if even < len(stripe) else None
+            if even:
+                self.child.push(_downsample(stripe[:even]))
+
+    def finish(self):
+        if self._rows != self.shape[0]:
+            raise ValueError(
+                f"Got {self._rows} of the {self.shape[0]} rows of the image.")
+        if self._filled:
+            self._row_buffer[self._filled:] = 0
+            self._encode_row()
+        if self.child is not None:
+            if self._carry is not None:
+                self.child.push(_downsample(self._carry))
+            self.child.finish()
+
+    def _encode_row(self):
+        tile_width = self.tile_shape[1]
+        tiles = [self._row_buffer[:, col * tile_width:(col + 1) * tile_width]
+                 for col in range(self._across)]
+        data, offsets = imwrite_batch_to_memory(
+            tiles, concatenate=True, **self._encode)
+        position = self._writer._reserve(len(data))
+        first = self._tile_row * self._across
+        self.offsets[first:first + self._across] = position + offsets[:-1]
+        self.bytecounts[first:first + self._across] = np.diff(offsets)
+        self._writer._write(data, position)
+        self._tile_row += 1
+        self._filled = 0
+
+    def tags(self, reduced, subifds):
+        samples = self.shape[2] if len(self.shape) == 3 else 1
+        tags = {
+            _NEW_SUBFILE_TYPE: ('long', [1 if reduced else 0]),
+            _IMAGE_WIDTH: ('long', [self.shape[1]]),
+            _IMAGE_LENGTH: ('long', [self.shape[0]]),
+            _BITS_PER_SAMPLE: ('short', [self.dtype.itemsize * 8] * samples),
+            _COMPRESSION: ('short', [34712]),
+            _PHOTOMETRIC: ('short', [2 if samples == 3 else 1]),
+            _SAMPLES_PER_PIXEL: ('short', [samples]),
+            _PLANAR_CONFIGURATION: ('short', [1]),
+            _TILE_WIDTH: ('long', [self.tile_shape[1]]),
+            _TILE_LENGTH: ('long', [self.tile_shape[0]]),
+            _TILE_OFFSETS: ('offset', self.offsets),
+            _TILE_BYTE_COUNTS: ('offset', self.bytecounts),
+            _SAMPLE_FORMAT: (
+                'short', [2 if self.dtype.kind == 'i' else 1] * samples),
+        }
+        if subifds:
+            tags[_SUB_IFDS] = ('ifd', subifds)
+        return tags
+
+
+class TiffWriter:
+    """Write JPEG2000-compressed tiled (Big)TIFF files.
+
+    Each call to :meth:`write` adds a page. Tiles are encoded one tile row
+    at a time, concurrently on native threads, and each encoded row is
+    written with a single positioned write into space reserved for it, on
+    a background thread while the next row encodes. The IFDs and the
+    header are written by :meth:`close`.
+
+    Parameters
+    ----------
+    filename : str or os.PathLike
+        The file to create (or truncate).
+    bigtiff : bool, optional
+        Write a BigTIFF file. By default a classic TIFF is written unless
+        the file would exceed 4 GiB.
+    """
+
+    def __init__(self, filename, *, bigtiff=None):
+        self._bigtiff = bigtiff
+        self._pages = []
+        self._end = _HEADER_SIZE
+        self._writes = collections.deque()
+        self._fd = os.open(os.fspath(filename),
+                           _O_WRONLY_BINARY | os.O_CREAT | os.O_TRUNC, 0o666)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='ojph-tiff')
+
+    def write(self, data, *, shape=None, dtype=None, tile_shape=(256, 256),
+              subifds=0, num_threads=0, **kwargs):
+        """Encode and write one page.
+
+        Parameters
+        ----------
+        data : numpy.ndarray or iterable of numpy.ndarray
+            The image, with shape ``(height, width)`` or
+            ``(height, width, samples)``, or an iterable of row stripes of
+            it, in order and of any height.
+        shape, dtype : optional
+            The shape and dtype of the image; required when ``data`` is an
+            iterable of stripes. Only integer images are written, as the
+            TIFF tags describe the samples of the codestream: quantize float
+            data first.
+        tile_shape : tuple of int, optional
+            ``(tile_height, tile_width)``, multiples of 16. Edge tiles are
+            padded with zeros.
+        subifds : int, optional
+            Number of reduced-resolution pyramid levels, each half the size
+            of the previous one, stored as SubIFDs of the page.
+        num_threads : int, optional
+            Number of native encode threads (default: 0, one per CPU).
+        **kwargs
+            Encode parameters of :func:`ojph.imwrite_batch_to_memory`
+            (``num_decompositions``, ``reversible``, ``qstep``, ...).
+        """
+        if self._fd is None:
+            raise ValueError("The TiffWriter is closed.")
+        if isinstance(data, np.ndarray):
+            shape, dtype = data.shape, data.dtype
+        elif shape is None or dtype is None:
+            raise ValueError(
+                "shape and dtype are required when data is an iterable of "
+                "row stripes.")
+        shape = tuple(int(n) for n in shape)
+        dtype = np.dtype(dtype)
+        if dtype.kind not in 'iu':
+            raise ValueError(
+                f"TiffWriter writes integer images, got {dtype}.")
+        if len(shape) not in (2, 3) or min(shape) < 1:
+            raise ValueError(
+                f"shape must be (height, width) or (height, width, samples), "
+                f"got {shape}.")
+        tile_shape = tuple(int(n) for n in tile_shape)
+        if len(tile_shape) != 2 or any(n < 16 or n % 16 for n in tile_shape):
+            raise ValueError(
+                f"tile_shape must be two multiples of 16, got {tile_shape}.")
+        if subifds < 0:
+            raise ValueError(f"subifds must be >= 0, got {subifds}.")
+
+        encode = dict(
+            kwargs, num_threads=num_threads,
+            channel_order='HWC' if len(shape) == 3 else None)
+        image = _TiledImage(self, shape, dtype, tile_shape, subifds, encode)
+        if isinstance(data, np.ndarray):
+            data = (data[y:y + tile_shape[0]]
+                    for y in range(0, shape[0], tile_shape[0]))
+        for stripe in data:
+            stripe = np.asarray(stripe)
+            if stripe.shape[1:] != shape[1:] or stripe.dtype != dtype:
+                raise ValueError(
+                    f"Stripes must have shape (rows,) + {shape[1:]} and dtype "
+                    f"{dtype}, got {stripe.shape} {stripe.dtype}.")
+            image.push(stripe)
+        image.finish()
+        self._pages.append(image)
+
+    def _reserve(self, nbytes):
+        position = self._end
+        self._end += nbytes
+        return position
+
+    def _write(self, data, position):
+        # Double buffering: one row is written while the next one encodes.
+        while len(self._writes) >= 2:
+            self._writes.popleft().result()
+        self._writes.append(
+            self._executor.submit(_pwrite, self._fd, data, position))
+
+    def _ifds(self, bigtiff):
+        """Every IFD, packed after the tiles, and the first one's offset."""
+        start = self._end + self._end % 2
+        position = start
+        layout = []
+        for page in self._pages:
+            subs = []
+            for level in page.levels()[1:]:
+                subs.append(position)
+                position += len(_pack_ifd(level.tags(True, []), 0, 0, bigtiff))
+            layout.append((position, subs))
+            position += len(_pack_ifd(page.tags(False, subs), 0, 0, bigtiff))
+
+        blob = bytearray(start - self._end)
+        for i, (page, (main, subs)) in enumerate(zip(self._pages, layout)):
+            for level, sub in zip(page.levels()[1:], subs):
+                blob += _pack_ifd(level.tags(True, []), sub, 0, bigtiff)
+            next_ifd = layout[i + 1][0] if i + 1 < len(layout) else 0
+            blob += _pack_ifd(page.tags(False, subs), main, next_ifd, bigtiff)
+        return bytes(blob), layout[0][0] if layout else 0
+
+    def close(self):
+        """Finish the pending writes and write the IFDs and the header."""
+        if self._fd is None:
+            return
+        try:
+            while self._writes:
+                self._writes.popleft().result()
+            bigtiff = self._bigtiff
+            blob, first = self._ifds(bool(bigtiff))
+            if self._end + len(blob) > _CLASSIC_LIMIT and not bigtiff:
+                if bigtiff is not None:
+                    raise ValueError(
+                        "The file exceeds 4 GiB; write it with bigtiff=True.")
+                bigtiff = True
+                blob, first = self._ifds(True)
+            _pwrite(self._fd, blob, self._end)
+            if bigtiff:
+                header = b'II' + struct.pack('<HHHQ', 43, 8, 0, first)
+            else:
+                header = b'II' + struct.pack('<HI', 42, first)
+            _pwrite(self._fd, header, 0)
+        finally:
+            self._executor.shutdown()
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def imwrite_tiff(filename, data, *, bigtiff=None, **kwargs):
+    """Write a one-page JPEG2000 TIFF file.
+
+    See :meth:`TiffWriter.write` for the arguments.
+    """
+    with TiffWriter(filename, bigtiff=bigtiff) as tif:
+        tif.write(data, **kwargs)
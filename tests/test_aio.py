@@ -0,0 +1,128 @@
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from ojph import aio, imwrite_to_memory, imread_from_memory
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+@pytest.fixture(autouse=True)
+def _default_pool():
+    yield
+    aio.configure()
+
+
+def test_decode_and_encode():
+    images = [_image((64, 80), seed=i) for i in range(8)]
+
+    async def main():
+        datas = await asyncio.gather(*(aio.encode(im) for im in images))
+        decoded = await asyncio.gather(*(aio.decode(d) for d in datas))
+        thumbnails = await asyncio.gather(
+            *(aio.decode(d, level=2) for d in datas))
+        return datas, decoded, thumbnails
+
+    datas, decoded, thumbnails = asyncio.run(main())
+    for image, data, full, thumbnail in zip(images, datas, decoded, thumbnails):
+        np.testing.assert_array_equal(full, image)
+        np.testing.assert_array_equal(thumbnail,
+                                      imread_from_memory(data, level=2))
+
+
+def test_read_fd(tmp_path):
+    image = _image((128, 96), dtype=np.uint16, seed=1)
+    data = imwrite_to_memory(image, progression_order='RLCP',
+                             tileparts_at_resolutions=True)
+    path = tmp_path / 'image.j2c'
+    path.write_bytes(b'\x00' * 4096 + bytes(data))
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        reference = imread_from_memory(data, level=1)
+        out = np.empty(reference.shape, dtype=np.uint16)
+        result = asyncio.run(aio.read_fd(fd, 4096, data.nbytes, out, level=1))
+    finally:
+        os.close(fd)
+    assert result is out
+    np.testing.assert_array_equal(out, reference)
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    aio.configure(max_workers=2, max_pending=3)
+    lock = threading.Lock()
+    running = []
+    peak = [0]
+    release = threading.Event()
+    decode = imread_from_memory
+
+    def slow_decode(data, **kwargs):
+        with lock:
+            running.append(1)
+            peak[0] = max(peak[0], len(running))
+        release.wait(5)
+        with lock:
+            running.pop()
+        return decode(data, **kwargs)
+
+    monkeypatch.setattr(aio, 'imread_from_memory', slow_decode)
+    data = imwrite_to_memory(_image((16, 16), seed=2))
+
+    async def main():
+        tasks = [asyncio.create_task(aio.decode(data)) for _ in range(10)]
+        await asyncio.sleep(0.2)
+        # The loop keeps running while jobs are blocked in the pool.
+        semaphore = aio._get_semaphore(asyncio.get_running_loop())
+        assert semaphore.locked()
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    assert len(results) == 10
+    assert peak[0] == 2
+
+
+def test_cancelled_caller_keeps_its_slot(monkeypatch):
+    aio.configure(max_workers=1, max_pending=1)
+    started = threading.Event()
+    release = threading.Event()
+    decode = imread_from_memory
+
+    def slow_decode(data, **kwargs):
+        started.set()
+        release.wait(5)
+        return decode(data, **kwargs)
+
+    monkeypatch.setattr(aio, 'imread_from_memory', slow_decode)
+    data = imwrite_to_memory(_image((16, 16), seed=3))
+
+    async def main():
+        semaphore = aio._get_semaphore(asyncio.get_running_loop())
+        task = asyncio.create_task(aio.decode(data))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The job is still running, so its slot is still taken.
+        assert semaphore.locked()
+        release.set()
+        result = await asyncio.wait_for(aio.decode(data), 5)
+        assert not semaphore.locked()
+        return result
+
+    np.testing.assert_array_equal(asyncio.run(main()),
+                                  imread_from_memory(data))
+
+
+def test_configure_rejects_invalid_sizes():
+    with pytest.raises(ValueError):
+        aio.configure(max_workers=0)
+    with pytest.raises(ValueError):
+        aio.configure(max_pending=0)
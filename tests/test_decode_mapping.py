@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import pytest
+
+from ojph import imread, imread_from_memory, imwrite, imwrite_to_memory
+from ojph.ojph_bindings import read_j2c_fd_into, read_j2c_into
+
+_O_RDONLY_BINARY = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+
+
+def _image(shape, dtype=np.uint16, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+@pytest.mark.parametrize('shift', [0, 4, 8])
+def test_shift(shift):
+    image = _image((64, 80))
+    decoded = imread_from_memory(imwrite_to_memory(image), shift=shift)
+    assert decoded.dtype == np.uint8
+    np.testing.assert_array_equal(
+        decoded, np.clip(image.astype(np.int64) >> shift, 0, 255))
+
+
+@pytest.mark.parametrize('dtype', [np.uint16, np.int16])
+def test_window(dtype):
+    image = _image((50, 70, 3), dtype=dtype, seed=1)
+    data = imwrite_to_memory(image, channel_order='HWC')
+    low, high = -1000, 20000
+    decoded = imread_from_memory(data, window=(low, high))
+    expected = np.clip((image.astype(np.float64) - low) * 255 / (high - low),
+                       0, 255)
+    # float32 arithmetic may round the odd value the other way.
+    np.testing.assert_allclose(decoded, np.floor(expected + 0.5), atol=1)
+
+
+@pytest.mark.parametrize('dtype', [np.uint16, np.int16, np.int8])
+def test_lut(dtype):
+    image = _image((40, 60), dtype=dtype, seed=2)
+    data = imwrite_to_memory(image)
+    # Shorter than the range of the image: larger values take the last entry.
+    lut = np.random.default_rng(3).integers(0, 256, 1000, dtype=np.uint8)
+    decoded = imread_from_memory(data, lut=lut)
+    index = image.astype(np.int64) - np.iinfo(dtype).min
+    np.testing.assert_array_equal(decoded, lut[np.minimum(index, 999)])
+
+
+def test_level_region_and_out(tmp_path):
+    image = _image((100, 90), seed=4)
+    filename = tmp_path / 'image.j2c'
+    imwrite(filename, image)
+    reference = imread(filename, level=1, region=(5, 40, 10, 30))
+    out = np.empty(reference.shape, dtype=np.uint8)
+    result = imread(filename, level=1, region=(5, 40, 10, 30), out=out,
+                    shift=8)
+    assert np.shares_memory(result, out)
+    np.testing.assert_array_equal(out, reference >> 8)
+
+
+def test_native_entry_points(tmp_path):
+    image = _image((32, 48), seed=5)
+    data = imwrite_to_memory(image)
+    expected = (image >> 8).astype(np.uint8)
+
+    out = np.empty(image.shape, dtype=np.uint8)
+    read_j2c_into(data, out, 0, None, None, shift=8)
+    np.testing.assert_array_equal(out, expected)
+
+    filename = tmp_path / 'image.j2c'
+    with open(filename, 'wb') as f:
+        f.write(bytes(data))
+    out[...] = 0
+    fd = os.open(filename, _O_RDONLY_BINARY)
+    try:
+        read_j2c_fd_into(fd, 0, len(data), out, 0, None, None,
+                         lut=np.arange(256, dtype=np.uint8).repeat(256))
+    finally:
+        os.close(fd)
+    np.testing.assert_array_equal(out, expected)
+
+
+def test_invalid_mapping():
+    data = imwrite_to_memory(_image((16, 16), seed=6))
+    with pytest.raises(ValueError, match='at most one'):
+        imread_from_memory(data, shift=8, window=(0, 10))
+    with pytest.raises(ValueError, match='uint8'):
+        imread_from_memory(data, shift=8, dtype=np.uint16)
+    with pytest.raises(ValueError, match='low < high'):
+        imread_from_memory(data, window=(10, 10))
+    with pytest.raises(ValueError, match='shift must be'):
+        imread_from_memory(data, shift=40)
+    with pytest.raises(ValueError, match='lut must be'):
+        imread_from_memory(data, lut=np.arange(10, dtype=np.uint16))
+    with pytest.raises(ValueError, match='uint8 out'):
+        read_j2c_into(data, np.empty((16, 16), np.uint16), 0, None, None,
+                      shift=8)
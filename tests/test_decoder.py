@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from ojph import Decoder, imwrite, imwrite_to_memory, imread_from_memory
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+def test_repeated_levels_from_file(tmp_path):
+    image = _image((257, 199))
+    filename = tmp_path / 'image.j2c'
+    imwrite(filename, image)
+    data = imwrite_to_memory(image)
+
+    with Decoder(filename) as decoder:
+        assert decoder.shape == image.shape
+        assert decoder.dtype == image.dtype
+        # The file is only read on construction.
+        filename.unlink()
+        for level in [3, 0, 2, 1, 3]:
+            np.testing.assert_array_equal(
+                decoder.read(level=level),
+                imread_from_memory(data, level=level))
+
+
+def test_region_and_out():
+    image = _image((128, 128), dtype=np.uint16, seed=1)
+    decoder = Decoder(imwrite_to_memory(image, tile_size=(32, 32)))
+    out = np.empty((20, 40), dtype=np.uint16)
+    result = decoder.read(region=(10, 30, 50, 90), out=out)
+    assert result is out or np.shares_memory(result, out)
+    np.testing.assert_array_equal(out, image[10:30, 50:90])
+    np.testing.assert_array_equal(decoder.read(), image)
+
+
+@pytest.mark.parametrize('channel_order, shape', [
+    ('HWC', (64, 48, 3)),
+    ('CHW', (3, 64, 48)),
+])
+def test_component_subsets(channel_order, shape):
+    image = _image(shape, seed=2)
+    decoder = Decoder(imwrite_to_memory(image, channel_order=channel_order),
+                      channel_order=channel_order)
+    assert decoder.num_components == 3
+
+    if channel_order == 'HWC':
+        def pick(array, components):
+            return array[..., components]
+    else:
+        def pick(array, components):
+            return array[components]
+
+    np.testing.assert_array_equal(decoder.read(components=[2, 0]),
+                                  pick(image, [2, 0]))
+    np.testing.assert_array_equal(decoder.read(components=1),
+                                  pick(image, [1]))
+    reduced = imread_from_memory(imwrite_to_memory(
+        image, channel_order=channel_order), channel_order=channel_order,
+        level=1)
+    np.testing.assert_array_equal(decoder.read(level=1, components=[1]),
+                                  pick(reduced, [1]))
+    with pytest.raises(ValueError, match='out of range'):
+        decoder.read(components=[3])
+
+
+def test_offset_into_buffer():
+    image = _image((40, 40), seed=3)
+    data = imwrite_to_memory(image)
+    padded = np.concatenate([np.zeros(17, np.uint8), data])
+    np.testing.assert_array_equal(Decoder(padded, offset=17).read(), image)
+
+
+def test_closed_decoder_raises():
+    decoder = Decoder(imwrite_to_memory(_image((16, 16), seed=4)))
+    decoder.close()
+    with pytest.raises(ValueError, match='closed'):
+        decoder.read()
+
+
+@pytest.mark.parametrize('tlm_marker', [True, False])
+def test_codestream_inside_a_larger_file(tmp_path, tlm_marker):
+    image = _image((96, 80), seed=5)
+    data = imwrite_to_memory(image, tile_size=(32, 32), tlm_marker=tlm_marker)
+    filename = tmp_path / 'container.bin'
+    filename.write_bytes(b'\xff' * 1000 + bytes(data) + b'\xff' * 5000)
+
+    decoder = Decoder(filename, offset=1000)
+    # Only the codestream is read, not the bytes around it.
+    assert decoder._data.nbytes == data.nbytes
+    for level in [0, 2, 1]:
+        np.testing.assert_array_equal(decoder.read(level=level),
+                                      imread_from_memory(data, level=level))
+    np.testing.assert_array_equal(
+        Decoder(filename, offset=1000, nbytes=data.nbytes).read(), image)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from ojph import Encoder, imwrite_to_memory, imread_from_memory
+
+
+def _frames(count, shape, dtype=np.uint8, seed=0):
+    rng = np.random.default_rng(seed)
+    info = np.iinfo(dtype)
+    return rng.integers(info.min, info.max, (count,) + shape, dtype=dtype)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {},
+    dict(wavelet='irv97', qstep=0.01),
+    dict(num_decompositions=3, progression_order='RPCL'),
+    dict(tile_size=(32, 48), num_threads=0),
+])
+def test_encode_matches_imwrite_to_memory(kwargs):
+    frames = _frames(5, (96, 128))
+    encoder = Encoder(frames.shape[1:], frames.dtype, **kwargs)
+    for frame in frames:
+        data = encoder.encode(frame)
+        assert not data.flags.writeable
+        np.testing.assert_array_equal(data, imwrite_to_memory(frame, **kwargs))
+
+
+def test_encode_multi_component():
+    frames = _frames(3, (3, 40, 56), dtype=np.uint16, seed=1)
+    encoder = Encoder((3, 40, 56), np.uint16, channel_order='CHW')
+    for frame in frames:
+        np.testing.assert_array_equal(
+            imread_from_memory(encoder.encode(frame), channel_order='CHW'),
+            frame)
+
+
+def test_encode_after_a_smaller_frame():
+    encoder = Encoder((128, 128), np.uint8)
+    smooth = np.zeros((128, 128), dtype=np.uint8)
+    noisy = _frames(1, (128, 128), seed=2)[0]
+    # The reused codestream and output buffer grow to fit the noisy frame.
+    np.testing.assert_array_equal(
+        imread_from_memory(encoder.encode(smooth)), smooth)
+    np.testing.assert_array_equal(
+        imread_from_memory(encoder.encode(noisy)), noisy)
+
+
+def test_encode_into():
+    frame = _frames(1, (64, 64), seed=3)[0]
+    encoder = Encoder(frame.shape, frame.dtype)
+    out = np.empty(64 * 64 + 4096, dtype=np.uint8)
+    nbytes = encoder.encode_into(frame, out)
+    np.testing.assert_array_equal(out[:nbytes], encoder.encode(frame))
+    with pytest.raises(ValueError, match='too small'):
+        encoder.encode_into(frame, out[:16])
+
+
+def test_byte_swapped_frames():
+    frame = _frames(1, (32, 32), dtype=np.uint16, seed=4)[0]
+    encoder = Encoder(frame.shape, frame.dtype)
+    swapped = frame.astype(frame.dtype.newbyteorder())
+    np.testing.assert_array_equal(
+        imread_from_memory(encoder.encode(swapped)), frame)
+
+
+@pytest.mark.parametrize('shape, dtype', [
+    ((64, 48), np.uint8),
+    ((48, 64), np.uint16),
+])
+def test_rejects_other_geometry(shape, dtype):
+    encoder = Encoder((48, 64), np.uint8)
+    with pytest.raises(ValueError, match='Encoder expects'):
+        encoder.encode(np.zeros(shape, dtype=dtype))
+
+
+def test_invalid_parameters_raise_at_construction():
+    with pytest.raises(ValueError):
+        Encoder((32, 32), np.uint8, progression_order='XYZW')
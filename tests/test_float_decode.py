@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pytest
+
+from ojph import imread, imread_from_memory, imwrite, imwrite_to_memory
+from ojph.ojph_bindings import read_j2c_fd_into, read_j2c_into
+
+_O_RDONLY_BINARY = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float16])
+@pytest.mark.parametrize('image_dtype', [np.uint8, np.int16])
+def test_fused_scale_matches_numpy(dtype, image_dtype):
+    image = _image((64, 80), dtype=image_dtype)
+    data = imwrite_to_memory(image)
+    scale = np.float32(1 / 255)
+    decoded = imread_from_memory(data, dtype=dtype, scale=scale)
+    assert decoded.dtype == dtype
+    # float32 products, rounded once to the output dtype.
+    np.testing.assert_array_equal(
+        decoded, (image.astype(np.float32) * scale).astype(dtype))
+
+
+def test_value_offset_level_and_region():
+    image = _image((100, 90, 3), seed=1)
+    data = imwrite_to_memory(image, channel_order='HWC')
+    reference = imread_from_memory(data, level=1, region=(5, 40, 10, 30))
+    out = np.empty(reference.shape, dtype=np.float32)
+    result = imread_from_memory(data, level=1, region=(5, 40, 10, 30),
+                                out=out, scale=2, value_offset=-0.5)
+    assert result is out or np.shares_memory(result, out)
+    np.testing.assert_allclose(out, reference * 2.0 - 0.5, rtol=1e-6)
+
+
+def test_float_encode_round_trip(tmp_path):
+    # Multiples of 1/256 survive a reversible encode scaled by 256.
+    image = (_image((48, 48), dtype=np.uint16, seed=2) % 2048 / 256).astype(
+        np.float32)
+    filename = tmp_path / 'float.j2c'
+    imwrite(filename, image, scale=256)
+    np.testing.assert_array_equal(
+        imread(filename, dtype=np.float32, scale=1 / 256), image)
+
+
+def test_native_entry_points(tmp_path):
+    image = _image((64, 64), dtype=np.uint16, seed=3)
+    data = np.frombuffer(bytes(imwrite_to_memory(image)), dtype=np.uint8)
+    expected = image.astype(np.float32) * np.float32(0.5) + np.float32(1)
+
+    out = np.empty(image.shape, dtype=np.float32)
+    read_j2c_into(data, out, 0, scale=0.5, value_offset=1)
+    np.testing.assert_allclose(out, expected, rtol=1e-6)
+
+    filename = tmp_path / 'image.j2c'
+    data.tofile(filename)
+    out[...] = 0
+    fd = os.open(filename, _O_RDONLY_BINARY)
+    try:
+        read_j2c_fd_into(fd, 0, data.size, out, 0, scale=0.5, value_offset=1)
+    finally:
+        os.close(fd)
+    np.testing.assert_allclose(out, expected, rtol=1e-6)
+
+
+def test_invalid_arguments():
+    data = imwrite_to_memory(np.zeros((16, 16), np.uint8))
+    with pytest.raises(ValueError, match='float16 or float32'):
+        imread_from_memory(data, dtype=np.float64)
+    with pytest.raises(ValueError, match='only apply to float'):
+        imread_from_memory(data, scale=2)
+    with pytest.raises(ValueError, match='dtype must be'):
+        imread_from_memory(data, dtype=np.uint16)
+    with pytest.raises(ValueError, match='does not match out'):
+        imread_from_memory(data, dtype=np.float16,
+                           out=np.empty((16, 16), np.float32))
+    with pytest.raises(ValueError, match='float16 or float32'):
+        read_j2c_into(np.frombuffer(bytes(data), np.uint8),
+                      np.empty((16, 16), np.float64), 0)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from ojph import (
+    Encoder, StreamingEncoder, imread_from_memory, imwrite_batch_to_memory,
+    imwrite_to_memory,
+)
+
+
+def _float_image(shape, dtype=np.float32, seed=0):
+    # Multiples of 1/256, so value * 256 is exact in float16 and float32.
+    values = np.random.default_rng(seed).integers(0, 256 * 8, shape)
+    return (values / 256).astype(dtype)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float16])
+def test_fused_scale_and_round_is_lossless_on_the_grid(dtype):
+    image = _float_image((96, 80), dtype=dtype)
+    data = imwrite_to_memory(image, scale=256)
+    decoded = imread_from_memory(data)
+    assert decoded.dtype == np.uint16
+    np.testing.assert_array_equal(
+        decoded, (image.astype(np.float64) * 256).astype(np.uint16))
+
+
+def test_offset_clipping_and_storage_dtype():
+    image = np.array([[-1.0, -0.5, 0.0, 0.25],
+                      [0.5, 1.0, np.nan, np.inf]], dtype=np.float32)
+    decoded = imread_from_memory(imwrite_to_memory(
+        image, scale=100, offset=-20, storage_dtype=np.int8))
+    assert decoded.dtype == np.int8
+    np.testing.assert_array_equal(
+        decoded, [[-120, -70, -20, 5], [30, 80, -128, 127]])
+
+
+def test_matches_an_integer_conversion():
+    image = _float_image((64, 48, 3), seed=1)
+    expected = imwrite_to_memory((image * 256).astype(np.uint16))
+    np.testing.assert_array_equal(imwrite_to_memory(image, scale=256), expected)
+    # The other encode paths quantize the same way.
+    np.testing.assert_array_equal(
+        Encoder(image.shape, image.dtype, scale=256).encode(image), expected)
+    (batch,) = imwrite_batch_to_memory([image], scale=256)
+    np.testing.assert_array_equal(batch, expected)
+    tiled = imwrite_to_memory(image, scale=256, tile_size=(32, 32),
+                              num_threads=0)
+    np.testing.assert_array_equal(
+        imread_from_memory(tiled), (image * 256).astype(np.uint16))
+
+
+def test_streaming_encoder(tmp_path):
+    image = _float_image((50, 40), dtype=np.float16, seed=2)
+    filename = tmp_path / 'float.j2c'
+    with StreamingEncoder(filename, image.shape, image.dtype, scale=256,
+                          storage_dtype=np.uint16) as enc:
+        enc.push_rows(image[:17])
+        enc.push_rows(image[17:])
+    np.testing.assert_array_equal(
+        np.fromfile(filename, dtype=np.uint8),
+        imwrite_to_memory(image, scale=256))
+
+
+def test_irreversible():
+    image = _float_image((128, 128), seed=3)
+    decoded = imread_from_memory(imwrite_to_memory(
+        image, scale=256, wavelet='irv97', qstep=0.0001))
+    np.testing.assert_allclose(decoded / 256, image, atol=2 / 256)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError, match='float16 or float32'):
+        imwrite_to_memory(np.zeros((16, 16), np.float64))
+    with pytest.raises(ValueError, match='only apply to float'):
+        imwrite_to_memory(np.zeros((16, 16), np.uint8), scale=2)
+    with pytest.raises(ValueError, match='storage_dtype'):
+        imwrite_to_memory(np.zeros((16, 16), np.float32),
+                          storage_dtype=np.uint32)
+    with pytest.raises(ValueError, match='scale is required'):
+        imwrite_to_memory(np.zeros((16, 16), np.float32))
+    encoder = Encoder((16, 16), np.float32, scale=1)
+    with pytest.raises(ValueError):
+        encoder.encode(np.zeros((16, 16), np.uint16))
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pytest
+
+from ojph import header_cache, imwrite, imwrite_to_memory, imread
+from ojph._imread import OJPHImageFile
+
+
+@pytest.fixture(autouse=True)
+def _clean_cache():
+    maxsize = header_cache.maxsize
+    header_cache.clear()
+    yield
+    header_cache.maxsize = maxsize
+    header_cache.clear()
+
+
+def _image(shape, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+
+def test_file_metadata_is_cached(tmp_path):
+    filename = tmp_path / 'image.j2c'
+    imwrite(filename, _image((97, 61)), num_decompositions=3)
+
+    first = OJPHImageFile(filename)
+    assert header_cache.info().misses == 1
+    second = OJPHImageFile(filename)
+    info = header_cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    # A hit does not open the file until the pixels are needed.
+    assert second._codestream is None
+    assert second.shape == first.shape == (97, 61)
+    assert second.levels == 3
+    assert second.get_level_shape(3) == (13, 8)
+    np.testing.assert_array_equal(second.read_image(), imread(filename))
+
+
+def test_rewritten_file_gets_a_new_entry(tmp_path):
+    filename = tmp_path / 'image.j2c'
+    imwrite(filename, _image((32, 32)))
+    assert OJPHImageFile(filename).shape == (32, 32)
+
+    imwrite(filename, _image((48, 40), seed=1))
+    # Make sure the mtime moves even on coarse-grained file systems.
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert OJPHImageFile(filename).shape == (48, 40)
+
+
+def test_memory_buffers_are_keyed_on_content():
+    image = _image((64, 64), seed=2)
+    data = imwrite_to_memory(image)
+    OJPHImageFile.from_memory(data)
+    OJPHImageFile.from_memory(data.copy())
+    info = header_cache.info()
+    assert (info.hits, info.misses) == (1, 1)
+
+    other = imwrite_to_memory(_image((64, 80), seed=3))
+    assert OJPHImageFile.from_memory(other).shape == (64, 80)
+    assert header_cache.info().currsize == 2
+
+
+def test_invalidate_and_clear(tmp_path):
+    filename = tmp_path / 'image.j2c'
+    imwrite(filename, _image((16, 16)))
+    data = imwrite_to_memory(_image((16, 16), seed=4))
+    OJPHImageFile(filename)
+    OJPHImageFile.from_memory(data)
+    assert header_cache.info().currsize == 2
+
+    header_cache.invalidate(filename)
+    assert header_cache.info().currsize == 1
+    header_cache.invalidate(data)
+    assert header_cache.info().currsize == 0
+
+    OJPHImageFile(filename)
+    header_cache.clear()
+    assert header_cache.info() == (0, 0, header_cache.maxsize, 0)
+
+
+def test_lru_eviction(tmp_path):
+    header_cache.maxsize = 2
+    filenames = []
+    for i in range(3):
+        filenames.append(tmp_path / f'image{i}.j2c')
+        imwrite(filenames[-1], _image((16, 16), seed=i))
+        OJPHImageFile(filenames[-1])
+    assert header_cache.info().currsize == 2
+
+    OJPHImageFile(filenames[0])
+    assert header_cache.info().hits == 0
+    OJPHImageFile(filenames[2])
+    assert header_cache.info().hits == 1
+
+    header_cache.maxsize = 0
+    assert header_cache.info().currsize == 0
@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pytest
+
+from ojph import imwrite_to_memory, imread, imread_from_memory
+from ojph._imread import OJPHImageFile
+from ojph.ojph_bindings import read_j2c_level_fd
+
+_O_RDONLY_BINARY = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+def _write(path, data, pad=0):
+    with open(path, 'wb') as f:
+        f.write(b'\x00' * pad)
+        f.write(bytes(data))
+    return path
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(progression_order='RLCP', tileparts_at_resolutions=True),
+    dict(progression_order='RPCL', tileparts_at_resolutions=True,
+         tile_size=(64, 64)),
+    dict(tlm_marker=False),
+])
+@pytest.mark.parametrize('pad', [0, 1234])
+def test_imread_every_level(tmp_path, kwargs, pad):
+    image = _image((200, 176), dtype=np.uint16)
+    data = imwrite_to_memory(image, num_decompositions=4, **kwargs)
+    filename = _write(tmp_path / 'image.j2c', data, pad)
+    offset = pad if pad else None
+    for level in range(5):
+        np.testing.assert_array_equal(
+            imread(filename, level=level, offset=offset),
+            imread_from_memory(data, level=level))
+
+
+@pytest.mark.parametrize('channel_order, shape', [
+    ('HWC', (96, 128, 3)),
+    ('CHW', (3, 96, 128)),
+])
+def test_imread_multi_component_levels(tmp_path, channel_order, shape):
+    image = _image(shape, seed=1)
+    data = imwrite_to_memory(image, channel_order=channel_order,
+                             progression_order='RLCP',
+                             tileparts_at_resolutions=True,
+                             tileparts_at_components=True)
+    filename = _write(tmp_path / 'image.j2c', data, 4096)
+    image_file = OJPHImageFile(filename, channel_order=channel_order,
+                               offset=4096)
+    for level in range(4):
+        np.testing.assert_array_equal(
+            image_file.read_image(level=level),
+            imread_from_memory(data, channel_order=channel_order,
+                               level=level))
+
+
+def test_imread_region_at_level(tmp_path):
+    image = _image((256, 256), seed=2)
+    data = imwrite_to_memory(image, tile_size=(64, 64),
+                             progression_order='RLCP',
+                             tileparts_at_resolutions=True)
+    filename = _write(tmp_path / 'image.j2c', data)
+    full = imread_from_memory(data, level=2)
+    np.testing.assert_array_equal(
+        imread(filename, level=2, region=(3, 40, 20, 60)),
+        full[3:40, 20:60])
+
+
+def test_read_j2c_level_fd_reads_a_fraction(tmp_path):
+    image = _image((512, 512), seed=3)
+    data = imwrite_to_memory(image, num_decompositions=5,
+                             progression_order='RLCP',
+                             tileparts_at_resolutions=True)
+    filename = _write(tmp_path / 'image.j2c', data, 100)
+    fd = os.open(filename, _O_RDONLY_BINARY)
+    try:
+        full = read_j2c_level_fd(fd, 100, data.nbytes, 0)
+        np.testing.assert_array_equal(full, data)
+        thumbnail = read_j2c_level_fd(fd, 100, data.nbytes, 4)
+    finally:
+        os.close(fd)
+    assert thumbnail.nbytes < data.nbytes / 10
+    np.testing.assert_array_equal(imread_from_memory(thumbnail, level=4),
+                                  imread_from_memory(data, level=4))
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(tlm_marker=False),
+    dict(progression_order='CPRL'),
+    dict(progression_order='RLCP', tileparts_at_resolutions=True),
+])
+def test_level_read_stops_at_the_codestream_end(tmp_path, kwargs):
+    image = _image((128, 96), seed=4)
+    data = imwrite_to_memory(image, **kwargs)
+    filename = tmp_path / 'container.bin'
+    with open(filename, 'wb') as f:
+        f.write(b'\x00' * 512)
+        f.write(bytes(data))
+        f.write(b'\xff' * (4 << 20))
+    image_file = OJPHImageFile(filename, offset=512)
+    assert image_file._read_level(0).nbytes == data.nbytes
+    np.testing.assert_array_equal(imread(filename, offset=512), image)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from ojph import imwrite_to_memory, imwrite_batch_to_memory, imread_from_memory
+
+
+def _frames(count, shape, dtype=np.uint8, seed=0):
+    rng = np.random.default_rng(seed)
+    info = np.iinfo(dtype)
+    return rng.integers(info.min, info.max, (count,) + shape, dtype=dtype)
+
+
+@pytest.mark.parametrize('num_threads', [0, 1, 4])
+def test_batch_matches_imwrite_to_memory(num_threads):
+    frames = _frames(10, (64, 96))
+    compressed = imwrite_batch_to_memory(frames, num_threads=num_threads)
+
+    assert len(compressed) == len(frames)
+    for frame, data in zip(frames, compressed):
+        # Encoding is deterministic, so the batch must produce exactly the
+        # bytes of the one-at-a-time path.
+        np.testing.assert_array_equal(data, imwrite_to_memory(frame))
+        np.testing.assert_array_equal(imread_from_memory(data), frame)
+        assert not data.flags.writeable
+
+
+@pytest.mark.parametrize('channel_order, shape', [
+    ('HWC', (48, 40, 3)),
+    ('CHW', (3, 48, 40)),
+])
+def test_batch_multi_component(channel_order, shape):
+    frames = list(_frames(4, shape, dtype=np.uint16, seed=1))
+    compressed = imwrite_batch_to_memory(frames, channel_order=channel_order)
+    for frame, data in zip(frames, compressed):
+        np.testing.assert_array_equal(
+            imread_from_memory(data, channel_order=channel_order), frame)
+
+
+def test_batch_shared_parameters():
+    frames = _frames(3, (128, 128), seed=2)
+    kwargs = dict(wavelet='irv97', qstep=0.01, num_decompositions=3,
+                  progression_order='LRCP')
+    compressed = imwrite_batch_to_memory(frames, **kwargs)
+    for frame, data in zip(frames, compressed):
+        np.testing.assert_array_equal(data, imwrite_to_memory(frame, **kwargs))
+
+
+def test_batch_concatenate():
+    frames = _frames(5, (32, 32), seed=3)
+    data, offsets = imwrite_batch_to_memory(frames, concatenate=True)
+    assert offsets.shape == (len(frames) + 1,)
+    assert offsets[0] == 0
+    assert offsets[-1] == data.nbytes
+    for i, frame in enumerate(frames):
+        np.testing.assert_array_equal(
+            imread_from_memory(data[offsets[i]:offsets[i + 1]]), frame)
+
+
+def test_batch_byte_swapped_input():
+    frames = _frames(2, (32, 48), dtype=np.uint16, seed=4)
+    swapped = frames.astype(frames.dtype.newbyteorder())
+    for frame, data in zip(frames, imwrite_batch_to_memory(swapped)):
+        np.testing.assert_array_equal(imread_from_memory(data), frame)
+
+
+def test_batch_empty():
+    assert imwrite_batch_to_memory([]) == []
+    data, offsets = imwrite_batch_to_memory([], concatenate=True)
+    assert data.nbytes == 0
+    np.testing.assert_array_equal(offsets, [0])
+
+
+def test_batch_rejects_mixed_shapes():
+    frames = [np.zeros((32, 32), np.uint8), np.zeros((32, 48), np.uint8)]
+    with pytest.raises(ValueError, match='same shape and dtype'):
+        imwrite_batch_to_memory(frames)
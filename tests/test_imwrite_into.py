@@ -0,0 +1,74 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from ojph import imwrite_into, imwrite_to_memory, imread_from_memory
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+@pytest.mark.parametrize('kwargs', [
+    {},
+    dict(tlm_marker=False),
+    dict(wavelet='irv97', qstep=0.01),
+    dict(channel_order='HWC'),
+    dict(tile_size=(64, 64)),
+    dict(tile_size=(64, 64), num_threads=0),
+])
+def test_matches_imwrite_to_memory(kwargs):
+    shape = (128, 160, 3) if 'channel_order' in kwargs else (128, 160)
+    image = _image(shape)
+    reference = imwrite_to_memory(image, **kwargs)
+
+    out = np.full(reference.nbytes + 100, 0xAA, dtype=np.uint8)
+    nbytes = imwrite_into(image, out, **kwargs)
+
+    assert nbytes == reference.nbytes
+    np.testing.assert_array_equal(out[:nbytes], reference)
+    # Nothing is written past the codestream.
+    assert (out[nbytes:] == 0xAA).all()
+
+
+def test_into_shared_memory_slot():
+    frames = [_image((64, 64), dtype=np.uint16, seed=i) for i in range(3)]
+    slot = 64 * 64 * 2 + 4096
+    shm = shared_memory.SharedMemory(create=True, size=slot * len(frames))
+    try:
+        sizes = [
+            imwrite_into(frame, shm.buf[i * slot:(i + 1) * slot])
+            for i, frame in enumerate(frames)
+        ]
+        for i, (frame, nbytes) in enumerate(zip(frames, sizes)):
+            data = np.frombuffer(shm.buf, dtype=np.uint8,
+                                 count=nbytes, offset=i * slot)
+            np.testing.assert_array_equal(imread_from_memory(data), frame)
+            del data
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_bytearray_out():
+    image = _image((32, 48), seed=1)
+    out = bytearray(8192)
+    nbytes = imwrite_into(image, out)
+    np.testing.assert_array_equal(imread_from_memory(out[:nbytes]), image)
+
+
+def test_too_small_reports_required_size():
+    image = _image((128, 128), seed=2)
+    required = imwrite_to_memory(image).nbytes
+    with pytest.raises(ValueError, match=f'needs {required} bytes'):
+        imwrite_into(image, np.empty(required - 1, dtype=np.uint8))
+    assert imwrite_into(image, np.empty(required, dtype=np.uint8)) == required
+
+
+def test_read_only_out_raises():
+    image = _image((32, 32), seed=3)
+    with pytest.raises(ValueError, match='writable'):
+        imwrite_into(image, bytes(4096))
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from ojph import imwrite, imwrite_to_memory, imread_from_memory
+from ojph._imread import OJPHImageFile
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+@pytest.mark.parametrize('level', [0, 1, 3])
+@pytest.mark.parametrize('stripe_height', [1, 16, 37, 500])
+def test_stripes_match_read_image(tmp_path, level, stripe_height):
+    image = _image((150, 120), dtype=np.uint16)
+    filename = tmp_path / 'image.j2c'
+    imwrite(filename, image, tile_size=(64, 64))
+    expected = OJPHImageFile(filename).read_image(level=level)
+
+    stripes = [stripe.copy() for stripe in
+               OJPHImageFile(filename).iter_rows(stripe_height, level=level)]
+    assert all(len(stripe) == min(stripe_height, len(expected))
+               for stripe in stripes[:-1])
+    np.testing.assert_array_equal(np.concatenate(stripes), expected)
+
+
+@pytest.mark.parametrize('channel_order', ['HWC', 'CHW'])
+def test_multi_component(channel_order):
+    shape = (70, 50, 3) if channel_order == 'HWC' else (3, 70, 50)
+    image = _image(shape, seed=1)
+    data = imwrite_to_memory(image, channel_order=channel_order)
+    image_file = OJPHImageFile.from_memory(data, channel_order=channel_order)
+    axis = channel_order.index('H')
+    stripes = [stripe.copy() for stripe in image_file.iter_rows(16)]
+    np.testing.assert_array_equal(np.concatenate(stripes, axis=axis), image)
+    # The file can be read again once the iteration has ended.
+    np.testing.assert_array_equal(
+        image_file.read_image(level=1),
+        imread_from_memory(data, channel_order=channel_order, level=1))
+
+
+def test_stripe_buffer_is_reused():
+    image = _image((64, 32), seed=2)
+    image_file = OJPHImageFile.from_memory(imwrite_to_memory(image))
+    stripes = list(image_file.iter_rows(16))
+    assert len(stripes) == 4
+    assert all(np.shares_memory(stripes[0], stripe) for stripe in stripes)
+
+
+def test_invalid_arguments():
+    image_file = OJPHImageFile.from_memory(
+        imwrite_to_memory(np.zeros((32, 32), np.uint8), num_decompositions=2))
+    with pytest.raises(ValueError, match='stripe_height'):
+        next(image_file.iter_rows(0))
+    with pytest.raises(ValueError, match='level'):
+        next(image_file.iter_rows(8, level=3))
@@ -2,7 +2,7 @@ import numpy as np
 import tempfile
 import pytest
 import os
-from ojph import imwrite_to_memory, imread
+from ojph import imwrite_to_memory, imread, imread_from_memory
 
 
 def _mse(a, b):
@@ -160,3 +160,37 @@ def test_lossless_vs_lossy_memory_error_increase(tmp_path):
 
     assert mse_low > 0.0
     assert mse_high > mse_low
+
+
+def test_imwrite_to_memory_is_zero_copy(tmp_path):
+    from ojph._imwrite import CompressedData
+
+    test_image = np.random.default_rng(7).integers(0, 256, (300, 200),
+                                                   dtype=np.uint8)
+    compressed_data = imwrite_to_memory(test_image, copy=False)
+
+    # The array is a view of the encoder's buffer, which it keeps alive.
+    assert isinstance(compressed_data.base, CompressedData)
+    assert not compressed_data.flags.writeable
+
+    # The default is an exactly-sized copy that holds no encoder buffer.
+    copied = imwrite_to_memory(test_image)
+    assert isinstance(copied.base, bytes)
+    assert not copied.flags.writeable
+    np.testing.assert_array_equal(compressed_data, copied)
+
+    filename = tmp_path / 'test.j2c'
+    with open(filename, 'wb') as f:
+        f.write(compressed_data)
+    np.testing.assert_array_equal(imread(filename), test_image)
+
+
+def test_imwrite_to_memory_outlives_encoder():
+    import gc
+
+    test_image = np.random.default_rng(8).integers(0, 65536, (64, 64),
+                                                   dtype=np.uint16)
+    compressed_data = imwrite_to_memory(test_image, copy=False)
+    gc.collect()
+    np.testing.assert_array_equal(
+        imread_from_memory(compressed_data), test_image)
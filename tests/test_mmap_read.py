@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from ojph import imwrite, imwrite_to_memory, imread, imread_from_memory
+from ojph._imread import OJPHImageFile
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+@pytest.mark.parametrize('level', [0, 1, 3])
+def test_mmap_matches_imread(tmp_path, level):
+    image = _image((200, 160), dtype=np.uint16)
+    filename = tmp_path / 'image.j2c'
+    imwrite(filename, image)
+    np.testing.assert_array_equal(
+        imread(filename, level=level, mmap=True),
+        imread(filename, level=level))
+
+
+def test_mmap_offset_and_repeated_reads(tmp_path):
+    image = _image((96, 128, 3), seed=1)
+    data = imwrite_to_memory(image, channel_order='HWC', tile_size=(32, 32))
+    filename = tmp_path / 'container.bin'
+    with open(filename, 'wb') as f:
+        f.write(b'\x00' * 5000)
+        f.write(bytes(data))
+        f.write(b'\xff' * 100)
+
+    image_file = OJPHImageFile(filename, channel_order='HWC', offset=5000,
+                               mmap=True)
+    assert image_file.shape == image.shape
+    np.testing.assert_array_equal(image_file.read_image(), image)
+    np.testing.assert_array_equal(
+        image_file.read_image(region=(10, 50, 40, 90)), image[10:50, 40:90])
+    np.testing.assert_array_equal(
+        image_file.read_image(level=2),
+        imread_from_memory(data, channel_order='HWC', level=2))
+
+
+def test_mmap_is_closed_after_each_read(tmp_path):
+    image = _image((64, 64, 3), seed=2)
+    data = imwrite_to_memory(image, channel_order='HWC', tile_size=(32, 32))
+    filename = tmp_path / 'image.j2c'
+    filename.write_bytes(bytes(data))
+
+    image_file = OJPHImageFile(filename, channel_order='HWC', mmap=True)
+    np.testing.assert_array_equal(image_file.read_image(), image)
+    assert image_file._mmap is None
+    np.testing.assert_array_equal(
+        image_file.read_image(region=(8, 40, 16, 48)), image[8:40, 16:48])
+    assert image_file._mmap is None
+    stripes = list(image_file.iter_rows(16, level=1))
+    assert image_file._mmap is None
+    assert len(stripes) == 2
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from ojph import imwrite_to_memory, imread_from_memory
+
+numcodecs = pytest.importorskip('numcodecs')
+from ojph.numcodecs import OJPH  # noqa: E402
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+@pytest.mark.parametrize('shape, dtype, channel_order', [
+    ((128, 96), np.uint16, None),
+    ((1, 1, 64, 80), np.uint8, None),
+    ((64, 48, 3), np.uint8, 'HWC'),
+    ((3, 64, 48), np.int16, 'CHW'),
+])
+def test_roundtrip(shape, dtype, channel_order):
+    chunk = _image(shape, dtype=dtype)
+    codec = OJPH(channel_order=channel_order)
+    encoded = codec.encode(chunk)
+
+    decoded = codec.decode(encoded)
+    np.testing.assert_array_equal(decoded.reshape(shape), chunk)
+
+    out = np.zeros(shape, dtype=dtype)
+    assert codec.decode(encoded, out=out) is out
+    np.testing.assert_array_equal(out, chunk)
+
+    raw = bytearray(chunk.nbytes)
+    codec.decode(encoded, out=raw)
+    np.testing.assert_array_equal(
+        np.frombuffer(raw, dtype=dtype).reshape(shape), chunk)
+
+
+@pytest.mark.parametrize('level', [1, 2])
+def test_level(level):
+    chunk = _image((100, 70), seed=1)
+    encoded = bytes(OJPH().encode(chunk))
+    expected = imread_from_memory(encoded, level=level)
+    codec = OJPH(level=level)
+    np.testing.assert_array_equal(codec.decode(encoded), expected)
+    out = np.empty((1,) + expected.shape, dtype=chunk.dtype)
+    codec.decode(encoded, out=out)
+    np.testing.assert_array_equal(out[0], expected)
+
+
+def test_config_and_registry():
+    codec = OJPH(level=1, reversible=True, tile_size=(32, 32),
+                 num_decompositions=3)
+    config = codec.get_config()
+    assert config['id'] == 'ojph'
+    assert numcodecs.get_codec(config) == codec
+
+    chunk = _image((96, 96), seed=2)
+    np.testing.assert_array_equal(
+        codec.decode(codec.encode(chunk)),
+        imread_from_memory(imwrite_to_memory(
+            chunk, reversible=True, num_decompositions=3,
+            tile_size=(32, 32)), level=1))
+
+
+def test_invalid():
+    with pytest.raises(ValueError, match='Chunks must be 2-D'):
+        OJPH().encode(np.zeros((2, 16, 16), np.uint8))
+    encoded = OJPH().encode(np.zeros((16, 16), np.uint8))
+    with pytest.raises(ValueError):
+        OJPH().decode(encoded, out=np.empty((8, 8), np.uint8))
+    with pytest.raises(ValueError, match='channel_order'):
+        OJPH(channel_order='WHC')
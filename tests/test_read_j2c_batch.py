@@ -0,0 +1,95 @@
+"""Tests for ``read_j2c_batch``, the batched form of ``read_j2c_into``.
+
+``read_j2c_batch(datas, outs, levels, min_val=None, max_val=None,
+num_threads=0)`` decodes every item on a native thread pool under one GIL
+release. Each item must come out byte-identical to ``read_j2c_into``, and a
+broken item must be reported in the returned status list instead of
+aborting the rest of the batch.
+"""
+import numpy as np
+import pytest
+
+from ojph._imwrite import imwrite_to_memory
+from ojph._imread import imread_from_memory
+from ojph.ojph_bindings import read_j2c_batch
+
+
+def _encode(image, num_decompositions=4):
+    data = imwrite_to_memory(
+        image,
+        channel_order='HW',
+        num_decompositions=num_decompositions,
+        progression_order='RLCP',
+    )
+    return np.frombuffer(bytes(data), dtype=np.uint8).copy()
+
+
+def _tiles(count, shape=(64, 64), dtype=np.uint8, seed=0):
+    rng = np.random.default_rng(seed)
+    info = np.iinfo(dtype)
+    return [
+        rng.integers(info.min, info.max + 1, size=shape).astype(dtype)
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize('num_threads', [0, 1, 3, 16])
+@pytest.mark.parametrize('level', [0, 2])
+def test_matches_imread(num_threads, level):
+    images = _tiles(24)
+    datas = [_encode(image) for image in images]
+    references = [imread_from_memory(data, level=level) for data in datas]
+    outs = [np.empty(ref.shape, dtype=np.uint8) for ref in references]
+
+    status = read_j2c_batch(datas, outs, level, 0, 255,
+                            num_threads=num_threads)
+
+    assert status == [None] * len(datas)
+    for out, reference in zip(outs, references):
+        assert np.array_equal(out, reference)
+
+
+def test_per_item_levels_and_dtypes():
+    images = _tiles(6, shape=(96, 80), dtype=np.uint16, seed=1)
+    datas = [_encode(image) for image in images]
+    levels = [0, 1, 2, 3, 4, 1]
+    references = [imread_from_memory(data, level=level)
+                  for data, level in zip(datas, levels)]
+    outs = [np.empty(ref.shape, dtype=np.uint16) for ref in references]
+
+    status = read_j2c_batch(datas, outs, levels, 0, 65535)
+
+    assert status == [None] * len(datas)
+    for out, reference in zip(outs, references):
+        assert np.array_equal(out, reference)
+
+
+def test_failures_are_reported_per_item():
+    images = _tiles(4, seed=2)
+    datas = [_encode(image) for image in images]
+    outs = [np.empty(image.shape, dtype=np.uint8) for image in images]
+    # Item 1 gets a wrongly shaped output and item 2 a 3D one; the others
+    # must still be decoded.
+    outs[1] = np.empty((7, 7), dtype=np.uint8)
+    outs[2] = np.empty((64, 64, 1), dtype=np.uint8)
+
+    status = read_j2c_batch(datas, outs, 0)
+
+    assert status[0] is None
+    assert 'does not match' in status[1]
+    assert '2-dimensional' in status[2]
+    assert status[3] is None
+    assert np.array_equal(outs[0], images[0])
+    assert np.array_equal(outs[3], images[3])
+
+
+def test_empty_batch():
+    assert read_j2c_batch([], [], 0) == []
+
+
+def test_mismatched_lengths_raise():
+    data = _encode(_tiles(1)[0])
+    with pytest.raises(ValueError, match='same length'):
+        read_j2c_batch([data, data], [np.empty((64, 64), np.uint8)], 0)
+    with pytest.raises(ValueError, match='one entry per item'):
+        read_j2c_batch([data], [np.empty((64, 64), np.uint8)], [0, 1])
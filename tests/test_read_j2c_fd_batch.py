@@ -0,0 +1,108 @@
+"""Tests for ``read_j2c_fd_batch``, the batched form of ``read_j2c_fd_into``.
+
+Every page of a file, wherever it sits and whatever its level, must come out
+byte-identical to ``imread_from_memory``, however the reads are merged.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from ojph._imwrite import imwrite_to_memory
+from ojph._imread import imread_from_memory
+from ojph.ojph_bindings import io_uring_available, read_j2c_fd_batch
+
+_O_RDONLY_BINARY = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+
+
+def _encode(image):
+    data = imwrite_to_memory(
+        image,
+        num_decompositions=4,
+        progression_order='RLCP',
+        tileparts_at_resolutions=True,
+    )
+    return np.frombuffer(bytes(data), dtype=np.uint8).copy()
+
+
+def _write_pages(path, datas, gaps):
+    """Write the codestreams one after the other, each after its gap."""
+    offsets = []
+    with open(path, 'wb') as f:
+        for data, gap in zip(datas, gaps):
+            f.write(b'\x00' * gap)
+            offsets.append(f.tell())
+            f.write(data.tobytes())
+    return offsets
+
+
+@pytest.mark.parametrize('io_uring', [False, True])
+@pytest.mark.parametrize('max_gap', [0, 65536])
+@pytest.mark.parametrize('num_threads', [0, 1])
+def test_matches_imread(tmp_path, max_gap, num_threads, io_uring):
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (96 + 8 * i, 128), dtype=np.uint8)
+              for i in range(12)]
+    datas = [_encode(image) for image in images]
+    # Adjacent pages, small gaps and one far away.
+    gaps = [0, 0, 100, 0, 5000, 0, 0, 200000, 0, 17, 0, 0]
+    offsets = _write_pages(tmp_path / 'pages.bin', datas, gaps)
+    levels = [i % 5 for i in range(12)]
+    references = [imread_from_memory(data, level=level)
+                  for data, level in zip(datas, levels)]
+    outs = [np.empty(ref.shape, dtype=np.uint8) for ref in references]
+
+    fd = os.open(tmp_path / 'pages.bin', _O_RDONLY_BINARY)
+    try:
+        status = read_j2c_fd_batch(
+            fd, offsets, [data.nbytes for data in datas], outs, levels, 0, 255,
+            num_threads=num_threads, max_gap=max_gap, io_uring=io_uring)
+    finally:
+        os.close(fd)
+    assert status == [None] * 12
+    for out, reference in zip(outs, references):
+        np.testing.assert_array_equal(out, reference)
+
+
+def test_o_direct_alignment(tmp_path):
+    rng = np.random.default_rng(1)
+    images = [rng.integers(0, 65536, (64, 64), dtype=np.uint16)
+              for _ in range(4)]
+    datas = [_encode(image) for image in images]
+    offsets = _write_pages(tmp_path / 'pages.bin', datas, [4096, 1, 333, 0])
+    outs = [np.empty((32, 32), dtype=np.uint16) for _ in images]
+
+    # The aligned read path is exercised without an O_DIRECT fd, which
+    # needs sector-aligned offsets only from the kernel's side.
+    fd = os.open(tmp_path / 'pages.bin', _O_RDONLY_BINARY)
+    try:
+        status = read_j2c_fd_batch(
+            fd, offsets, [data.nbytes for data in datas], outs, 1, 0, 65535,
+            o_direct=True)
+    finally:
+        os.close(fd)
+    assert status == [None] * 4
+    for out, data in zip(outs, datas):
+        np.testing.assert_array_equal(out, imread_from_memory(data, level=1))
+
+
+def test_errors_are_reported_per_page(tmp_path):
+    datas = [_encode(np.zeros((64, 64), np.uint8)) for _ in range(3)]
+    offsets = _write_pages(tmp_path / 'pages.bin', datas, [0, 0, 0])
+    outs = [np.empty((64, 64), np.uint8), np.empty((5, 5), np.uint8),
+            np.empty((64, 64), np.uint8)]
+    fd = os.open(tmp_path / 'pages.bin', _O_RDONLY_BINARY)
+    try:
+        status = read_j2c_fd_batch(
+            fd, offsets, [data.nbytes for data in datas], outs, 0, 0, 255)
+        with pytest.raises(ValueError, match='same length'):
+            read_j2c_fd_batch(fd, offsets, [1], outs, 0)
+    finally:
+        os.close(fd)
+    assert status[0] is None and status[2] is None
+    assert 'does not match' in status[1]
+
+
+def test_io_uring_available():
+    # io_uring=True works either way; this only reports which path runs.
+    assert io_uring_available() in (True, False)
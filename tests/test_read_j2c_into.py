@@ -3,7 +3,8 @@
 ``read_j2c_into(data, out, level, min_val=None, max_val=None)`` performs the
 entire reduced-resolution decode (open / read headers / restrict resolution /
 create / pull) under a single ``py::gil_scoped_release`` and writes the pixels
-into a caller-provided, pre-allocated 2D array. It returns the ``(height,
+into a caller-provided, pre-allocated array: 2D for a single component, 3D in
+``channel_order`` ('HWC' or 'CHW') for several. It returns the ``(height,
 width)`` actually decoded.
 
 These tests pin the core contract so downstream readers can build on top of it:
@@ -17,7 +18,10 @@ import pytest
 
 from ojph._imwrite import imwrite_to_memory
 from ojph._imread import imread_from_memory, OJPHImageFile
-from ojph.ojph_bindings import read_j2c_into, peek_j2c_fd, read_j2c_fd_into
+from ojph.ojph_bindings import (
+    j2c_level_ranges, j2c_main_header_size, peek_j2c_fd, read_j2c_fd_into,
+    read_j2c_into,
+)
 
 # Codestreams are binary; on Windows the fd must be opened O_BINARY or the CRT
 # translates CRLF and stops at the first 0x1A byte.
@@ -295,6 +299,91 @@ def test_read_j2c_fd_into_no_tlm_falls_back(tmp_path):
         os.close(fd)
 
 
+@pytest.mark.parametrize('kwargs', [
+    dict(tile_size=(64, 96)),
+    dict(tile_size=(64, 96), num_threads=0),
+    dict(tileparts_at_components=True),
+    dict(tile_size=(100, 100), tileparts_at_components=True),
+    dict(progression_order='RPCL'),
+    dict(progression_order='CPRL'),
+])
+def test_read_j2c_fd_into_tile_part_divisions(tmp_path, kwargs):
+    # Several tiles and tile-part divisions: every TLM entry is indexed and
+    # only the tile-parts of the kept resolutions are read, wherever they are.
+    image = np.random.default_rng(8).integers(0, 256, (160, 224, 3),
+                                              dtype=np.uint8)
+    options = dict(channel_order='HWC', num_decompositions=3,
+                   progression_order='RLCP', tlm_marker=True,
+                   tileparts_at_resolutions=True)
+    options.update(kwargs)
+    data = np.frombuffer(bytes(imwrite_to_memory(image, **options)),
+                         dtype=np.uint8).copy()
+    path = _write_at_offset(tmp_path, data, 4096)
+
+    fd = os.open(path, _O_RDONLY_BINARY)
+    try:
+        for level in range(4):
+            reference = imread_from_memory(data, level=level)
+            out = np.empty(reference.shape, dtype=np.uint8)
+            read_j2c_fd_into(fd, 4096, data.nbytes, out, level, 0, 255, False)
+            assert np.array_equal(out, reference), f"level {level}"
+    finally:
+        os.close(fd)
+
+
+@pytest.mark.parametrize('o_direct', [False, True])
+def test_read_j2c_fd_into_io_uring(tmp_path, o_direct):
+    # Tile-major tile-parts: the ranges a level needs are read together.
+    image = np.random.default_rng(10).integers(0, 256, (192, 256),
+                                               dtype=np.uint8)
+    data = np.frombuffer(bytes(imwrite_to_memory(
+        image, num_decompositions=4, progression_order='RLCP',
+        tlm_marker=True, tileparts_at_resolutions=True, tile_size=(64, 64),
+    )), dtype=np.uint8).copy()
+    path = _write_at_offset(tmp_path, data, 4096)
+    fd = os.open(path, _O_RDONLY_BINARY)
+    try:
+        for level in range(5):
+            reference = imread_from_memory(data, level=level)
+            out = np.empty(reference.shape, dtype=np.uint8)
+            read_j2c_fd_into(fd, 4096, data.nbytes, out, level, 0, 255,
+                             o_direct, io_uring=True)
+            assert np.array_equal(out, reference), f"level {level}"
+    finally:
+        os.close(fd)
+
+
+def test_j2c_level_ranges_skip_tile_parts():
+    image = np.random.default_rng(9).integers(0, 256, (128, 192),
+                                              dtype=np.uint8)
+    data = np.frombuffer(bytes(imwrite_to_memory(
+        image, num_decompositions=3, progression_order='RLCP',
+        tlm_marker=True, tileparts_at_resolutions=True, tile_size=(64, 64),
+    )), dtype=np.uint8).copy()
+    header = data[:j2c_main_header_size(data)]
+
+    # Full resolution needs every tile-part.
+    assert j2c_level_ranges(header, 0) is None
+    previous = data.nbytes
+    for level in range(1, 4):
+        ranges = j2c_level_ranges(header, level)
+        assert ranges is not None
+        needed = sum(stop - start for start, stop in ranges)
+        assert needed < previous
+        previous = needed
+        for start, stop in ranges:
+            # Each range starts at an SOT marker.
+            assert (data[start], data[start + 1]) == (0xFF, 0x90)
+            assert stop <= data.nbytes
+
+    # Without a TLM there is no index.
+    no_tlm = np.frombuffer(bytes(imwrite_to_memory(
+        image, num_decompositions=3, progression_order='RLCP',
+        tlm_marker=False, tileparts_at_resolutions=True,
+    )), dtype=np.uint8)
+    assert j2c_level_ranges(no_tlm, 2) is None
+
+
 def test_read_j2c_fd_into_error_contracts(tmp_path):
     data = _encode(np.zeros((64, 64), np.uint8))
     path = _write_at_offset(tmp_path, data, 0)
@@ -308,3 +397,69 @@ def test_read_j2c_fd_into_error_contracts(tmp_path):
                              1, 0, 255, False)
     finally:
         os.close(fd)
+
+
+# ---------------------------------------------------------------------------
+# Multi-component codestreams: ``out`` is 3D in ``channel_order`` and must
+# match imread_from_memory with the same channel order.
+# ---------------------------------------------------------------------------
+def _encode_multi(image, channel_order):
+    data = imwrite_to_memory(
+        image,
+        channel_order=channel_order,
+        num_decompositions=4,
+        progression_order='RLCP',
+        tlm_marker=True,
+        tileparts_at_resolutions=True,
+    )
+    return np.frombuffer(bytes(data), dtype=np.uint8).copy()
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.uint16])
+@pytest.mark.parametrize('channel_order, shape', [
+    ('HWC', (96, 80, 3)),
+    ('CHW', (4, 96, 80)),
+])
+def test_multi_component_matches_imread(channel_order, shape, dtype):
+    lo, hi = _clip_bounds(dtype)
+    image = np.random.default_rng(6).integers(lo, hi + 1, shape).astype(dtype)
+    data = _encode_multi(image, channel_order)
+    for level in range(5):
+        reference = imread_from_memory(data, channel_order=channel_order,
+                                       level=level)
+        out = np.empty(reference.shape, dtype=dtype)
+        read_j2c_into(data, out, level, lo, hi, channel_order=channel_order)
+        assert np.array_equal(out, reference), f"level {level}"
+
+
+@pytest.mark.parametrize('channel_order, shape', [
+    ('HWC', (128, 96, 3)),
+    ('CHW', (3, 128, 96)),
+])
+def test_multi_component_fd_matches_imread(tmp_path, channel_order, shape):
+    image = np.random.default_rng(7).integers(0, 256, shape, dtype=np.uint8)
+    data = _encode_multi(image, channel_order)
+    path = _write_at_offset(tmp_path, data, 4096)
+    fd = os.open(path, _O_RDONLY_BINARY)
+    try:
+        for level in range(5):
+            reference = imread_from_memory(data, channel_order=channel_order,
+                                           level=level)
+            out = np.empty(reference.shape, dtype=np.uint8)
+            read_j2c_fd_into(fd, 4096, data.nbytes, out, level, 0, 255, False,
+                             channel_order=channel_order)
+            assert np.array_equal(out, reference), f"level {level}"
+    finally:
+        os.close(fd)
+
+
+def test_multi_component_errors():
+    data = _encode_multi(np.zeros((64, 64, 3), np.uint8), 'HWC')
+    with pytest.raises(ValueError, match='3-dimensional'):
+        read_j2c_into(data, np.empty((64, 64), np.uint8), 0)
+    with pytest.raises(ValueError, match='has 3'):
+        read_j2c_into(data, np.empty((64, 64, 4), np.uint8), 0)
+    with pytest.raises(ValueError, match='does not match'):
+        read_j2c_into(data, np.empty((32, 64, 3), np.uint8), 0)
+    with pytest.raises(ValueError, match='C-contiguous'):
+        read_j2c_into(data, np.empty((64, 64, 6), np.uint8)[..., ::2], 0)
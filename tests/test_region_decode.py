@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from ojph import imwrite, imread, imwrite_to_memory, imread_from_memory
+from ojph._imread import OJPHImageFile
+from ojph.ojph_bindings import crop_j2c_to_region, read_j2c_into
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+def _window(image, region):
+    y0, y1, x0, x1 = region
+    return image[y0:y1, x0:x1]
+
+
+@pytest.mark.parametrize('tile_size', [None, (64, 64), (48, 80)])
+@pytest.mark.parametrize('region', [
+    (0, 10, 0, 10),
+    (70, 150, 130, 200),
+    (10, 70, 60, 70),
+    (0, 200, 0, 240),
+])
+def test_region_matches_full_decode(tile_size, region):
+    image = _image((200, 240))
+    data = imwrite_to_memory(image, tile_size=tile_size)
+    np.testing.assert_array_equal(
+        imread_from_memory(data, region=region), _window(image, region))
+
+
+@pytest.mark.parametrize('level', [1, 2, 3])
+def test_region_at_reduced_resolution(level):
+    image = _image((203, 157), seed=1)
+    data = imwrite_to_memory(image, tile_size=(64, 64))
+    full = imread_from_memory(data, level=level)
+    height, width = full.shape
+    region = (height // 3, height - 1, width // 4, width // 2 + 1)
+    np.testing.assert_array_equal(
+        imread_from_memory(data, level=level, region=region),
+        _window(full, region))
+
+
+@pytest.mark.parametrize('channel_order, shape', [
+    ('HWC', (128, 96, 3)),
+    ('CHW', (3, 128, 96)),
+])
+def test_region_multi_component(channel_order, shape):
+    image = _image(shape, seed=2)
+    data = imwrite_to_memory(image, channel_order=channel_order,
+                             tile_size=(32, 32))
+    region = (20, 90, 33, 70)
+    decoded = imread_from_memory(data, channel_order=channel_order,
+                                 region=region)
+    if channel_order == 'HWC':
+        expected = image[20:90, 33:70]
+    else:
+        expected = image[:, 20:90, 33:70]
+    np.testing.assert_array_equal(decoded, expected)
+
+
+def test_region_into_out(tmp_path):
+    image = _image((256, 256), dtype=np.uint16, seed=3)
+    filename = tmp_path / 'tiled.j2c'
+    imwrite(filename, image, tile_size=(64, 64))
+    region = (100, 130, 5, 200)
+    out = np.empty((30, 195), dtype=np.uint16)
+    result = OJPHImageFile(filename).read_image(region=region, out=out)
+    assert np.shares_memory(result, out)
+    np.testing.assert_array_equal(out, _window(image, region))
+    np.testing.assert_array_equal(imread(filename, region=region), out)
+
+
+def test_crop_keeps_only_intersecting_tiles():
+    image = _image((256, 256), seed=4)
+    data = imwrite_to_memory(image, tile_size=(64, 64))
+    cropped, row_offset, col_offset = crop_j2c_to_region(
+        data, 0, (70, 80, 130, 140))
+    assert cropped.nbytes < data.nbytes / 8
+    assert (row_offset, col_offset) == (6, 2)
+    decoded = imread_from_memory(cropped)
+    assert decoded.shape == (64, 64)
+    np.testing.assert_array_equal(decoded, image[64:128, 128:192])
+
+    # Every tile is needed: nothing to crop.
+    cropped, row_offset, col_offset = crop_j2c_to_region(
+        data, 0, (10, 250, 10, 250))
+    assert cropped is None
+    assert (row_offset, col_offset) == (10, 10)
+
+
+@pytest.mark.parametrize('level', [0, 2])
+def test_read_j2c_into_region(level):
+    image = _image((192, 160), seed=5)
+    data = np.frombuffer(bytes(imwrite_to_memory(image, tile_size=(64, 64))),
+                         dtype=np.uint8)
+    full = imread_from_memory(data, level=level)
+    region = (3, full.shape[0] - 2, 17, full.shape[1] // 2)
+    out = np.empty((region[1] - region[0], region[3] - region[2]), np.uint8)
+    assert read_j2c_into(data, out, level, 0, 255, region=region) == out.shape
+    np.testing.assert_array_equal(out, _window(full, region))
+
+
+@pytest.mark.parametrize('region', [
+    (0, 0, 0, 10),
+    (5, 4, 0, 10),
+    (0, 65, 0, 10),
+    (0, 10, 0, 65),
+    (0, 10, 0),
+])
+def test_invalid_region_raises(region):
+    data = imwrite_to_memory(_image((64, 64), seed=6), tile_size=(32, 32))
+    with pytest.raises(ValueError, match='region'):
+        imread_from_memory(data, region=region)
+
+
+def test_read_j2c_into_region_shape_mismatch():
+    image = _image((64, 64), seed=7)
+    data = np.frombuffer(bytes(imwrite_to_memory(image)), dtype=np.uint8)
+    with pytest.raises(ValueError, match='does not match the region'):
+        read_j2c_into(data, np.empty((8, 8), np.uint8), 0, region=(0, 4, 0, 4))
+    with pytest.raises(ValueError, match='region'):
+        read_j2c_into(data, np.empty((8, 8), np.uint8), 0, region=(60, 68, 0, 8))
@@ -0,0 +1,77 @@
+import io
+
+import numpy as np
+import pytest
+
+from ojph import StreamingEncoder, imread, imread_from_memory, imwrite_to_memory
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+def _push_stripes(encoder, image, bounds, row_axis=0):
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        index = [slice(None)] * image.ndim
+        index[row_axis] = slice(start, stop)
+        encoder.push_rows(image[tuple(index)])
+
+
+@pytest.mark.parametrize('kwargs', [
+    {},
+    dict(wavelet='irv97', qstep=0.01),
+    dict(num_decompositions=3, tile_size=(64, 48)),
+])
+def test_matches_imwrite_to_memory(tmp_path, kwargs):
+    image = _image((150, 100), dtype=np.uint16)
+    filename = tmp_path / 'streamed.j2c'
+    with StreamingEncoder(filename, image.shape, image.dtype, **kwargs) as enc:
+        _push_stripes(enc, image, [0, 1, 40, 41, 128, 150])
+        assert enc.rows_pushed == 150
+    np.testing.assert_array_equal(
+        np.fromfile(filename, dtype=np.uint8),
+        imwrite_to_memory(image, **kwargs))
+
+
+@pytest.mark.parametrize('channel_order', ['HWC', 'CHW'])
+def test_multi_component(channel_order):
+    shape = (90, 70, 3) if channel_order == 'HWC' else (3, 90, 70)
+    image = _image(shape, seed=1)
+    buffer = io.BytesIO()
+    with StreamingEncoder(buffer, shape, image.dtype,
+                          channel_order=channel_order) as enc:
+        _push_stripes(enc, image, [0, 33, 66, 90],
+                      row_axis=channel_order.index('H'))
+    np.testing.assert_array_equal(
+        imread_from_memory(buffer.getvalue(), channel_order=channel_order),
+        image)
+
+
+def test_stripes_are_not_kept(tmp_path):
+    # Each stripe is consumed by push_rows, so its buffer can be reused.
+    image = _image((64, 80), seed=2)
+    stripe = np.empty((16, 80), dtype=np.uint8)
+    filename = tmp_path / 'reused.j2c'
+    with StreamingEncoder(filename, image.shape, image.dtype) as enc:
+        for start in range(0, 64, 16):
+            stripe[...] = image[start:start + 16]
+            enc.push_rows(stripe)
+    np.testing.assert_array_equal(imread(filename), image)
+
+
+def test_invalid_stripes(tmp_path):
+    enc = StreamingEncoder(tmp_path / 'invalid.j2c', (32, 32), np.uint8)
+    with pytest.raises(ValueError, match='Expected a stripe'):
+        enc.push_rows(np.zeros((8, 16), dtype=np.uint8))
+    with pytest.raises(ValueError, match='Expected a stripe'):
+        enc.push_rows(np.zeros((8, 32), dtype=np.uint16))
+    enc.push_rows(np.zeros((24, 32), dtype=np.uint8))
+    with pytest.raises(ValueError, match='more than the image height'):
+        enc.push_rows(np.zeros((9, 32), dtype=np.uint8))
+    with pytest.raises(ValueError, match='Only 24 of the 32 rows'):
+        enc.close()
+    with pytest.raises(ValueError, match='closed'):
+        enc.push_rows(np.zeros((8, 32), dtype=np.uint8))
+    enc.close()
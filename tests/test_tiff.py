@@ -0,0 +1,235 @@
+import struct
+
+import numpy as np
+import pytest
+
+from ojph import imwrite_to_memory, imread_from_memory
+from ojph.tiff import TiffReader, TiffWriter, imread_tiff, imwrite_tiff
+
+
+def _image(shape, dtype=np.uint8, seed=0):
+    info = np.iinfo(dtype)
+    return np.random.default_rng(seed).integers(
+        info.min, info.max, shape, dtype=dtype)
+
+
+def _write_tiff(path, pages, *, bigtiff=False):
+    """A minimal JPEG2000 TIFF writer: ``pages`` is a list of
+    ``(image, tile_shape, planar)``; tiles are padded to full size."""
+    order = '<'
+    offset_format, count_format, entry_format = (
+        ('Q', 'Q', 'HHQQ') if bigtiff else ('I', 'H', 'HHII'))
+    inline = 8 if bigtiff else 4
+    body = bytearray(b'II' + struct.pack('<H', 43 if bigtiff else 42))
+    if bigtiff:
+        body += struct.pack('<HHQ', 8, 0, 0)
+    else:
+        body += struct.pack('<I', 0)
+    first_pointer = len(body) - struct.calcsize(offset_format)
+    previous_pointer = first_pointer
+
+    for image, (tile_height, tile_width), planar in pages:
+        height, width = image.shape[:2]
+        samples = image.shape[2] if image.ndim == 3 else 1
+        down, across = -(-height // tile_height), -(-width // tile_width)
+        padded = np.zeros((down * tile_height, across * tile_width)
+                          + image.shape[2:], image.dtype)
+        padded[:height, :width] = image
+        planes = ([padded[..., s] for s in range(samples)]
+                  if planar == 2 else [padded])
+        offsets, counts = [], []
+        for plane in planes:
+            for row in range(down):
+                for col in range(across):
+                    tile = np.ascontiguousarray(plane[
+                        row * tile_height:(row + 1) * tile_height,
+                        col * tile_width:(col + 1) * tile_width])
+                    data = bytes(imwrite_to_memory(
+                        tile, channel_order='HWC' if tile.ndim == 3 else None,
+                        num_decompositions=3))
+                    offsets.append(len(body))
+                    counts.append(len(data))
+                    body += data
+
+        def array(values, field_type, fmt):
+            nonlocal body
+            packed = struct.pack(order + fmt * len(values), *values)
+            if len(packed) <= inline:
+                return field_type, len(values), packed.ljust(inline, b'\0')
+            position = len(body)
+            body += packed
+            return field_type, len(values), struct.pack(
+                order + offset_format, position)
+
+        long_type, long_fmt = (16, 'Q') if bigtiff else (4, 'I')
+        bits = image.dtype.itemsize * 8
+        tags = {
+            256: array([width], 4, 'I'),
+            257: array([height], 4, 'I'),
+            258: array([bits] * samples, 3, 'H'),
+            259: array([34712], 3, 'H'),
+            277: array([samples], 3, 'H'),
+            284: array([planar], 3, 'H'),
+            322: array([tile_width], 4, 'I'),
+            323: array([tile_height], 4, 'I'),
+            324: array(offsets, long_type, long_fmt),
+            325: array(counts, long_type, long_fmt),
+            339: array([2 if image.dtype.kind == 'i' else 1] * samples,
+                       3, 'H'),
+        }
+        ifd = len(body)
+        struct.pack_into(order + offset_format, body, previous_pointer, ifd)
+        body += struct.pack(order + count_format, len(tags))
+        for tag in sorted(tags):
+            field_type, count, value = tags[tag]
+            body += struct.pack(order + entry_format[:3], tag, field_type,
+                                count) + value
+        previous_pointer = len(body)
+        body += struct.pack(order + offset_format, 0)
+
+    with open(path, 'wb') as f:
+        f.write(body)
+
+
+@pytest.mark.parametrize('bigtiff', [False, True])
+def test_pages_and_levels(tmp_path, bigtiff):
+    first = _image((200, 300), seed=0)
+    second = _image((96, 64), dtype=np.uint16, seed=1)
+    path = tmp_path / 'pages.tif'
+    _write_tiff(path, [(first, (64, 128), 1), (second, (32, 32), 1)],
+                bigtiff=bigtiff)
+
+    with TiffReader(path) as tif:
+        assert len(tif.pages) == 2
+        page = tif.pages[0]
+        assert page.shape == first.shape
+        assert page.tiles == (4, 3)
+        assert page.levels == 3
+        np.testing.assert_array_equal(page.read(), first)
+        np.testing.assert_array_equal(tif.pages[1].read(num_threads=1), second)
+    np.testing.assert_array_equal(imread_tiff(path, page=1), second)
+
+    # A level of a page is the level of each tile, side by side.
+    tile = np.ascontiguousarray(first[:64, :128])
+    level = imread_tiff(path, level=2)
+    assert level.shape == (50, 75)
+    np.testing.assert_array_equal(
+        level[:16, :32], imread_from_memory(imwrite_to_memory(
+            tile, num_decompositions=3), level=2))
+
+
+@pytest.mark.parametrize('level', [0, 1])
+@pytest.mark.parametrize('region', [
+    (0, 10, 0, 10),
+    (30, 90, 100, 140),
+    (0, 100, 0, 150),
+])
+def test_region(tmp_path, level, region):
+    image = _image((200, 300), seed=2)
+    path = tmp_path / 'tiled.tif'
+    _write_tiff(path, [(image, (64, 64), 1)])
+    full = imread_tiff(path, level=level)
+    y0, y1, x0, x1 = region
+    np.testing.assert_array_equal(
+        imread_tiff(path, level=level, region=region), full[y0:y1, x0:x1])
+
+
+@pytest.mark.parametrize('planar', [1, 2])
+def test_multi_sample(tmp_path, planar):
+    image = _image((100, 90, 3), seed=3)
+    path = tmp_path / 'rgb.tif'
+    _write_tiff(path, [(image, (32, 48), planar)])
+    page = TiffReader(path).pages[0]
+    assert page.shape == image.shape
+    np.testing.assert_array_equal(page.read(), image)
+    np.testing.assert_array_equal(page.read(region=(10, 70, 40, 90)),
+                                  image[10:70, 40:90])
+
+
+def test_invalid_arguments(tmp_path):
+    path = tmp_path / 'image.tif'
+    _write_tiff(path, [(_image((64, 96), seed=4), (48, 48), 1)])
+    page = TiffReader(path).pages[0]
+    with pytest.raises(ValueError, match='tile shape'):
+        page.read(level=5)
+    with pytest.raises(ValueError, match='region'):
+        page.read(region=(0, 65, 0, 10))
+    with pytest.raises(ValueError, match='out must have shape'):
+        page.read(out=np.empty((10, 10), np.uint8))
+
+    not_tiff = tmp_path / 'not.tif'
+    not_tiff.write_bytes(b'hello world')
+    with pytest.raises(ValueError, match='not a TIFF'):
+        TiffReader(not_tiff)
+
+
+def _downsample(image):
+    padded = np.pad(image, [(0, image.shape[0] % 2), (0, image.shape[1] % 2)]
+                    + [(0, 0)] * (image.ndim - 2), mode='edge').astype(np.int64)
+    total = (padded[0::2, 0::2] + padded[1::2, 0::2]
+             + padded[0::2, 1::2] + padded[1::2, 1::2])
+    return ((total + 2) // 4).astype(image.dtype)
+
+
+@pytest.mark.parametrize('bigtiff', [None, True])
+@pytest.mark.parametrize('shape, dtype', [
+    ((200, 300), np.uint8),
+    ((130, 70, 3), np.uint8),
+    ((64, 64), np.int16),
+])
+def test_writer_roundtrip(tmp_path, bigtiff, shape, dtype):
+    image = _image(shape, dtype=dtype, seed=5)
+    path = tmp_path / 'written.tif'
+    imwrite_tiff(path, image, tile_shape=(64, 32), bigtiff=bigtiff,
+                 num_decompositions=3)
+    assert path.read_bytes()[2] == (43 if bigtiff else 42)
+    with TiffReader(path) as tif:
+        page = tif.pages[0]
+        assert page.shape == image.shape
+        assert page.tile_shape == (64, 32)
+        assert page.levels == 3
+        np.testing.assert_array_equal(page.read(), image)
+        np.testing.assert_array_equal(page.read(region=(10, 50, 20, 60)),
+                                      image[10:50, 20:60])
+
+
+def test_writer_stripes_and_pyramid(tmp_path):
+    image = _image((301, 250, 3), seed=6)
+    path = tmp_path / 'pyramid.tif'
+    # Stripes of uneven heights, none aligned with the tiles.
+    bounds = [0, 7, 100, 101, 230, 301]
+    stripes = (image[y0:y1] for y0, y1 in zip(bounds[:-1], bounds[1:]))
+    with TiffWriter(path) as tif:
+        tif.write(stripes, shape=image.shape, dtype=image.dtype,
+                  tile_shape=(64, 64), subifds=2, num_threads=2)
+        tif.write(image[:50, :60, 0])
+
+    with TiffReader(path) as tif:
+        assert len(tif.pages) == 2
+        page = tif.pages[0]
+        np.testing.assert_array_equal(page.read(), image)
+        expected = image
+        assert len(page.subifds) == 2
+        for level in page.subifds:
+            expected = _downsample(expected)
+            assert level.shape == expected.shape
+            np.testing.assert_array_equal(level.read(), expected)
+        np.testing.assert_array_equal(tif.pages[1].read(), image[:50, :60, 0])
+
+
+def test_writer_invalid_arguments(tmp_path):
+    path = tmp_path / 'invalid.tif'
+    image = _image((64, 64), seed=7)
+    with TiffWriter(path) as tif:
+        with pytest.raises(ValueError, match='shape and dtype'):
+            tif.write(iter([image]))
+        with pytest.raises(ValueError, match='tile_shape'):
+            tif.write(image, tile_shape=(20, 32))
+        with pytest.raises(ValueError, match='Stripes must have'):
+            tif.write([image[:, :10]], shape=image.shape, dtype=image.dtype)
+        with pytest.raises(ValueError, match='32 of the 64 rows'):
+            tif.write([image[:32]], shape=image.shape, dtype=image.dtype)
+        with pytest.raises(ValueError, match='integer images'):
+            tif.write(image.astype(np.float32))
+    with pytest.raises(ValueError, match='closed'):
+        tif.write(image)
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from ojph import imwrite, imread, imwrite_to_memory, imread_from_memory
+from ojph.ojph_bindings import Codestream, J2CInfile
+
+
+@pytest.mark.parametrize('num_threads', [1, 0, 3])
+@pytest.mark.parametrize('shape, tile_size', [
+    ((256, 256), (64, 64)),
+    ((200, 150), (64, 48)),
+    ((97, 301), (32, 128)),
+    ((64, 64), (128, 128)),
+])
+def test_tiled_lossless_roundtrip(shape, tile_size, num_threads):
+    rng = np.random.default_rng(sum(shape))
+    image = rng.integers(0, 256, shape, dtype=np.uint8)
+    data = imwrite_to_memory(image, tile_size=tile_size,
+                             num_threads=num_threads)
+    np.testing.assert_array_equal(imread_from_memory(data), image)
+
+
+@pytest.mark.parametrize('num_threads', [1, 4])
+def test_tiled_writes_tile_geometry(num_threads, tmp_path):
+    image = np.random.default_rng(0).integers(0, 65536, (300, 200),
+                                              dtype=np.uint16)
+    filename = tmp_path / 'tiled.j2c'
+    imwrite(filename, image, tile_size=(128, 64), num_threads=num_threads)
+
+    infile = J2CInfile()
+    infile.open(str(filename))
+    codestream = Codestream()
+    codestream.read_headers(infile)
+    siz = codestream.access_siz()
+    tile_size = siz.get_tile_size()
+    assert (tile_size.h, tile_size.w) == (128, 64)
+    codestream.close()
+    np.testing.assert_array_equal(imread(filename), image)
+
+
+@pytest.mark.parametrize('level', [1, 2, 3])
+def test_tiled_reduced_resolution_matches_single_threaded(level):
+    image = np.random.default_rng(1).integers(0, 256, (256, 320),
+                                              dtype=np.uint8)
+    serial = imwrite_to_memory(image, tile_size=(128, 128), num_threads=1)
+    parallel = imwrite_to_memory(image, tile_size=(128, 128), num_threads=4)
+    np.testing.assert_array_equal(
+        imread_from_memory(parallel, level=level),
+        imread_from_memory(serial, level=level),
+    )
+
+
+@pytest.mark.parametrize('channel_order, shape', [
+    ('HWC', (128, 96, 3)),
+    ('CHW', (3, 128, 96)),
+])
+def test_tiled_multi_component(channel_order, shape):
+    image = np.random.default_rng(2).integers(0, 256, shape, dtype=np.uint8)
+    data = imwrite_to_memory(image, channel_order=channel_order,
+                             tile_size=(64, 32), num_threads=0)
+    np.testing.assert_array_equal(
+        imread_from_memory(data, channel_order=channel_order), image)
+
+
+def test_tiled_irreversible_matches_single_threaded():
+    image = np.random.default_rng(3).integers(0, 256, (192, 192),
+                                              dtype=np.uint8)
+    kwargs = dict(wavelet='irv97', qstep=0.01, tile_size=(64, 64))
+    serial = imread_from_memory(imwrite_to_memory(image, **kwargs))
+    parallel = imread_from_memory(
+        imwrite_to_memory(image, num_threads=0, **kwargs))
+    np.testing.assert_array_equal(parallel, serial)
+
+
+def test_tile_size_must_be_positive():
+    image = np.zeros((32, 32), dtype=np.uint8)
+    with pytest.raises(ValueError, match='tile_size'):
+        imwrite_to_memory(image, tile_size=(0, 16))
+
+
+def test_threaded_tiled_encode_rejects_a_codestream(tmp_path):
+    image = np.zeros((64, 64), dtype=np.uint8)
+    filename = tmp_path / 'tiled.j2c'
+    codestream = Codestream()
+    with pytest.raises(ValueError, match='codestream'):
+        imwrite(filename, image, codestream=codestream, tile_size=(32, 32),
+                num_threads=2)
+    assert not filename.exists()
+
+    imwrite(filename, image, codestream=codestream, tile_size=(32, 32))
+    codestream.close()
+    np.testing.assert_array_equal(imread(filename), image)
+
+
+@pytest.mark.parametrize('copy', [False, True])
+def test_threaded_tiled_to_memory(copy):
+    image = np.random.default_rng(4).integers(0, 256, (128, 128),
+                                              dtype=np.uint8)
+    data = imwrite_to_memory(image, tile_size=(64, 64), num_threads=2,
+                             copy=copy)
+    np.testing.assert_array_equal(imread_from_memory(data), image)